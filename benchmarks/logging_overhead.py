@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Measure the overhead of TAU Commander's debug log.
+
+Runs a workload with the debug log disabled, with the synchronous debug log,
+and with the asynchronous debug log (TAU_ASYNC_LOG=1), and reports the median 
+wall clock time of each.  Each run is a new process.
+
+With a command, the workload is `tau build <command>` in the current directory,
+which must contain a TAU Commander project, e.g.::
+
+    python benchmarks/logging_overhead.py -- gcc -c matmult.c
+
+Without a command, the workload emulates the logging hot spots of `tau build`: 
+storage query debug messages and the output of a chatty compiler subprocess.
+"""
+
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+HERE = os.path.realpath(os.path.dirname(__file__))
+
+TAU_SCRIPT = os.path.join(HERE, '..', 'bin', 'tau')
+
+PACKAGES = os.path.join(HERE, '..', 'packages')
+
+WORKLOAD = """
+import sys
+from tau import logger, util
+if sys.argv[1] == 'on':
+    logger.activate_debug_log()
+LOGGER = logger.get_logger('tau.cf.storage.local_file')
+for i in xrange(20000):
+    LOGGER.debug("%s: search(keys=%r)", 'experiment', {'name': 'experiment_%d' % i, 'project': i})
+chatter = "import sys\\nfor i in xrange(200000): sys.stdout.write('compiling file_%d.c\\\\n' % i)"
+util.create_subprocess([sys.executable, '-c', chatter], stdout=False)
+"""
+
+MODES = (('off', False, False), ('sync', True, False), ('async', True, True))
+
+
+def run(mode, command, env):
+    _, log, async = mode
+    env = dict(env)
+    env.pop('TAU_ASYNC_LOG', None)
+    if async:
+        env['TAU_ASYNC_LOG'] = '1'
+    if command:
+        cmd = [sys.executable, TAU_SCRIPT] + (['--log'] if log else []) + ['build'] + command
+    else:
+        cmd = [sys.executable, '-c', WORKLOAD, 'on' if log else 'off']
+    with open(os.devnull, 'w') as devnull:
+        start = time.time()
+        retval = subprocess.call(cmd, env=env, stdout=devnull)
+        elapsed = time.time() - start
+    if retval:
+        sys.exit("%s failed with return code %d" % (' '.join(cmd), retval))
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5, help="runs of each mode (default: 5)")
+    parser.add_argument('command', nargs=argparse.REMAINDER, help="compiler command for `tau build`")
+    args = parser.parse_args()
+    command = args.command[1:] if args.command[:1] == ['--'] else args.command
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [PACKAGES, env.get('PYTHONPATH')]))
+    results = {}
+    # Interleave modes so system noise affects them equally
+    for _ in xrange(args.repeat):
+        for mode in MODES:
+            results.setdefault(mode[0], []).append(run(mode, command, env))
+    baseline = sorted(results['off'])[args.repeat // 2]
+    print "%-6s %10s %10s" % ('log', 'median(s)', 'overhead')
+    for name, _, _ in MODES:
+        median = sorted(results[name])[args.repeat // 2]
+        print "%-6s %10.3f %9.1f%%" % (name, median, 100 * (median - baseline) / baseline)
+
+
+if __name__ == '__main__':
+    main()
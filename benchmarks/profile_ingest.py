@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Measure the speed of reading TAU profile files with tau.cf.profile.
+
+Reads a trial's profile files with an increasing number of worker processes 
+and reports the median wall clock time and speedup of each.  With a directory, 
+reads the profile files in that directory and its MULTI__ subdirectories, e.g.::
+
+    python benchmarks/profile_ingest.py .tau/myproject/.../0
+
+Without a directory, writes a synthetic trial to a temporary directory first.
+
+Also reports the time to load the trial from a profile cache (see tau.cf.profile.cache)
+and to read the exclusive time column from the cache.
+"""
+
+import os
+import sys
+import glob
+import time
+import shutil
+import argparse
+import tempfile
+
+HERE = os.path.realpath(os.path.dirname(__file__))
+
+sys.path.insert(0, os.path.join(HERE, '..', 'packages'))
+
+from tau.cf import profile, scheduler   # pylint: disable=wrong-import-position
+from tau.cf.profile import cache       # pylint: disable=wrong-import-position
+
+
+def write_trial(prefix, files, functions, metrics):
+    for metric in metrics:
+        multi_dir = os.path.join(prefix, 'MULTI__' + metric)
+        os.makedirs(multi_dir)
+        for rank in xrange(files):
+            with open(os.path.join(multi_dir, 'profile.%d.0.0' % rank), 'w') as fout:
+                fout.write('%d templated_functions_MULTI_%s\n' % (functions, metric))
+                fout.write('# Name Calls Subrs Excl Incl ProfileCalls #\n')
+                for i in xrange(functions):
+                    fout.write('"void kernel_%d(double *, int) [{src/kernel_%d.cpp} {%d,1}-{%d,1}]" '
+                               '%d %d %.16G %.16G 0 GROUP="TAU_USER"\n' % (i, i, i, i+20, rank+i, i, rank*1.5, i*3.25))
+                fout.write('0 aggregates\n')
+
+
+def profile_paths(prefix):
+    paths = glob.glob(os.path.join(prefix, 'profile.*.*.*'))
+    for multi_dir in glob.glob(os.path.join(prefix, 'MULTI__*')):
+        paths.extend(glob.glob(os.path.join(multi_dir, 'profile.*.*.*')))
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=3, help="runs with each number of processes (default: 3)")
+    parser.add_argument('--files', type=int, default=4096, help="synthetic profile files per metric (default: 4096)")
+    parser.add_argument('--functions', type=int, default=100, help="functions per synthetic profile (default: 100)")
+    parser.add_argument('--metrics', type=int, default=2, help="metrics in the synthetic trial (default: 2)")
+    parser.add_argument('--max-processes', type=int, default=len(scheduler.allowed_cpus()),
+                        help="largest number of worker processes (default: available CPUs)")
+    parser.add_argument('trial_dir', nargs='?', help="directory containing profile files")
+    args = parser.parse_args()
+    tmp_dir = None
+    if args.trial_dir:
+        paths = profile_paths(args.trial_dir)
+    else:
+        tmp_dir = tempfile.mkdtemp()
+        metrics = ['TIME', 'PAPI_TOT_CYC', 'PAPI_L1_DCM', 'PAPI_FP_OPS'][:args.metrics]
+        write_trial(tmp_dir, args.files, args.functions, metrics)
+        paths = profile_paths(tmp_dir)
+    try:
+        counts = sorted(set([1] + [2**i for i in xrange(1, 16) if 2**i <= args.max_processes] + [args.max_processes]))
+        print "%d profile files" % len(paths)
+        print "%-9s %10s %8s" % ('processes', 'median(s)', 'speedup')
+        baseline = None
+        for processes in counts:
+            times = []
+            for _ in xrange(args.repeat):
+                start = time.time()
+                prof = profile.load(paths, processes=processes)
+                times.append(time.time() - start)
+            median = sorted(times)[args.repeat // 2]
+            baseline = baseline or median
+            print "%-9d %10.3f %7.2fx" % (processes, median, baseline / median)
+        print "%d rows, %d functions, %d threads, %d metrics" % (len(prof), len(prof.functions), 
+                                                                 len(prof.threads), len(prof.metrics))
+        cache_dir = tempfile.mkdtemp()
+        try:
+            cache.write(prof, cache_dir, paths)
+            start = time.time()
+            cached = cache.read(cache_dir, paths)
+            loaded = time.time() - start
+            start = time.time()
+            column = cached.exclusive[cached.metrics[0]]
+            print "cached load %.3fs, first %s column (%d values) %.3fs" % (loaded, cached.metrics[0], len(column), 
+                                                                            time.time() - start)
+        finally:
+            shutil.rmtree(cache_dir)
+    finally:
+        if tmp_dir:
+            shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
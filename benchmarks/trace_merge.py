@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Measure the speed of merging TAU trace files with tau.cf.trace.merge.
+
+Merges a trial's per-thread trace files and reports the median wall clock time, throughput,
+and peak memory use.  If ``tau_treemerge.pl`` is in PATH then the same trace files are also 
+merged with it for comparison.  With a directory, merges the trace files in that directory, e.g.::
+
+    python benchmarks/trace_merge.py .tau/myproject/.../0
+
+Without a directory, writes a synthetic trace to a temporary directory first.
+"""
+
+import os
+import sys
+import time
+import shutil
+import struct
+import argparse
+import resource
+import tempfile
+import subprocess
+
+HERE = os.path.realpath(os.path.dirname(__file__))
+
+sys.path.insert(0, os.path.join(HERE, '..', 'packages'))
+
+from tau import util                    # pylint: disable=wrong-import-position
+from tau.cf import trace                # pylint: disable=wrong-import-position
+from tau.cf.trace import merge          # pylint: disable=wrong-import-position
+
+
+def write_trial(prefix, nodes, threads, records, events):
+    record = struct.Struct('<' + trace.RECORD_FORMAT)
+    for node in xrange(nodes):
+        with open(os.path.join(prefix, 'events.%d.edf' % node), 'w') as fout:
+            fout.write('%d dynamic_trace_events\n' % (events + 1))
+            fout.write(trace.EDF_HEADER)
+            fout.write('%d TRACER 0 "EV_INIT" none\n' % trace.EV_INIT)
+            # Rotate identifiers so every node but the first needs its records rewritten
+            for i in xrange(events):
+                fout.write('%d TAU_USER 0 "void kernel_%d(double *, int) " EntryExit\n' % (1 + (i + node) % events, i))
+        for thread in xrange(threads):
+            path = os.path.join(prefix, 'tautrace.%d.0.%d.trc' % (node, thread))
+            with open(path, 'wb') as fout:
+                fout.write(record.pack(trace.EV_INIT, node, thread, 3, 0))
+                timestamp = node * 7 + thread
+                for i in xrange(records - 1):
+                    timestamp += 1 + (i * 2654435761 + node) % 13
+                    fout.write(record.pack(1 + i % events, node, thread, 1 if i % 2 else -1, timestamp))
+
+
+def median_time(func, repeat):
+    times = []
+    for _ in xrange(repeat):
+        start = time.time()
+        func()
+        times.append(time.time() - start)
+    return sorted(times)[repeat // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=3, help="runs of each merge (default: 3)")
+    parser.add_argument('--nodes', type=int, default=64, help="nodes in the synthetic trace (default: 64)")
+    parser.add_argument('--threads', type=int, default=2, help="threads per node (default: 2)")
+    parser.add_argument('--records', type=int, default=20000, help="records per thread (default: 20000)")
+    parser.add_argument('--events', type=int, default=50, help="events defined per node (default: 50)")
+    parser.add_argument('--memory', type=int, default=merge.DEFAULT_MEMORY,
+                        help="bytes of records to buffer (default: %d)" % merge.DEFAULT_MEMORY)
+    parser.add_argument('trial_dir', nargs='?', help="directory containing trace files")
+    args = parser.parse_args()
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        if args.trial_dir:
+            prefix = args.trial_dir
+        else:
+            prefix = os.path.join(tmp_dir, 'trial')
+            os.makedirs(prefix)
+            write_trial(prefix, args.nodes, args.threads, args.records, args.events)
+        files = trace.trace_files(prefix)
+        size = sum(os.path.getsize(path) for _, _, _, path in files)
+        print "%d trace files, %.1f MB" % (len(files), size / 1e6)
+        output = os.path.join(tmp_dir, 'native')
+        os.makedirs(output)
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        counts = []
+        median = median_time(lambda: counts.append(merge.merge(prefix, output, memory=args.memory)), args.repeat)
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        print "%-16s %10s %12s" % ('merge', 'median(s)', 'records/s')
+        print "%-16s %10.3f %12.0f" % ('tau.cf.trace', median, counts[0] / median)
+        print "peak RSS growth %.1f MB" % ((rss_after - rss_before) / 1024.0)
+        if util.which('tau_treemerge.pl'):
+            perl_dir = os.path.join(tmp_dir, 'perl')
+            def treemerge():
+                shutil.rmtree(perl_dir, ignore_errors=True)
+                os.makedirs(perl_dir)
+                for _, _, _, path in files:
+                    os.symlink(os.path.abspath(path), os.path.join(perl_dir, os.path.basename(path)))
+                for node in set(node for node, _, _, _ in files):
+                    edf = trace.edf_path(prefix, node)
+                    os.symlink(os.path.abspath(edf), os.path.join(perl_dir, os.path.basename(edf)))
+                with open(os.devnull, 'w') as devnull:
+                    subprocess.check_call(['tau_treemerge.pl'], cwd=perl_dir, stdout=devnull, stderr=devnull)
+            perl_median = median_time(treemerge, args.repeat)
+            print "%-16s %10.3f %12.0f" % ('tau_treemerge.pl', perl_median, counts[0] / perl_median)
+            perl_trc = os.path.join(perl_dir, merge.MERGED_TRACE)
+            print "tau_treemerge.pl wrote %d records, tau.cf.trace wrote %d" % (
+                os.path.getsize(perl_trc) // trace.RECORD_SIZE, counts[0])
+        else:
+            print "tau_treemerge.pl not found in PATH, skipping comparison"
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,532 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""TAU profile data.
+
+Reads TAU profile files (``profile.<node>.<context>.<thread>``) directly so trials can be 
+analyzed without starting ``paraprof`` or ``pprof``.  A trial measuring more than one metric
+has one ``MULTI__<metric>`` directory of profile files per metric.
+
+Profile data is stored in columns, one row per function per thread, using :any:`array.array` 
+so a row costs a few dozen bytes no matter how long the function names are.  Function names
+and groups are stored once in a table and rows refer to them by index.  The columns support
+the buffer protocol, e.g. ``numpy.frombuffer(profile.calls, dtype=numpy.int64)`` gives a
+NumPy view of the calls column without copying.
+"""
+
+import os
+import re
+import multiprocessing
+from array import array
+from texttable import Texttable
+from tau import logger
+from tau.error import ConfigurationError
+from tau.cf import scheduler
+
+
+LOGGER = logger.get_logger(__name__)
+
+MULTI_PREFIX = 'MULTI__'
+"""str: Prefix of the names of directories containing profile files for one metric."""
+
+DEFAULT_METRIC = 'TIME'
+"""str: Metric measured by profile files that don't name their metric."""
+
+PARALLEL_MIN_FILES = 64
+"""int: Minimum number of profile files to parse with more than one process by default."""
+
+SHARD_MAX_FILES = 256
+"""int: Maximum number of profile files parsed by a worker process at once."""
+
+_PROFILE_FILE_RE = re.compile(r'^profile\.(-?\d+)\.(\d+)\.(\d+)$')
+
+_TEMPLATED_FUNCTIONS = 'templated_functions'
+
+_MULTI_TEMPLATED_FUNCTIONS = 'templated_functions_MULTI_'
+
+_GROUP_TAG = ' GROUP="'
+
+_VALUE_WIDTH = 9
+
+_FUNCTION_MIN_WIDTH = 24
+
+
+class ProfileError(ConfigurationError):
+    """Indicates that profile data could not be read."""
+
+
+def profile_file_thread(path):
+    """Gets the thread identifier from a profile file name.
+    
+    Args:
+        path (str): Path to a profile file, e.g. 'MULTI__TIME/profile.3.0.1'.
+        
+    Returns:
+        tuple: (node, context, thread) integers, or None if `path` isn't a profile file.
+    """
+    match = _PROFILE_FILE_RE.match(os.path.basename(path))
+    return tuple(int(x) for x in match.groups()) if match else None
+
+
+def _parse_count(value):
+    try:
+        return int(value)
+    except ValueError:
+        return int(float(value))
+
+
+def parse_profile_file(path):
+    """Reads the function data from a TAU profile file.
+    
+    Args:
+        path (str): Path to a profile file.
+        
+    Returns:
+        tuple: (metric, functions) where `metric` is the name of the measured metric and `functions`
+               is a list of (name, group, calls, subroutines, exclusive, inclusive) tuples.
+               
+    Raises:
+        ProfileError: `path` is not a valid TAU profile file.
+    """
+    functions = []
+    try:
+        with open(path) as fin:
+            count, _, kind = fin.readline().strip().partition(' ')
+            if kind.startswith(_MULTI_TEMPLATED_FUNCTIONS):
+                metric = kind[len(_MULTI_TEMPLATED_FUNCTIONS):]
+            elif kind == _TEMPLATED_FUNCTIONS:
+                metric = DEFAULT_METRIC
+            else:
+                raise ValueError("unknown profile type '%s'" % kind)
+            count = int(count)
+            # Column names and metadata
+            fin.readline()
+            for _ in xrange(count):
+                line = fin.readline().rstrip()
+                group_start = line.rfind(_GROUP_TAG)
+                if group_start < 0:
+                    group = ''
+                    group_start = len(line)
+                else:
+                    group = line[group_start+len(_GROUP_TAG):line.rindex('"')]
+                # The function name is quoted and may contain spaces
+                name, calls, subrs, excl, incl, _ = line[:group_start].rsplit(None, 5)
+                if name[0] != '"' or name[-1] != '"':
+                    raise ValueError("invalid function name %s" % name)
+                functions.append((name[1:-1], group, _parse_count(calls), _parse_count(subrs), 
+                                  float(excl), float(incl)))
+    except IOError as err:
+        raise ProfileError("Cannot read profile file '%s': %s" % (path, err))
+    except ValueError as err:
+        raise ProfileError("Invalid profile file '%s': %s" % (path, err))
+    return metric, functions
+
+
+class Profile(object):
+    """Profile data from all threads of a trial in columnar form.
+    
+    Rows are sorted by thread and each thread's rows are contiguous, see :any:`thread_rows`.
+    
+    Attributes:
+        metrics (list): Names of the measured metrics.
+        functions (list): Function names.
+        groups (list): Group names of each function in `functions`.
+        threads (list): (node, context, thread) tuples in ascending order.
+        thread (array): Index in `threads` of each row.
+        function (array): Index in `functions` of each row.
+        calls (array): Number of calls of each row.
+        subroutines (array): Number of subroutine calls of each row.
+        exclusive (dict): Exclusive values of each row indexed by metric name.
+        inclusive (dict): Inclusive values of each row indexed by metric name.
+        digest (str): Checksum of the profile files this data was read from, or None if unknown.
+                      Set by :any:`tau.cf.profile.cache`.
+    """
+
+    def __init__(self):
+        self.metrics = []
+        self.functions = []
+        self.groups = []
+        self.threads = []
+        self.thread = array('i')
+        self.function = array('i')
+        self.calls = array('l')
+        self.subroutines = array('l')
+        self.exclusive = {}
+        self.inclusive = {}
+        self._function_index = {}
+        self._thread_offsets = array('l', [0])
+        self.digest = None
+
+    def __len__(self):
+        return len(self.function)
+
+    def function_index(self, name, group=''):
+        """Gets the index of a function in the function table, adding the function if necessary.
+        
+        Args:
+            name (str): Function name.
+            group (str): Function group, used only if the function is added.
+            
+        Returns:
+            int: Index in :any:`functions`.
+        """
+        try:
+            return self._function_index[name]
+        except KeyError:
+            idx = self._function_index[name] = len(self.functions)
+            self.functions.append(name)
+            self.groups.append(group)
+            return idx
+
+    def thread_rows(self, idx):
+        """Gets the rows of a thread.
+        
+        Args:
+            idx (int): Index in :any:`threads`.
+            
+        Returns:
+            xrange: Row numbers.
+        """
+        return xrange(self._thread_offsets[idx], self._thread_offsets[idx+1])
+
+    def column(self, name, metric=None):
+        """Gets a column by name.
+        
+        Args:
+            name (str): One of 'calls', 'subroutines', 'exclusive', or 'inclusive'.
+            metric (str): Metric name for 'exclusive' and 'inclusive'.  Defaults to the first metric.
+            
+        Returns:
+            array: The column.
+        """
+        if name in ('exclusive', 'inclusive'):
+            return getattr(self, name)[metric or self.metrics[0]]
+        elif name in ('calls', 'subroutines'):
+            return getattr(self, name)
+        raise KeyError(name)
+
+    def function_totals(self, name, metric=None):
+        """Sums a column over all threads.
+        
+        Args:
+            name (str): Column name, see :any:`column`.
+            metric (str): Metric name, see :any:`column`.
+            
+        Returns:
+            array: Total of column `name` for each function in :any:`functions`.
+        """
+        values = self.column(name, metric)
+        totals = array('d', [0.0]) * len(self.functions)
+        for func, value in zip(self.function, values):
+            totals[func] += value
+        return totals
+
+    def _global_functions(self, names, groups):
+        """Maps a shard's function table to :any:`functions`, adding functions as needed."""
+        return array('i', [self.function_index(name, group) for name, group in zip(names, groups)])
+
+    def append_shard(self, shard):
+        """Adds the rows of new threads from the first metric's profile files.
+        
+        Args:
+            shard (ProfileShard): Parsed profile files of threads greater than any existing thread.
+        """
+        metric = self.metrics[0]
+        global_funcs = self._global_functions(shard.names, shard.groups)
+        for thread, count in zip(shard.threads, shard.counts):
+            self.thread.extend(array('i', [len(self.threads)]) * count)
+            self.threads.append(thread)
+            self._thread_offsets.append(self._thread_offsets[-1] + count)
+        self.function.extend(array('i', [global_funcs[func] for func in shard.function]))
+        self.calls.extend(shard.calls)
+        self.subroutines.extend(shard.subroutines)
+        self.exclusive[metric].extend(shard.exclusive)
+        self.inclusive[metric].extend(shard.inclusive)
+
+    def set_shard_metric(self, shard, metric, thread_index):
+        """Sets the values of another metric for existing threads.
+        
+        Args:
+            shard (ProfileShard): Parsed profile files of existing threads.
+            metric (str): Metric name.
+            thread_index (dict): Index in :any:`threads` of each (node, context, thread) identifier.
+        """
+        global_funcs = [self._function_index.get(name, -1) for name in shard.names]
+        function = array('i', [global_funcs[func] for func in shard.function])
+        excl, incl = self.exclusive[metric], self.inclusive[metric]
+        start = 0
+        for thread, count in zip(shard.threads, shard.counts):
+            end = start + count
+            idx = thread_index.get(thread)
+            if idx is None:
+                LOGGER.warning("Ignoring thread %s %s data: thread has no %s data", thread, metric, self.metrics[0])
+                start = end
+                continue
+            first, last = self._thread_offsets[idx], self._thread_offsets[idx+1]
+            if function[start:end] == self.function[first:last]:
+                # Usually every metric lists the same functions in the same order
+                excl[first:last] = shard.exclusive[start:end]
+                incl[first:last] = shard.inclusive[start:end]
+                start = end
+                continue
+            rows = dict((self.function[row], row) for row in xrange(first, last))
+            for pos in xrange(start, end):
+                row = rows.get(function[pos])
+                if row is None:
+                    LOGGER.debug("Ignoring %s data for '%s' on thread %s: not in %s data", 
+                                 metric, shard.names[shard.function[pos]], thread, self.metrics[0])
+                    continue
+                excl[row] = shard.exclusive[pos]
+                incl[row] = shard.inclusive[pos]
+            start = end
+
+    def add_metric(self, metric):
+        """Adds a metric to the profile.
+        
+        The first metric's profile files define the rows so threads must be added with :any:`append_shard`
+        after the first metric is added.  Values of later metrics are initially zero.
+        
+        Args:
+            metric (str): Metric name.
+        """
+        self.metrics.append(metric)
+        self.exclusive[metric] = array('d', [0.0]) * len(self)
+        self.inclusive[metric] = array('d', [0.0]) * len(self)
+
+
+class ProfileShard(object):
+    """Profile data parsed from some of the profile files of one metric.
+    
+    Shards are parsed by worker processes so they are sent between processes as a few strings
+    rather than as lists of Python objects.  See :any:`parse_shard`.
+    
+    Attributes:
+        metric (str): Metric name.
+        threads (list): (node, context, thread) identifier of each file.
+        counts (array): Number of rows from each file.
+        names (list): Names of the functions in this shard.
+        groups (list): Group of each function in `names`.
+        function (array): Index in `names` of each row.
+        calls (array): Number of calls of each row.
+        subroutines (array): Number of subroutine calls of each row.
+        exclusive (array): Exclusive value of each row.
+        inclusive (array): Inclusive value of each row.
+    """
+    
+    _ARRAYS = (('counts', 'i'), ('function', 'i'), ('calls', 'l'), ('subroutines', 'l'), 
+               ('exclusive', 'd'), ('inclusive', 'd'))
+
+    def __init__(self):
+        self.metric = None
+        self.threads = []
+        self.names = []
+        self.groups = []
+        for attr, typecode in self._ARRAYS:
+            setattr(self, attr, array(typecode))
+
+    def __getstate__(self):
+        state = dict((attr, getattr(self, attr).tostring()) for attr, _ in self._ARRAYS)
+        state.update(metric=self.metric, threads=self.threads, names=self.names, groups=self.groups)
+        return state
+
+    def __setstate__(self, state):
+        self.metric = state['metric']
+        self.threads = state['threads']
+        self.names = state['names']
+        self.groups = state['groups']
+        for attr, typecode in self._ARRAYS:
+            setattr(self, attr, array(typecode, state[attr]))
+
+
+def parse_shard(files):
+    """Parses profile files of one metric into a :any:`ProfileShard`.
+    
+    Args:
+        files (list): (thread, path) tuples where `thread` is a (node, context, thread) identifier.
+        
+    Returns:
+        ProfileShard: Profile data from all files.
+        
+    Raises:
+        ProfileError: A profile file is invalid or the files do not all measure the same metric.
+    """
+    shard = ProfileShard()
+    local_index = {}
+    for thread, path in files:
+        metric, functions = parse_profile_file(path)
+        if shard.metric is None:
+            shard.metric = metric
+        elif metric != shard.metric:
+            raise ProfileError("Profile file '%s' measures %s, expected %s" % (path, metric, shard.metric))
+        shard.threads.append(thread)
+        shard.counts.append(len(functions))
+        for name, group, calls, subrs, exclusive, inclusive in functions:
+            try:
+                func = local_index[name]
+            except KeyError:
+                func = local_index[name] = len(shard.names)
+                shard.names.append(name)
+                shard.groups.append(group)
+            shard.function.append(func)
+            shard.calls.append(calls)
+            shard.subroutines.append(subrs)
+            shard.exclusive.append(exclusive)
+            shard.inclusive.append(inclusive)
+    return shard
+
+
+def _parse_shard_worker(files):
+    # Exceptions with extra constructor arguments can't be unpickled so return errors as strings
+    try:
+        return parse_shard(files), None
+    except ProfileError as err:
+        return None, err.value
+
+
+def _metric_dirs(paths):
+    """Groups profile files by directory, i.e. by metric, and sorts them by thread."""
+    dirs = {}
+    for path in paths:
+        thread = profile_file_thread(path)
+        if thread is None:
+            LOGGER.debug("Skipping '%s': not a TAU profile file", path)
+            continue
+        dirs.setdefault(os.path.dirname(path), []).append((thread, path))
+    # Put a TIME directory first if there is one
+    def key(path):
+        name = os.path.basename(path)
+        return (name not in (MULTI_PREFIX + DEFAULT_METRIC, ''), name)
+    return [(path, sorted(dirs[path])) for path in sorted(dirs, key=key)]
+
+
+def _default_processes(nfiles):
+    if nfiles < PARALLEL_MIN_FILES:
+        return 1
+    return len(scheduler.allowed_cpus())
+
+
+def _shards(files, processes):
+    """Splits files into contiguous shards, several per process so workers stay busy."""
+    if processes <= 1:
+        return [files]
+    size = min(SHARD_MAX_FILES, max(1, -(-len(files) // (processes * 4))))
+    return [files[i:i+size] for i in xrange(0, len(files), size)]
+
+
+def load(paths, processes=None):
+    """Reads profile files into a :any:`Profile`.
+    
+    Large trials are parsed by a pool of worker processes, each parsing shards of files 
+    into compact arrays (see :any:`ProfileShard`) that are merged in order into the
+    :any:`Profile` as they arrive.
+    
+    Args:
+        paths (list): Paths to profile files, e.g. from :any:`Trial.profile_files`.  Paths that 
+                      are not TAU profile files, e.g. ``tauprofile.xml``, are ignored.
+        processes (int): Number of worker processes.  If None, use one worker per available CPU
+                         if there are at least :any:`PARALLEL_MIN_FILES` files.  If 1, parse files
+                         in this process.
+                      
+    Returns:
+        Profile: Profile data from all files.
+        
+    Raises:
+        ProfileError: No profile files were given or a profile file is invalid.
+    """
+    metric_dirs = _metric_dirs(paths)
+    if not metric_dirs:
+        raise ProfileError("No TAU profile files found")
+    if processes is None:
+        processes = _default_processes(sum(len(files) for _, files in metric_dirs))
+    pool = multiprocessing.Pool(processes) if processes > 1 else None
+    try:
+        profile = Profile()
+        thread_index = None
+        for path, files in metric_dirs:
+            LOGGER.debug("Reading %d profile files from '%s' with %d processes", len(files), path, processes)
+            shards = _shards(files, processes)
+            if pool:
+                results = pool.imap(_parse_shard_worker, shards)
+            else:
+                results = (_parse_shard_worker(shard) for shard in shards)
+            metric = None
+            for shard, error in results:
+                if error:
+                    raise ProfileError(error)
+                if metric is None:
+                    metric = shard.metric
+                    if metric in profile.exclusive:
+                        raise ProfileError("Metric '%s' found in more than one directory" % metric)
+                    profile.add_metric(metric)
+                elif shard.metric != metric:
+                    raise ProfileError("Profile files in '%s' measure both %s and %s" % (path, metric, shard.metric))
+                if thread_index is None:
+                    profile.append_shard(shard)
+                else:
+                    profile.set_shard_metric(shard, metric, thread_index)
+            thread_index = dict((thread, idx) for idx, thread in enumerate(profile.threads))
+    finally:
+        if pool:
+            pool.terminate()
+            pool.join()
+    return profile
+
+
+def text_table(columns):
+    """Creates a text table for a report with one row per function.
+    
+    The first column holds function names and gets whatever width the terminal leaves over.
+    The other columns hold values and are right-aligned.
+    
+    Args:
+        columns (list): Column headings, starting with the function name column.
+        
+    Returns:
+        Texttable: The table, ready for rows to be added.
+    """
+    nvalues = len(columns) - 1
+    # Numbers don't wrap well so make the table wider than the terminal if it's narrow
+    function_width = max(_FUNCTION_MIN_WIDTH, logger.LINE_WIDTH - nvalues * (_VALUE_WIDTH + 3) - 4)
+    table = Texttable(0)
+    table.set_cols_width([function_width] + [_VALUE_WIDTH] * nvalues)
+    table.set_cols_align(['l'] + ['r'] * nvalues)
+    table.set_cols_dtype(['t'] * len(columns))
+    table.set_deco(Texttable.HEADER | Texttable.VLINES)
+    table.header(columns)
+    return table
+
+
+def format_header(header):
+    """Formats the items that identify a report as a title line, e.g. {'trial': 0} becomes "Trial 0".
+    
+    Args:
+        header (dict): Items to show in the title.
+        
+    Returns:
+        str: The title.
+    """
+    return ', '.join('%s %s' % item for item in sorted(header.iteritems())).capitalize()
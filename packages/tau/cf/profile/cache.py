@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Binary cache of parsed profile data.
+
+Parsing thousands of text profile files is slow, so the parsed :any:`Profile` is saved in a 
+binary file in the trial directory.  The cache file starts with a JSON header holding the
+function table, thread table, and a checksum of the names, sizes, and modification times of
+the profile files it was made from.  The header is followed by the raw contents of each column.  
+
+The cache is opened with :any:`mmap.mmap` and only the header is read when the cache is loaded,
+so loading takes milliseconds no matter how big the trial is.  Each column is copied out of the
+mapping the first time it is used.  The cache is ignored and rewritten if any profile file has 
+been added, removed, or modified since the cache was written or if the cache was written on a 
+machine with a different byte order or word size.
+"""
+
+import os
+import sys
+import json
+import mmap
+import struct
+import hashlib
+from array import array
+from tau import logger
+from tau.cf.profile import Profile, profile_file_thread, load as load_profile
+
+
+LOGGER = logger.get_logger(__name__)
+
+CACHE_FILE = '.profile_cache'
+"""str: Name of the profile cache file in the trial directory."""
+
+_MAGIC = 'TAUPROFILECACHE\x01'
+
+_HEADER_SIZE = struct.Struct('<Q')
+
+_ALIGN = 8
+
+_COLUMNS = (('thread', 'i'), ('function', 'i'), ('calls', 'l'), ('subroutines', 'l'), ('_thread_offsets', 'l'))
+
+
+def _machine():
+    return [sys.byteorder] + [array(typecode).itemsize for typecode in 'ild']
+
+
+def _files_digest(prefix, paths):
+    """Checksums the relative path, size, and modification time of each profile file."""
+    digest = hashlib.sha1()
+    # Profile files are in a few directories so only compute relative directory paths once
+    reldirs = {}
+    for path in sorted(paths):
+        stat = os.stat(path)
+        dirname, basename = os.path.split(path)
+        try:
+            reldir = reldirs[dirname]
+        except KeyError:
+            reldir = reldirs[dirname] = os.path.relpath(dirname, prefix)
+        digest.update('%s\0%s\0%d\0%r\n' % (reldir, basename, stat.st_size, stat.st_mtime))
+    return digest.hexdigest()
+
+
+def _to_json(obj):
+    # Function names are bytes in no particular encoding so map each byte to one character
+    return json.dumps(obj, encoding='latin-1')
+
+
+def _bytes(strings):
+    return [string.encode('latin-1') for string in strings]
+
+
+class _MappedColumns(dict):
+    """Dictionary of columns that are copied out of the cache file when first used."""
+
+    def __init__(self, mapping, columns):
+        super(_MappedColumns, self).__init__()
+        self._mapping = mapping
+        self._columns = columns
+
+    def __missing__(self, key):
+        typecode, offset, count = self._columns[key]
+        column = array(str(typecode))
+        column.fromstring(buffer(self._mapping, offset, count * column.itemsize))
+        self[key] = column
+        return column
+
+    def __iter__(self):
+        return iter(self._columns)
+
+    def keys(self):
+        return list(self._columns)
+
+    def iterkeys(self):
+        return iter(self._columns)
+
+    def itervalues(self):
+        return (self[key] for key in self._columns)
+
+    def iteritems(self):
+        return ((key, self[key]) for key in self._columns)
+
+    def values(self):
+        return list(self.itervalues())
+
+    def items(self):
+        return list(self.iteritems())
+
+    def __contains__(self, key):
+        return key in self._columns
+
+    def __len__(self):
+        return len(self._columns)
+
+
+class _MappedProfile(Profile):
+    """A :any:`Profile` read from a cache file.  Columns are read from the file when first used."""
+
+    def __init__(self, mapping, header):
+        super(_MappedProfile, self).__init__()
+        self.metrics = _bytes(header['metrics'])
+        self.functions = _bytes(header['functions'])
+        self.groups = _bytes(header['groups'])
+        self.threads = [tuple(thread) for thread in header['threads']]
+        self.digest = str(header['files'])
+        self._function_index = dict((name, idx) for idx, name in enumerate(self.functions))
+        columns = header['columns']
+        self._columns = _MappedColumns(mapping, columns)
+        for attr, _ in _COLUMNS:
+            delattr(self, attr)
+        self.exclusive = _MappedColumns(mapping, dict((metric.encode('latin-1'), columns['exclusive/' + metric]) 
+                                                      for metric in header['metrics']))
+        self.inclusive = _MappedColumns(mapping, dict((metric.encode('latin-1'), columns['inclusive/' + metric]) 
+                                                      for metric in header['metrics']))
+
+    def __getattr__(self, attr):
+        # Only called for attributes that aren't set, i.e. columns that haven't been used yet
+        if attr.startswith('__') or attr == '_columns':
+            raise AttributeError(attr)
+        try:
+            column = self._columns[attr]
+        except KeyError:
+            raise AttributeError(attr)
+        setattr(self, attr, column)
+        return column
+
+
+def _align(offset):
+    return -(-offset // _ALIGN) * _ALIGN
+
+
+def write(profile, prefix, paths):
+    """Writes a profile cache file.
+    
+    The cache file is written to a temporary file and renamed so readers never see a partial file.
+    
+    Args:
+        profile (Profile): Profile data read from `paths`.
+        prefix (str): Directory to contain the cache file, e.g. :any:`Trial.prefix`.
+        paths (list): Paths to the profile files `profile` was read from.  :any:`Profile.digest` is set
+                      to a checksum of these files.
+    """
+    columns = [(name, getattr(profile, name)) for name, _ in _COLUMNS]
+    for metric in profile.metrics:
+        columns.append(('exclusive/' + metric, profile.exclusive[metric]))
+        columns.append(('inclusive/' + metric, profile.inclusive[metric]))
+    # Column offsets are relative to the end of the header
+    layout = {}
+    offset = 0
+    for name, column in columns:
+        layout[name] = [column.typecode, offset, len(column)]
+        offset = _align(offset + len(column) * column.itemsize)
+    profile.digest = _files_digest(prefix, paths)
+    header = _to_json({'machine': _machine(),
+                       'files': profile.digest,
+                       'metrics': profile.metrics,
+                       'functions': profile.functions,
+                       'groups': profile.groups,
+                       'threads': profile.threads,
+                       'columns': layout})
+    data_start = _align(len(_MAGIC) + _HEADER_SIZE.size + len(header))
+    path = os.path.join(prefix, CACHE_FILE)
+    tmp_path = '%s.%d.tmp' % (path, os.getpid())
+    with open(tmp_path, 'wb') as fout:
+        fout.write(_MAGIC)
+        fout.write(_HEADER_SIZE.pack(len(header)))
+        fout.write(header)
+        for name, column in columns:
+            fout.seek(data_start + layout[name][1])
+            column.tofile(fout)
+        fout.truncate(data_start + offset)
+    os.rename(tmp_path, path)
+    LOGGER.debug("Wrote profile cache '%s'", path)
+
+
+def read(prefix, paths):
+    """Reads a profile cache file.
+    
+    Args:
+        prefix (str): Directory containing the cache file, e.g. :any:`Trial.prefix`.
+        paths (list): Paths to the profile files the cache should have been made from.
+        
+    Returns:
+        Profile: Profile data from the cache, or None if there is no cache or the cache is out of date.
+    """
+    path = os.path.join(prefix, CACHE_FILE)
+    try:
+        with open(path, 'rb') as fin:
+            mapping = mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ)
+    except (IOError, OSError, ValueError) as err:
+        LOGGER.debug("Cannot open profile cache '%s': %s", path, err)
+        return None
+    try:
+        if mapping[:len(_MAGIC)] != _MAGIC:
+            raise ValueError("not a profile cache")
+        header_start = len(_MAGIC) + _HEADER_SIZE.size
+        header_size = _HEADER_SIZE.unpack(mapping[len(_MAGIC):header_start])[0]
+        header = json.loads(mapping[header_start:header_start+header_size])
+        if header['machine'] != _machine():
+            raise ValueError("written on a different kind of machine")
+        if header['files'] != _files_digest(prefix, paths):
+            raise ValueError("profile files have changed")
+        data_start = _align(header_start + header_size)
+        for entry in header['columns'].itervalues():
+            entry[1] += data_start
+            if entry[1] + entry[2] * array(str(entry[0])).itemsize > len(mapping):
+                raise ValueError("truncated")
+    except (ValueError, KeyError, TypeError, struct.error, OSError) as err:
+        LOGGER.debug("Ignoring profile cache '%s': %s", path, err)
+        mapping.close()
+        return None
+    LOGGER.debug("Read profile cache '%s'", path)
+    return _MappedProfile(mapping, header)
+
+
+def load(prefix, paths, processes=None):
+    """Reads profile data from the cache, or from the profile files if the cache is out of date.
+    
+    If the profile files are read then the cache is updated.
+    
+    Args:
+        prefix (str): Directory containing the cache file, e.g. :any:`Trial.prefix`.
+        paths (list): Paths to profile files, see :any:`tau.cf.profile.load`.
+        processes (int): Number of processes used to read profile files, see :any:`tau.cf.profile.load`.
+        
+    Returns:
+        Profile: Profile data.
+        
+    Raises:
+        ProfileError: No profile files were given or a profile file is invalid.
+    """
+    paths = [path for path in paths if profile_file_thread(path)]
+    profile = read(prefix, paths)
+    if profile is None:
+        profile = load_profile(paths, processes=processes)
+        try:
+            write(profile, prefix, paths)
+        except (IOError, OSError) as err:
+            LOGGER.debug("Cannot write profile cache in '%s': %s", prefix, err)
+    return profile
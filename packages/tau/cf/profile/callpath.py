@@ -0,0 +1,361 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Call trees built from callpath profiles.
+
+When a measurement records callpaths TAU names callpath timers like ``main => solve => exchange``.  
+A :any:`CallTree` is a trie of those names with one node per callpath.  Frame names are interned and 
+nodes are numbered so that every node's parent has a smaller number than the node.  Node values are 
+stored in typed arrays indexed by node number and summed over all threads.
+
+TAU limits callpaths to the last ``TAU_CALLPATH_DEPTH`` frames so a deep callpath may appear under the 
+root node without its outermost frames.
+"""
+
+import re
+from array import array
+from itertools import izip
+from tau import logger
+from tau.cf.profile import ProfileError, DEFAULT_METRIC, format_header
+
+
+LOGGER = logger.get_logger(__name__)
+
+SEPARATOR = ' => '
+"""str: Separates frame names in normalized callpath names."""
+
+COLUMNS = ('exclusive', 'inclusive', 'calls')
+"""tuple: Values of each call tree node."""
+
+
+_SEPARATOR_RE = re.compile(r'\s*=>\s*')
+
+
+def _normalize(name):
+    name = name.strip()
+    # TAU usually writes normalized names and checking is much faster than substituting
+    if (name.count('=>') == name.count(SEPARATOR) and 
+            ' ' + SEPARATOR not in name and SEPARATOR + ' ' not in name):
+        return name
+    return _SEPARATOR_RE.sub(SEPARATOR, name)
+
+
+def split_callpath(name):
+    """Splits a TAU callpath timer name into frame names.
+    
+    Args:
+        name (str): Timer name, e.g. ``main  => solve``.
+        
+    Returns:
+        list: Frame names from outermost to innermost, e.g. ['main', 'solve'].
+    """
+    return [part.strip() for part in name.split('=>')]
+
+
+class CallTree(object):
+    """A trie of callpaths.
+    
+    Attributes:
+        frames (list): Interned frame names.
+        parent (array): Parent node number of each node.  The root node's parent is -1.
+        frame (array): Index in :any:`frames` of each node's frame name.  The root node's frame is -1.
+        exclusive (array): Exclusive value of each node.
+        inclusive (array): Inclusive value of each node.
+        calls (array): Number of calls of each node.
+    """
+    
+    ROOT = 0
+    """int: Root node number.  The root node has no frame or values of its own."""
+
+    def __init__(self):
+        self.frames = []
+        self.parent = array('i', [-1])
+        self.frame = array('i', [-1])
+        self.exclusive = array('d', [0.0])
+        self.inclusive = array('d', [0.0])
+        self.calls = array('d', [0.0])
+        self._frame_index = {}
+        self._child_index = {}
+
+    def __len__(self):
+        return len(self.parent)
+
+    def frame_id(self, name):
+        """Gets the index of a frame name in :any:`frames`, adding the name if necessary."""
+        try:
+            return self._frame_index[name]
+        except KeyError:
+            idx = self._frame_index[name] = len(self.frames)
+            self.frames.append(name)
+            return idx
+
+    def child(self, parent, name):
+        """Gets the number of a node's child, adding the child if necessary.
+        
+        Args:
+            parent (int): Parent node number.
+            name (str): Child's frame name.
+            
+        Returns:
+            int: Child node number.
+        """
+        frame = self.frame_id(name)
+        key = (parent << 32) | frame
+        # Most lookups add a node when building a tree so don't use exceptions
+        node = self._child_index.get(key)
+        if node is None:
+            node = self._child_index[key] = len(self.parent)
+            self.parent.append(parent)
+            self.frame.append(frame)
+            self.exclusive.append(0.0)
+            self.inclusive.append(0.0)
+            self.calls.append(0.0)
+        return node
+
+    def node(self, frames):
+        """Gets the number of a callpath's node, adding nodes as necessary.
+        
+        Args:
+            frames (list): Frame names from outermost to innermost, see :any:`split_callpath`.
+            
+        Returns:
+            int: Node number.
+        """
+        node = self.ROOT
+        for name in frames:
+            node = self.child(node, name)
+        return node
+
+    def name(self, node):
+        """Gets a node's frame name."""
+        return self.frames[self.frame[node]] if node != self.ROOT else ''
+
+    def path(self, node):
+        """Gets a node's frame names from outermost to innermost."""
+        frames = []
+        while node != self.ROOT:
+            frames.append(self.frames[self.frame[node]])
+            node = self.parent[node]
+        frames.reverse()
+        return frames
+
+    def children(self):
+        """Gets the children of every node.
+        
+        Returns:
+            tuple: (offsets, nodes) arrays where the children of node ``i`` are ``nodes[offsets[i]:offsets[i+1]]``.
+        """
+        nnodes = len(self.parent)
+        offsets = array('i', [0]) * (nnodes + 1)
+        for parent in self.parent[1:]:
+            offsets[parent + 2] += 1
+        for node in xrange(2, nnodes + 1):
+            offsets[node] += offsets[node - 1]
+        nodes = array('i', [0]) * (nnodes - 1)
+        for node in xrange(1, nnodes):
+            slot = offsets[self.parent[node] + 1]
+            nodes[slot] = node
+            offsets[self.parent[node] + 1] = slot + 1
+        return offsets, nodes
+
+    def rollup(self, column='exclusive'):
+        """Sums a column over every node's subtree.
+        
+        The rollup of the exclusive column is each node's inclusive value reconstructed from the tree,
+        which is available even for nodes TAU did not measure, e.g. the root node.
+        
+        Args:
+            column (str): Column name, see :any:`COLUMNS`.
+            
+        Returns:
+            array: Subtree total of each node.
+        """
+        totals = array('d', getattr(self, column))
+        parent = self.parent
+        for node in xrange(len(totals) - 1, 0, -1):
+            totals[parent[node]] += totals[node]
+        return totals
+
+    def prune(self, threshold):
+        """Removes small subtrees.
+        
+        A node is kept if its subtree's exclusive total is at least `threshold` times the whole tree's 
+        exclusive total.  The exclusive totals of removed subtrees are added to their parent's exclusive 
+        value so the tree's total does not change.
+        
+        Args:
+            threshold (float): Fraction of the tree's total, e.g. 0.01 for 1%.
+            
+        Returns:
+            CallTree: A new call tree.
+        """
+        totals = self.rollup('exclusive')
+        limit = threshold * totals[self.ROOT]
+        pruned = CallTree()
+        pruned.frames = list(self.frames)
+        pruned._frame_index = dict(self._frame_index)
+        new_node = array('i', [self.ROOT]) + array('i', [-1]) * (len(self.parent) - 1)
+        for node in xrange(1, len(self.parent)):
+            parent = new_node[self.parent[node]]
+            if parent < 0:
+                continue
+            if totals[node] < limit:
+                pruned.exclusive[parent] += totals[node]
+                continue
+            new = new_node[node] = len(pruned.parent)
+            pruned._child_index[(parent << 32) | self.frame[node]] = new
+            pruned.parent.append(parent)
+            pruned.frame.append(self.frame[node])
+            pruned.exclusive.append(self.exclusive[node])
+            pruned.inclusive.append(self.inclusive[node])
+            pruned.calls.append(self.calls[node])
+        return pruned
+
+    def walk(self, order=None):
+        """Visits nodes in depth-first order.
+        
+        Args:
+            order (array): Sort key of each node.  Siblings are visited in ascending order of key.
+                           Default is node number order.
+        
+        Yields:
+            tuple: (node, depth) for each node except the root node.
+        """
+        offsets, nodes = self.children()
+        stack = [(self.ROOT, -1)]
+        while stack:
+            node, depth = stack.pop()
+            if node != self.ROOT:
+                yield node, depth
+            kids = nodes[offsets[node]:offsets[node + 1]]
+            # Last in, first out
+            if order is None:
+                kids = reversed(kids)
+            else:
+                kids = sorted(kids, key=order.__getitem__, reverse=True)
+            stack.extend((kid, depth + 1) for kid in kids)
+
+    def write_collapsed(self, stream, column='exclusive'):
+        """Writes the tree in collapsed stack format, e.g. for ``flamegraph.pl``.
+        
+        Each line is a callpath with frame names separated by semicolons followed by the node's value 
+        rounded to an integer.  Semicolons in frame names are replaced by colons.  Nodes with values that 
+        round to zero are omitted.
+        
+        Args:
+            stream (file): Output stream.
+            column (str): Column name, see :any:`COLUMNS`.
+        """
+        values = getattr(self, column)
+        names = [name.replace(';', ':').replace('\n', ' ') for name in self.frames]
+        stack = []
+        for node, depth in self.walk():
+            del stack[depth:]
+            stack.append(names[self.frame[node]])
+            value = int(round(values[node]))
+            if value > 0:
+                stream.write('%s %d\n' % (';'.join(stack), value))
+
+
+def build(profile, metric=None):
+    """Builds a call tree from profile data.
+    
+    Callpath timers are added to the tree.  Timers without callpaths are only added if they are the 
+    outermost frame of some callpath or if the profile has no callpath timers at all, since otherwise 
+    their values are already counted by callpath timers.
+    
+    Args:
+        profile (Profile): Profile data.
+        metric (str): Metric name.  Default is :any:`DEFAULT_METRIC` or the first metric in `profile`.
+        
+    Returns:
+        CallTree: The call tree.
+        
+    Raises:
+        ProfileError: `profile` has no `metric` data.
+    """
+    if metric is None:
+        metric = DEFAULT_METRIC if DEFAULT_METRIC in profile.metrics or not profile.metrics else profile.metrics[0]
+    if metric not in profile.metrics:
+        raise ProfileError("No %s data in profile" % metric, "Available metrics are %s" % ', '.join(profile.metrics))
+    keys = [_normalize(name) for name in profile.functions]
+    depths = [key.count(SEPARATOR) for key in keys]
+    roots = set(key.partition(SEPARATOR)[0] for key, depth in izip(keys, depths) if depth)
+    totals = [profile.function_totals(column, metric) for column in COLUMNS]
+    tree = CallTree()
+    columns = [getattr(tree, column) for column in COLUMNS]
+    node_of = {}
+    # Shorter callpaths first so each node's parent is usually already in node_of
+    for func in sorted(xrange(len(keys)), key=depths.__getitem__):
+        key = keys[func]
+        if not depths[func] and roots and key not in roots:
+            continue
+        node = node_of.get(key)
+        if node is None:
+            parent_key, _, name = key.rpartition(SEPARATOR)
+            if not parent_key:
+                parent = tree.ROOT
+            else:
+                parent = node_of.get(parent_key)
+                if parent is None:
+                    parent = tree.node(parent_key.split(SEPARATOR))
+            node = node_of[key] = tree.child(parent, name)
+        for values, column in izip(totals, columns):
+            column[node] += values[func]
+    return tree
+
+
+def _format_value(value):
+    return '%.4g' % value
+
+
+def write_tree(profile, stream, metric=None, threshold=0.01, header=None):
+    """Writes a pruned call tree as indented text.
+    
+    Siblings are listed in descending order of inclusive value.
+    
+    Args:
+        profile (Profile): Profile data.
+        stream (file): Output stream, e.g. :any:`sys.stdout`.
+        metric (str): Metric name.  Default is :any:`DEFAULT_METRIC` or the first metric in `profile`.
+        threshold (float): Omit subtrees smaller than this fraction of the total, see :any:`CallTree.prune`.
+        header (dict): Items to show in the title, e.g. {'trial': 0}.
+        
+    Raises:
+        ProfileError: `profile` has no `metric` data.
+    """
+    tree = build(profile, metric).prune(threshold)
+    inclusive = tree.rollup('exclusive')
+    order = array('d', [-value for value in inclusive])
+    if header:
+        stream.write(format_header(header) + '\n')
+    stream.write("%10s %10s %10s  %s\n" % ('Inclusive', 'Exclusive', 'Calls', 'Callpath'))
+    for node, depth in tree.walk(order):
+        stream.write("%10s %10s %10s  %s%s\n" % (_format_value(inclusive[node]), _format_value(tree.exclusive[node]), 
+                                                 _format_value(tree.calls[node]), '  ' * depth, tree.name(node)))
+    stream.write('\n')
+    stream.flush()
@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Trial to trial comparison of profile data.
+
+Functions are aligned across trials by name.  Callpath entries like ``main => solve`` are aligned by 
+their whole path, so a function is compared separately under each of its callers.  Each trial's value
+of a function is the function's value summed over all threads, or the mean over all threads, and 
+trials that never called a function count as zero.
+
+Each group of trials is compared to a baseline group.  A function has regressed if its value grew by 
+more than a relative threshold.  When both groups have repeated trials, Welch's t-test is used to decide 
+whether the change is statistically significant and only significant changes are regressions.
+"""
+
+import json
+import math
+from itertools import izip
+from tau import logger
+from tau.cf.profile import ProfileError, text_table
+
+
+LOGGER = logger.get_logger(__name__)
+
+AGGREGATES = ('total', 'mean')
+"""tuple: How a function's values in each thread are combined into a trial value."""
+
+VALUES = ('exclusive', 'inclusive', 'calls')
+"""tuple: Function values that may be compared."""
+
+CALLPATH_SEPARATOR = '=>'
+"""str: Separates function names in a TAU callpath entry."""
+
+
+def function_key(name):
+    """Gets the name used to align a function across trials.
+    
+    TAU's spacing around callpath separators varies so callpath entries are normalized.
+    
+    Args:
+        name (str): Function name from a profile.
+        
+    Returns:
+        str: Normalized function name.
+    """
+    if CALLPATH_SEPARATOR not in name:
+        return name.strip()
+    return (' %s ' % CALLPATH_SEPARATOR).join(part.strip() for part in name.split(CALLPATH_SEPARATOR))
+
+
+def trial_values(profile, metric, value='exclusive', aggregate='total'):
+    """Gets the value of each function in a trial.
+    
+    Args:
+        profile (Profile): The trial's profile data.
+        metric (str): Metric name.  Ignored if `value` is 'calls'.
+        value (str): Value to compare, see :any:`VALUES`.
+        aggregate (str): Combine thread values by 'total' or 'mean', see :any:`AGGREGATES`.
+        
+    Returns:
+        dict: Function values indexed by :any:`function_key`.
+        
+    Raises:
+        ProfileError: `profile` has no `metric` data.
+    """
+    if value != 'calls' and metric not in profile.metrics:
+        raise ProfileError("No %s data in profile" % metric, "Available metrics are %s" % ', '.join(profile.metrics))
+    totals = profile.function_totals(value, metric)
+    scale = 1.0 / max(1, len(profile.threads)) if aggregate == 'mean' else 1.0
+    values = {}
+    for name, total in izip(profile.functions, totals):
+        key = function_key(name)
+        values[key] = values.get(key, 0.0) + total * scale
+    return values
+
+
+def _continued_fraction(a, b, x):
+    """Evaluates the continued fraction of the incomplete beta function by the modified Lentz's method."""
+    tiny = 1.0e-300
+    qab, qap, qam = a + b, a + 1.0, a - 1.0
+    c, d = 1.0, 1.0 - qab * x / qap
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    result = d
+    for m in xrange(1, 300):
+        m2 = 2 * m
+        aa = m * (b - m) * x / ((qam + m2) * (a + m2))
+        d = 1.0 + aa * d
+        d = 1.0 / (d if abs(d) > tiny else tiny)
+        c = 1.0 + aa / c
+        c = c if abs(c) > tiny else tiny
+        result *= d * c
+        aa = -(a + m) * (qab + m) * x / ((a + m2) * (qap + m2))
+        d = 1.0 + aa * d
+        d = 1.0 / (d if abs(d) > tiny else tiny)
+        c = 1.0 + aa / c
+        c = c if abs(c) > tiny else tiny
+        delta = d * c
+        result *= delta
+        if abs(delta - 1.0) < 3.0e-14:
+            break
+    return result
+
+
+def _incomplete_beta(a, b, x):
+    """Evaluates the regularized incomplete beta function I_x(a, b)."""
+    if x <= 0.0:
+        return 0.0
+    if x >= 1.0:
+        return 1.0
+    front = math.exp(math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) + a * math.log(x) + b * math.log(1.0 - x))
+    if x < (a + 1.0) / (a + b + 2.0):
+        return front * _continued_fraction(a, b, x) / a
+    return 1.0 - front * _continued_fraction(b, a, 1.0 - x) / b
+
+
+def _mean_variance(samples):
+    mean = float(sum(samples)) / len(samples)
+    return mean, sum((sample - mean) ** 2 for sample in samples) / (len(samples) - 1)
+
+
+def welch_t_test(first, second):
+    """Tests whether two samples have different means without assuming they have equal variances.
+    
+    Args:
+        first (list): Values of the first sample.
+        second (list): Values of the second sample.
+        
+    Returns:
+        float: Two-sided p-value, or None if either sample has fewer than two values.
+    """
+    if len(first) < 2 or len(second) < 2:
+        return None
+    mean1, var1 = _mean_variance(first)
+    mean2, var2 = _mean_variance(second)
+    err1, err2 = var1 / len(first), var2 / len(second)
+    if err1 + err2 == 0:
+        return 1.0 if mean1 == mean2 else 0.0
+    tstat = (mean1 - mean2) / math.sqrt(err1 + err2)
+    dof = (err1 + err2) ** 2 / (err1 ** 2 / (len(first) - 1) + err2 ** 2 / (len(second) - 1))
+    return _incomplete_beta(0.5 * dof, 0.5, dof / (dof + tstat * tstat))
+
+
+def compare(baseline, trials, threshold=0.05, alpha=0.05):
+    """Compares each function's value in a group of trials to a group of baseline trials.
+    
+    Args:
+        baseline (list): Function values of each baseline trial from :any:`trial_values`.
+        trials (list): Function values of each compared trial from :any:`trial_values`.
+        threshold (float): Relative change, e.g. 0.05 for 5%, below which changes are ignored.
+        alpha (float): Significance level of the t-test used when both groups have repeated trials.
+        
+    Returns:
+        list: One dictionary per function in descending order of 'delta' with the function's 'function' name, 
+              mean 'baseline' and 'value' in each group, 'delta' (value minus baseline), 'ratio' (value over 
+              baseline, None if the baseline is zero), 'p_value' (None without repeated trials), 'status' 
+              ('added', 'removed', 'regressed', 'improved', or 'unchanged'), and 'regression' flag.
+    """
+    names = set()
+    for values in baseline:
+        names.update(values)
+    for values in trials:
+        names.update(values)
+    records = []
+    for name in names:
+        before = [values.get(name, 0.0) for values in baseline]
+        after = [values.get(name, 0.0) for values in trials]
+        before_mean = float(sum(before)) / len(before)
+        after_mean = float(sum(after)) / len(after)
+        delta = after_mean - before_mean
+        ratio = after_mean / before_mean if before_mean else None
+        p_value = welch_t_test(before, after)
+        changed = delta != 0 and (p_value is None or p_value < alpha)
+        if not any(name in values for values in baseline):
+            status = 'added'
+        elif not any(name in values for values in trials):
+            status = 'removed'
+        elif changed and ratio is not None and abs(ratio - 1.0) > threshold:
+            status = 'regressed' if delta > 0 else 'improved'
+        else:
+            status = 'unchanged'
+        records.append({'function': name, 'baseline': before_mean, 'value': after_mean, 'delta': delta, 
+                        'ratio': ratio, 'p_value': p_value, 'status': status, 'regression': status == 'regressed'})
+    records.sort(key=lambda record: record['delta'], reverse=True)
+    return records
+
+
+def _format_value(value):
+    return '-' if value is None else '%.4g' % value
+
+
+def format_table(records, title):
+    """Formats comparison records as a text table.
+    
+    Args:
+        records (list): Records from :any:`compare`.
+        title (str): Table title.
+        
+    Returns:
+        str: The table.
+    """
+    table = text_table(['Function', 'Baseline', 'Value', 'Delta', 'Ratio', 'p-value', 'Status'])
+    for record in records:
+        table.add_row([record['function']] + 
+                      [_format_value(record[key]) for key in ('baseline', 'value', 'delta', 'ratio', 'p_value')] + 
+                      [record['status']])
+    return '%s\n%s' % (title, table.draw())
+
+
+def write_report(baseline, groups, stream, metric, value='exclusive', aggregate='total', threshold=0.05, 
+                 alpha=0.05, count=20, output='text'):
+    """Compares groups of trials to a baseline group and writes the results to a stream.
+    
+    Only the profile data of one trial is loaded at a time so any number of trials may be compared.
+    JSON output is one JSON object per line per compared group listing every function.  Text output
+    lists the regressed functions and the functions with the largest changes.
+    
+    Args:
+        baseline (list): (trial number, profile loader) pairs of the baseline trials, where the profile loader
+                         is a callable returning the trial's :any:`Profile`, e.g. :any:`Trial.load_profile`.
+        groups (list): Lists of (trial number, profile loader) pairs of each group of compared trials.
+        stream (file): Output stream, e.g. :any:`sys.stdout`.
+        metric (str): Metric name.
+        value (str): Value to compare, see :any:`VALUES`.
+        aggregate (str): Combine thread values by 'total' or 'mean', see :any:`AGGREGATES`.
+        threshold (float): Relative change, e.g. 0.05 for 5%, below which changes are ignored.
+        alpha (float): Significance level of the t-test used when both groups have repeated trials.
+        count (int): Maximum number of functions to show in text output.
+        output (str): 'text' or 'json'.
+        
+    Returns:
+        int: Total number of regressed functions in all groups.
+    """
+    def load(group):
+        return [trial_values(loader(), metric, value, aggregate) for _, loader in group]
+    baseline_values = load(baseline)
+    baseline_numbers = [number for number, _ in baseline]
+    regressions = 0
+    for group in groups:
+        numbers = [number for number, _ in group]
+        records = compare(baseline_values, load(group), threshold, alpha)
+        regressed = [record for record in records if record['regression']]
+        regressions += len(regressed)
+        if output == 'json':
+            report = {'baseline': baseline_numbers, 'trials': numbers, 'metric': metric, 'value': value, 
+                      'aggregate': aggregate, 'threshold': threshold, 'alpha': alpha, 
+                      'regressions': len(regressed), 'functions': records}
+            stream.write(json.dumps(report, encoding='latin-1') + '\n')
+        else:
+            largest = sorted((record for record in records if not record['regression']), 
+                             key=lambda record: abs(record['delta']), reverse=True)
+            title = "Trials %s compared to baseline trials %s by %s %s %s: %d regressed functions" % (
+                ', '.join(str(num) for num in numbers), ', '.join(str(num) for num in baseline_numbers), 
+                aggregate, metric, value, len(regressed))
+            stream.write(format_table((regressed + largest)[:max(count, len(regressed))], title) + '\n\n')
+        stream.flush()
+    return regressions
@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Load imbalance analysis of profile data.
+
+Compares each function's exclusive or inclusive value across threads, or across ranks after adding up 
+each rank's threads, and reports the maximum to mean ratio, the coefficient of variation, and the 
+slowest and fastest thread or rank.  Threads or ranks that never called a function count as zero.
+
+Analysis results are saved in the trial directory and reused until the trial's profile files change.
+"""
+
+import os
+import json
+import heapq
+import math
+from array import array
+from itertools import izip
+from tau import logger, util
+from tau.cf.profile import ProfileError, DEFAULT_METRIC, text_table, format_header
+
+
+LOGGER = logger.get_logger(__name__)
+
+UNITS = ('thread', 'rank')
+"""tuple: Units that function values may be compared across."""
+
+VALUES = ('exclusive', 'inclusive')
+"""tuple: Function values that may be compared."""
+
+CACHE_DIR = '.analysis'
+"""str: Name of the directory in the trial directory containing saved analysis results."""
+
+
+def _unit_labels(profile, unit):
+    """Gets the name of each unit and the index of each thread's unit."""
+    if unit == 'thread':
+        return ['%d,%d,%d' % thread for thread in profile.threads], range(len(profile.threads))
+    nodes = sorted(set(thread[0] for thread in profile.threads))
+    node_index = dict((node, idx) for idx, node in enumerate(nodes))
+    return [str(node) for node in nodes], [node_index[thread[0]] for thread in profile.threads]
+
+
+def _unit_rows(profile, metric, value, unit):
+    """Gets function, unit, and value columns with one row per function per unit."""
+    labels, thread_unit = _unit_labels(profile, unit)
+    values = profile.column(value, metric)
+    if unit == 'thread':
+        return labels, profile.function, profile.thread, values
+    units = array('i', [thread_unit[thread] for thread in profile.thread])
+    sums = {}
+    for key, val in izip(izip(profile.function, units), values):
+        sums[key] = sums.get(key, 0.0) + val
+    keys = sorted(sums)
+    return (labels, array('i', [key[0] for key in keys]), array('i', [key[1] for key in keys]), 
+            array('d', [sums[key] for key in keys]))
+
+
+def analyze(profile, metric, value='exclusive', unit='thread'):
+    """Computes load imbalance statistics for each function.
+    
+    All statistics are computed in one pass over the profile's rows after adding up each rank's 
+    threads if `unit` is 'rank'.
+    
+    Args:
+        profile (Profile): Profile data.
+        metric (str): Metric name.
+        value (str): Value to compare, see :any:`VALUES`.
+        unit (str): Compare values across each thread or each rank, see :any:`UNITS`.
+        
+    Returns:
+        list: One dictionary per function in the same order as ``profile.functions`` with the function's
+              'function' name, 'total', 'mean', 'min', and 'max' values, 'max_mean' ratio, coefficient of 
+              variation 'cv', 'wasted' value (max minus mean), and 'slowest' and 'fastest' unit names.
+              
+    Raises:
+        ProfileError: `profile` has no `metric` data.
+    """
+    if metric not in profile.metrics:
+        raise ProfileError("No %s data in profile" % metric, "Available metrics are %s" % ', '.join(profile.metrics))
+    labels, functions, units, values = _unit_rows(profile, metric, value, unit)
+    nfuncs = len(profile.functions)
+    nunits = max(1, len(labels))
+    total = array('d', [0.0]) * nfuncs
+    sumsq = array('d', [0.0]) * nfuncs
+    low = array('d', [float('inf')]) * nfuncs
+    high = array('d', [float('-inf')]) * nfuncs
+    fastest = array('i', [-1]) * nfuncs
+    slowest = array('i', [-1]) * nfuncs
+    present = array('l', [0]) * nfuncs
+    for func, unit_idx, val in izip(functions, units, values):
+        present[func] += 1
+        total[func] += val
+        sumsq[func] += val * val
+        if val < low[func]:
+            low[func] = val
+            fastest[func] = unit_idx
+        if val > high[func]:
+            high[func] = val
+            slowest[func] = unit_idx
+    # Absent units count as zero so find an absent unit for functions where zero is the minimum
+    absent = set(func for func in xrange(nfuncs) if present[func] < nunits and low[func] > 0)
+    if absent:
+        seen = dict((func, set()) for func in absent)
+        for func, unit_idx in izip(functions, units):
+            if func in seen:
+                seen[func].add(unit_idx)
+        for func in absent:
+            low[func] = 0.0
+            fastest[func] = next(idx for idx in xrange(nunits) if idx not in seen[func])
+    results = []
+    for func in xrange(nfuncs):
+        if present[func] < nunits:
+            high[func] = max(high[func], 0.0)
+        mean = total[func] / nunits
+        stddev = math.sqrt(max(0.0, sumsq[func] / nunits - mean * mean))
+        results.append({'function': profile.functions[func],
+                        'total': total[func],
+                        'mean': mean,
+                        'min': low[func],
+                        'max': high[func],
+                        'max_mean': high[func] / mean if mean else 0.0,
+                        'cv': stddev / mean if mean else 0.0,
+                        'wasted': high[func] - mean,
+                        'fastest': labels[fastest[func]] if fastest[func] >= 0 else None,
+                        'slowest': labels[slowest[func]] if slowest[func] >= 0 else None})
+    return results
+
+
+def cached_analyze(prefix, profile, metric, value='exclusive', unit='thread'):
+    """Like :any:`analyze`, but saves results in the trial directory and reuses saved results.
+    
+    Saved results are reused only if they were computed from profile files with the same checksum 
+    as `profile`, see :any:`Profile.digest`.  Profiles without a checksum are always analyzed.
+    
+    Args:
+        prefix (str): Trial directory, see :any:`Trial.prefix`.
+        profile (Profile): Profile data.
+        metric (str): Metric name.
+        value (str): Value to compare, see :any:`VALUES`.
+        unit (str): Compare values across each thread or each rank, see :any:`UNITS`.
+        
+    Returns:
+        list: Results as returned by :any:`analyze`.
+    """
+    digest = profile.digest
+    path = os.path.join(prefix, CACHE_DIR, 'imbalance.%s.%s.%s.json' % (metric, value, unit))
+    if digest:
+        try:
+            with open(path) as fin:
+                saved = json.load(fin, encoding='latin-1')
+        except (IOError, ValueError):
+            pass
+        else:
+            if saved.get('files') == digest:
+                LOGGER.debug("Using saved imbalance analysis '%s'", path)
+                return saved['results']
+    results = analyze(profile, metric, value, unit)
+    if digest:
+        tmp_path = '%s.%d.tmp' % (path, os.getpid())
+        try:
+            util.mkdirp(os.path.dirname(path))
+            with open(tmp_path, 'w') as fout:
+                json.dump({'files': digest, 'results': results}, fout, encoding='latin-1')
+            os.rename(tmp_path, path)
+        except (IOError, OSError) as err:
+            LOGGER.debug("Unable to save imbalance analysis '%s': %s", path, err)
+    return results
+
+
+def most_imbalanced(results, count):
+    """Finds the functions that waste the most time waiting for the slowest thread or rank.
+    
+    Args:
+        results (list): Results from :any:`analyze`.
+        count (int): Maximum number of functions to find.
+        
+    Returns:
+        list: Results in descending order of 'wasted' value.
+    """
+    return heapq.nlargest(count, results, key=lambda result: result['wasted'])
+
+
+def format_table(results, metric, value, unit, nunits):
+    """Formats load imbalance statistics of functions as a text table.
+    
+    Args:
+        results (list): Results from :any:`analyze`, e.g. from :any:`most_imbalanced`.
+        metric (str): Metric name.
+        value (str): Compared value, see :any:`VALUES`.
+        unit (str): Compared unit, see :any:`UNITS`.
+        nunits (int): Number of threads or ranks compared.
+        
+    Returns:
+        str: The table.
+    """
+    table = text_table(['Function', 'Mean', 'Max', 'Max/Mean', 'CV', 'Slowest', 'Fastest'])
+    for result in results:
+        table.add_row([result['function'], '%.4g' % result['mean'], '%.4g' % result['max'], 
+                       '%.3g' % result['max_mean'], '%.3g' % result['cv'], result['slowest'], result['fastest']])
+    title = "Top %d imbalanced functions by %s %s across %d %ss" % (len(results), metric, value, nunits, unit)
+    return '%s\n%s' % (title, table.draw())
+
+
+def write_report(profile, stream, metric=None, value='exclusive', unit='thread', count=20, output='text', 
+                 header=None, prefix=None):
+    """Writes the most imbalanced functions to a stream.
+    
+    Args:
+        profile (Profile): Profile data.
+        stream (file): Output stream, e.g. :any:`sys.stdout`.
+        metric (str): Metric to analyze.  Default is :any:`DEFAULT_METRIC` or the first metric in `profile`.
+        value (str): Value to compare, see :any:`VALUES`.
+        unit (str): Compare values across each thread or each rank, see :any:`UNITS`.
+        count (int): Maximum number of functions to report.
+        output (str): 'text' or 'json'.
+        header (dict): Extra items to include in the JSON object or a title for the text output, e.g. {'trial': 0}.
+        prefix (str): Trial directory to save analysis results in, see :any:`cached_analyze`.  
+                      If None then results are not saved.
+                       
+    Raises:
+        ProfileError: `profile` has no `metric` data.
+    """
+    if metric is None:
+        metric = DEFAULT_METRIC if DEFAULT_METRIC in profile.metrics or not profile.metrics else profile.metrics[0]
+    if prefix:
+        results = cached_analyze(prefix, profile, metric, value, unit)
+    else:
+        results = analyze(profile, metric, value, unit)
+    top = most_imbalanced(results, count)
+    nunits = len(_unit_labels(profile, unit)[0])
+    if output == 'json':
+        report = dict(header or {}, metric=metric, value=value, unit=unit, units=nunits, functions=top)
+        stream.write(json.dumps(report, encoding='latin-1') + '\n')
+    else:
+        if header:
+            stream.write(format_header(header) + '\n')
+        stream.write(format_table(top, metric, value, unit, nunits) + '\n\n')
+    stream.flush()
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Instrumentation overhead estimates.
+
+Every call of an instrumented function starts and stops a timer.  Multiplying each function's number 
+of calls by the cost of starting and stopping a timer, as measured by 
+:any:`TauInstallation.measure_timer_overhead`, estimates the measurement overhead of each function.
+Callpath timers are started and stopped along with the function's own timer so their cost is already 
+included in the measured cost and they are not counted separately.
+
+Functions that :any:`tau.cf.profile.select_file` would exclude from instrumentation are marked so 
+throttling and selective instrumentation decisions can be based on their estimated overhead.
+"""
+
+import json
+import heapq
+from array import array
+from itertools import izip
+from tau import logger
+from tau.cf.profile import select_file, text_table, format_header
+
+
+LOGGER = logger.get_logger(__name__)
+
+
+def estimate(profile, per_call, num_calls=100000, throttle_per_call=10):
+    """Estimates the instrumentation overhead of each function.
+    
+    Args:
+        profile (Profile): Profile data.
+        per_call (float): Microseconds to start and stop a timer.
+        num_calls (int): Call count threshold of :any:`select_file.throttled_functions`.
+        throttle_per_call (float): Microseconds per call threshold of :any:`select_file.throttled_functions`.
+        
+    Returns:
+        tuple: (functions, totals) where `functions` is a list of dictionaries with each function's 
+               'function' name, 'calls', estimated 'overhead' in microseconds, 'inclusive' time in 
+               microseconds, overhead 'fraction' of inclusive time, and 'exclude' flag set if the function 
+               would be excluded from instrumentation.  `totals` is a dictionary of the total estimated 
+               'overhead', the total 'time' of all threads, and the overhead 'fraction' of that time.
+               
+    Raises:
+        ProfileError: `profile` has no :any:`select_file.TIME_METRIC` data.
+    """
+    excluded = set(routine for routine, _, _ in 
+                   select_file.throttled_functions(profile, num_calls, throttle_per_call))
+    inclusive = profile.column('inclusive', select_file.TIME_METRIC)
+    # Each thread's time is its largest inclusive time, i.e. the time of its outermost timer
+    thread_time = array('d', [0.0]) * len(profile.threads)
+    for thread, incl in izip(profile.thread, inclusive):
+        if incl > thread_time[thread]:
+            thread_time[thread] = incl
+    total_calls = profile.function_totals('calls')
+    total_incl = profile.function_totals('inclusive', select_file.TIME_METRIC)
+    functions = []
+    total_overhead = 0.0
+    for name, calls, incl in izip(profile.functions, total_calls, total_incl):
+        if '=>' in name:
+            continue
+        overhead = calls * per_call
+        total_overhead += overhead
+        functions.append({'function': name, 'calls': int(calls), 'overhead': overhead, 'inclusive': incl, 
+                          'fraction': overhead / incl if incl else 0.0,
+                          'exclude': select_file.routine_name(name) in excluded})
+    time = sum(thread_time)
+    return functions, {'overhead': total_overhead, 'time': time, 'fraction': total_overhead / time if time else 0.0}
+
+
+def _percent(fraction):
+    return '%.1f%%' % (100 * fraction)
+
+
+def format_table(functions):
+    """Formats estimated overhead of functions as a text table.
+    
+    Args:
+        functions (list): Function dictionaries from :any:`estimate`.
+        
+    Returns:
+        str: The table.
+    """
+    table = text_table(['Function', 'Calls', 'Overhead (us)', 'Of Incl.', 'Incl/Call (us)', 'Exclude'])
+    for func in functions:
+        table.add_row([func['function'], str(func['calls']), '%.4g' % func['overhead'], _percent(func['fraction']),
+                       '%.4g' % (func['inclusive'] / func['calls'] if func['calls'] else 0), 
+                       'yes' if func['exclude'] else ''])
+    return table.draw()
+
+
+def write_report(profile, stream, per_call, measured=None, count=20, output='text', header=None, 
+                 num_calls=100000, throttle_per_call=10):
+    """Writes estimated instrumentation overhead to a stream.
+    
+    Args:
+        profile (Profile): Profile data.
+        stream (file): Output stream, e.g. :any:`sys.stdout`.
+        per_call (float): Microseconds to start and stop a timer.
+        measured (dict): Measured wall clock times in seconds of the 'uninstrumented' and 'instrumented' 
+                         application, or None if the application was not measured.
+        count (int): Maximum number of functions to report.
+        output (str): 'text' or 'json'.
+        header (dict): Extra items to include in the JSON object or a title for the text output, e.g. {'trial': 0}.
+        num_calls (int): Call count threshold of :any:`select_file.throttled_functions`.
+        throttle_per_call (float): Microseconds per call threshold of :any:`select_file.throttled_functions`.
+        
+    Raises:
+        ProfileError: `profile` has no :any:`select_file.TIME_METRIC` data.
+    """
+    functions, totals = estimate(profile, per_call, num_calls, throttle_per_call)
+    top = heapq.nlargest(count, functions, key=lambda func: func['overhead'])
+    if measured:
+        base, instr = measured['uninstrumented'], measured['instrumented']
+        measured = dict(measured, fraction=(instr - base) / base if base else 0.0)
+    if output == 'json':
+        report = dict(header or {}, per_call=per_call, estimated=totals, measured=measured, functions=top)
+        stream.write(json.dumps(report, encoding='latin-1') + '\n')
+    else:
+        if header:
+            stream.write(format_header(header) + '\n')
+        stream.write("Timer start and stop: %.4g us per call\n" % per_call)
+        stream.write("Estimated overhead: %.4g s of %.4g s in all threads (%s)\n" % 
+                     (totals['overhead'] * 1e-6, totals['time'] * 1e-6, _percent(totals['fraction'])))
+        if measured:
+            stream.write("Measured overhead: %.4g s uninstrumented, %.4g s instrumented (%s)\n" % 
+                         (measured['uninstrumented'], measured['instrumented'], _percent(measured['fraction'])))
+        stream.write("Top %d functions by estimated overhead\n%s\n\n" % (len(top), format_table(top)))
+    stream.flush()
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Selective instrumentation files generated from profile data.
+
+At runtime TAU throttles a lightweight event, i.e. stops measuring it, if it is called more than 
+``TAU_THROTTLE_NUMCALLS`` times with less than ``TAU_THROTTLE_PERCALL`` microseconds per call.  A throttled 
+event still costs a little on every call and TAU has already paid the full measurement cost by the time 
+it throttles.  Applying the same test to a completed trial finds functions that can be excluded from 
+instrumentation altogether with a TAU selective instrumentation file.
+"""
+
+import re
+from array import array
+from itertools import izip
+from tau import logger
+from tau.cf.profile import ProfileError
+
+
+LOGGER = logger.get_logger(__name__)
+
+TIME_METRIC = 'TIME'
+"""str: Metric measuring wallclock time in microseconds."""
+
+NON_SOURCE_GROUPS = ('MPI', 'TAU_CALLPATH', 'TAU_PHASE', 'TAU_IO', 'TAU_MEMORY', 'OpenMP', 'TAU_OPENMP', 
+                     'SHMEM', 'CUDA', 'OpenCL')
+"""tuple: Timer groups of events created by wrapper libraries or by TAU itself rather than by instrumentation."""
+
+_LOCATION_RE = re.compile(r'\s*\[\{.*\}\s*\{.*\}\]\s*$')
+
+
+def routine_name(name):
+    """Gets the name used to select a routine in a selective instrumentation file.
+    
+    Args:
+        name (str): Timer name, e.g. ``int foo(int) C [{foo.c} {12,1}-{20,1}]``.
+        
+    Returns:
+        str: Timer name without the source location, e.g. ``int foo(int) C``.
+    """
+    return _LOCATION_RE.sub('', name).strip()
+
+
+def _instrumented(name, group):
+    if '=>' in name or name.startswith('.'):
+        return False
+    groups = group.replace('|', ' ').split()
+    return not any(grp in NON_SOURCE_GROUPS for grp in groups)
+
+
+def throttled_functions(profile, num_calls=100000, per_call=10):
+    """Finds instrumented functions TAU would throttle.
+    
+    A function is throttled if some thread called it more than `num_calls` times and its inclusive time
+    per call over all threads is less than `per_call` microseconds.
+    
+    Args:
+        profile (Profile): Profile data.
+        num_calls (int): Minimum number of calls, see ``TAU_THROTTLE_NUMCALLS``.
+        per_call (float): Maximum microseconds per call, see ``TAU_THROTTLE_PERCALL``.
+        
+    Returns:
+        list: (routine name, calls, microseconds per call) tuples in descending order of calls.
+        
+    Raises:
+        ProfileError: `profile` has no :any:`TIME_METRIC` data.
+    """
+    if TIME_METRIC not in profile.metrics:
+        raise ProfileError("No %s data in profile" % TIME_METRIC, 
+                           "Selective instrumentation files can only be created from trials that measured time.")
+    nfuncs = len(profile.functions)
+    max_calls = array('l', [0]) * nfuncs
+    for func, calls in izip(profile.function, profile.calls):
+        if calls > max_calls[func]:
+            max_calls[func] = calls
+    total_calls = profile.function_totals('calls')
+    total_incl = profile.function_totals('inclusive', TIME_METRIC)
+    found = {}
+    for func, (name, group) in enumerate(izip(profile.functions, profile.groups)):
+        calls, incl = total_calls[func], total_incl[func]
+        if max_calls[func] > num_calls and incl < per_call * calls and _instrumented(name, group):
+            # Timers at different source locations may have the same routine name
+            routine = routine_name(name)
+            prev_calls, prev_incl = found.get(routine, (0, 0.0))
+            found[routine] = (prev_calls + calls, prev_incl + incl)
+    return sorted(((routine, int(calls), incl / calls) for routine, (calls, incl) in found.iteritems()), 
+                  key=lambda item: item[1], reverse=True)
+
+
+def write(stream, functions, comment=None):
+    """Writes a selective instrumentation file excluding functions.
+    
+    Comments are only written above the exclude list since '#' is a wildcard in routine names.
+    
+    Args:
+        stream (file): Output stream.
+        functions (list): Tuples from :any:`throttled_functions`.
+        comment (str): Comment to write at the top of the file.
+    """
+    if comment:
+        for line in comment.splitlines():
+            stream.write('# %s\n' % line)
+    stream.write('BEGIN_EXCLUDE_LIST\n')
+    for routine, _, _ in functions:
+        stream.write('%s\n' % routine)
+    stream.write('END_EXCLUDE_LIST\n')
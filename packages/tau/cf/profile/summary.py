@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Text and JSON summaries of profile data.
+
+Finds the functions with the largest exclusive value, inclusive value, number of calls, or 
+inclusive value per call, and reports their total, mean, minimum, maximum, and standard deviation 
+across all threads.  Threads that never called a function count as zero, as in ``pprof``.
+"""
+
+import json
+import heapq
+import math
+from array import array
+from itertools import izip
+from tau import logger
+from tau.cf.profile import ProfileError, text_table, format_header
+
+
+LOGGER = logger.get_logger(__name__)
+
+SORT_KEYS = ('exclusive', 'inclusive', 'calls', 'per_call')
+"""tuple: Values functions may be ranked by."""
+
+STATISTICS = ('total', 'mean', 'min', 'max', 'stddev')
+"""tuple: Statistics computed for each function across all threads."""
+
+_COLUMNS = ('exclusive', 'inclusive', 'calls')
+
+
+def _distribution(total, sumsq, low, high, present, nthreads):
+    """Computes statistics across threads from running sums, counting absent threads as zero."""
+    stats = dict((stat, array('d', [0.0]) * len(total)) for stat in STATISTICS)
+    for func, (tot, sq, lo, hi, count) in enumerate(izip(total, sumsq, low, high, present)):
+        if count < nthreads:
+            lo, hi = min(lo, 0.0), max(hi, 0.0)
+        mean = tot / nthreads
+        stats['total'][func] = tot
+        stats['mean'][func] = mean
+        stats['min'][func] = lo
+        stats['max'][func] = hi
+        stats['stddev'][func] = math.sqrt(max(0.0, sq / nthreads - mean * mean))
+    return stats
+
+
+def function_statistics(profile, metric):
+    """Computes statistics for each function across all threads.
+    
+    All statistics are computed in one pass over the profile's rows.
+    
+    Args:
+        profile (Profile): Profile data.
+        metric (str): Metric name.
+        
+    Returns:
+        dict: Dictionaries of statistics for 'exclusive', 'inclusive', and 'calls' indexed by statistic name 
+              (see :any:`STATISTICS`), and 'per_call', the total inclusive value per call.  Each statistic 
+              is an array indexed by function.
+    """
+    nfuncs = len(profile.functions)
+    nthreads = max(1, len(profile.threads))
+    sums = [array('d', [0.0]) * nfuncs for _ in _COLUMNS]
+    sumsqs = [array('d', [0.0]) * nfuncs for _ in _COLUMNS]
+    lows = [array('d', [float('inf')]) * nfuncs for _ in _COLUMNS]
+    highs = [array('d', [float('-inf')]) * nfuncs for _ in _COLUMNS]
+    present = array('l', [0]) * nfuncs
+    excl_sum, incl_sum, calls_sum = sums
+    excl_sq, incl_sq, calls_sq = sumsqs
+    excl_lo, incl_lo, calls_lo = lows
+    excl_hi, incl_hi, calls_hi = highs
+    for func, excl, incl, calls in izip(profile.function, profile.exclusive[metric], 
+                                        profile.inclusive[metric], profile.calls):
+        present[func] += 1
+        excl_sum[func] += excl
+        excl_sq[func] += excl * excl
+        if excl < excl_lo[func]:
+            excl_lo[func] = excl
+        if excl > excl_hi[func]:
+            excl_hi[func] = excl
+        incl_sum[func] += incl
+        incl_sq[func] += incl * incl
+        if incl < incl_lo[func]:
+            incl_lo[func] = incl
+        if incl > incl_hi[func]:
+            incl_hi[func] = incl
+        calls_sum[func] += calls
+        calls_sq[func] += calls * calls
+        if calls < calls_lo[func]:
+            calls_lo[func] = calls
+        if calls > calls_hi[func]:
+            calls_hi[func] = calls
+    stats = dict((name, _distribution(sums[i], sumsqs[i], lows[i], highs[i], present, nthreads)) 
+                 for i, name in enumerate(_COLUMNS))
+    stats['per_call'] = array('d', [incl / calls if calls else 0.0 for incl, calls in izip(incl_sum, calls_sum)])
+    return stats
+
+
+def top_functions(stats, key, count):
+    """Finds the functions with the largest values.
+    
+    Args:
+        stats (dict): Statistics from :any:`function_statistics`.
+        key (str): Value to rank functions by, see :any:`SORT_KEYS`.
+        count (int): Maximum number of functions to find.
+        
+    Returns:
+        list: Function indices in descending order of value.
+    """
+    values = stats[key] if key == 'per_call' else stats[key]['total']
+    return heapq.nlargest(count, xrange(len(values)), key=values.__getitem__)
+
+
+def function_records(profile, metric, stats, functions):
+    """Gets statistics of functions as dictionaries, e.g. for JSON output.
+    
+    Args:
+        profile (Profile): Profile data.
+        metric (str): Metric name.
+        stats (dict): Statistics from :any:`function_statistics`.
+        functions (list): Function indices, e.g. from :any:`top_functions`.
+        
+    Returns:
+        list: One dictionary per function.
+    """
+    records = []
+    for func in functions:
+        record = {'function': profile.functions[func], 'group': profile.groups[func], 'metric': metric,
+                  'per_call': stats['per_call'][func]}
+        for name in _COLUMNS:
+            record[name] = dict((stat, stats[name][stat][func]) for stat in STATISTICS)
+        records.append(record)
+    return records
+
+
+def _format_value(value):
+    return '%.4g' % value
+
+
+def format_table(profile, metric, stats, functions, key):
+    """Formats statistics of functions as a text table.
+    
+    The table shows total exclusive, inclusive, calls, and inclusive per call values of each
+    function and the distribution of the `key` value across threads.
+    
+    Args:
+        profile (Profile): Profile data.
+        metric (str): Metric name.
+        stats (dict): Statistics from :any:`function_statistics`.
+        functions (list): Function indices, e.g. from :any:`top_functions`.
+        key (str): Value functions are ranked by, see :any:`SORT_KEYS`.
+        
+    Returns:
+        str: The table.
+    """
+    dist_key = 'inclusive' if key == 'per_call' else key
+    table = text_table(['Function', 'Exclusive', 'Inclusive', 'Calls', 'Incl/Call', 
+                        'Mean', 'Min', 'Max', 'Stddev'])
+    for func in functions:
+        row = [profile.functions[func]]
+        row.extend(_format_value(stats[name]['total'][func]) for name in _COLUMNS)
+        row.append(_format_value(stats['per_call'][func]))
+        row.extend(_format_value(stats[dist_key][stat][func]) for stat in STATISTICS[1:])
+        table.add_row(row)
+    title = "Top %d functions by %s %s across %d threads (%s distribution shown)" % (
+        len(functions), metric, key.replace('_', ' '), len(profile.threads), dist_key)
+    return '%s\n%s' % (title, table.draw())
+
+
+def write_report(profile, stream, metrics=None, key='exclusive', count=20, output='text', header=None):
+    """Writes the top functions of each metric to a stream.
+    
+    Each metric's report is written as soon as it is computed.  JSON output is one JSON object per 
+    line per metric so it can be processed as it arrives.
+    
+    Args:
+        profile (Profile): Profile data.
+        stream (file): Output stream, e.g. :any:`sys.stdout`.
+        metrics (list): Metrics to report.  Default is all metrics in `profile`.
+        key (str): Value to rank functions by, see :any:`SORT_KEYS`.
+        count (int): Maximum number of functions to report for each metric.
+        output (str): 'text' or 'json'.
+        header (dict): Extra items to include in each JSON object or a title for the text output, 
+                       e.g. {'trial': 0}.
+                       
+    Raises:
+        ProfileError: `profile` does not have all of `metrics`.
+    """
+    missing = [metric for metric in metrics or [] if metric not in profile.metrics]
+    if missing:
+        raise ProfileError("No %s data in profile" % ', '.join(missing), 
+                           "Available metrics are %s" % ', '.join(profile.metrics))
+    for metric in metrics or profile.metrics:
+        stats = function_statistics(profile, metric)
+        functions = top_functions(stats, key, count)
+        if output == 'json':
+            report = dict(header or {}, metric=metric, sort=key, threads=len(profile.threads),
+                          functions=function_records(profile, metric, stats, functions))
+            stream.write(json.dumps(report, encoding='latin-1') + '\n')
+        else:
+            if header:
+                stream.write(format_header(header) + '\n')
+            stream.write(format_table(profile, metric, stats, functions, key) + '\n\n')
+        stream.flush()
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Test functions.
+
+Functions used for unit tests of cache.py.
+"""
+#pylint: disable=missing-docstring
+
+import os
+import time
+from tau import tests
+from tau.cf import profile
+from tau.cf.profile import cache
+from tau.cf.profile.tests.test_profile import write_profile, write_trial
+
+
+class CacheTest(tests.TestCase):
+    """Unit tests for tau.cf.profile.cache."""
+
+    def _write_trial(self):
+        funcs_by_node = [[('main', 'TAU_USER', 1, 1, node, 10), 
+                          ('caf\xe9 %d' % (node % 2), 'TAU_USER', node, 0, 0.5, 0.5)] for node in range(4)]
+        prefix, paths = write_trial(funcs_by_node, 'TIME')
+        paths.extend(write_trial(funcs_by_node, 'PAPI_TOT_INS', prefix)[1])
+        return prefix, paths
+
+    def assertProfileEqual(self, first, second):
+        for attr in 'metrics', 'functions', 'groups', 'threads', 'thread', 'function', 'calls', 'subroutines':
+            self.assertEqual(getattr(first, attr), getattr(second, attr))
+        for metric in first.metrics:
+            self.assertEqual(first.exclusive[metric], second.exclusive[metric])
+            self.assertEqual(first.inclusive[metric], second.inclusive[metric])
+        self.assertEqual(list(first.thread_rows(2)), list(second.thread_rows(2)))
+
+    def test_load(self):
+        prefix, paths = self._write_trial()
+        self.assertIsNone(cache.read(prefix, paths))
+        parsed = cache.load(prefix, paths + [os.path.join(prefix, 'tauprofile.xml')])
+        self.assertTrue(os.path.exists(os.path.join(prefix, cache.CACHE_FILE)))
+        cached = cache.read(prefix, paths)
+        self.assertIsInstance(cached, profile.Profile)
+        self.assertProfileEqual(parsed, cached)
+        self.assertListEqual(list(cached.function_totals('exclusive', 'PAPI_TOT_INS')), [6, 1, 1])
+
+    def test_stale(self):
+        prefix, paths = self._write_trial()
+        cache.load(prefix, paths)
+        self.assertIsNotNone(cache.read(prefix, paths))
+        self.assertIsNone(cache.read(prefix, paths[1:]))
+        # Modify a profile file
+        write_profile(paths[0], 'TIME', [('main', 'TAU_USER', 1, 1, 100, 100)])
+        stamp = time.time() + 10
+        os.utime(paths[0], (stamp, stamp))
+        self.assertIsNone(cache.read(prefix, paths))
+        self.assertEqual(cache.load(prefix, paths).exclusive['TIME'][0], 100)
+        self.assertIsNotNone(cache.read(prefix, paths))
+        # Damage the cache
+        with open(os.path.join(prefix, cache.CACHE_FILE), 'r+b') as fout:
+            fout.truncate(100)
+        self.assertIsNone(cache.read(prefix, paths))
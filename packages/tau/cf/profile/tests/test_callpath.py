@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Test functions.
+
+Functions used for unit tests of callpath.py.
+"""
+#pylint: disable=missing-docstring
+
+from StringIO import StringIO
+from tau import tests
+from tau.cf import profile
+from tau.cf.profile import callpath
+from tau.cf.profile.tests.test_profile import write_trial
+
+
+class CallpathTest(tests.TestCase):
+    """Unit tests for tau.cf.profile.callpath."""
+
+    def _load(self):
+        funcs = [('main', 'TAU_DEFAULT', 1, 2, 10, 100), 
+                 ('solve', 'TAU_USER', 2, 1, 60, 80),
+                 ('exchange', 'MPI', 3, 0, 10, 10),
+                 ('main => solve', 'TAU_CALLPATH', 2, 1, 60, 80),
+                 ('main  => solve =>  exchange', 'TAU_CALLPATH', 1, 0, 9, 9),
+                 ('main => exchange', 'TAU_CALLPATH', 1, 0, 1, 1)]
+        _, paths = write_trial([funcs, funcs])
+        return profile.load(paths)
+
+    def test_build(self):
+        tree = callpath.build(self._load())
+        self.assertEqual(len(tree), 5)
+        self.assertItemsEqual(tree.frames, ['main', 'solve', 'exchange'])
+        exchange = tree.node(['main', 'solve', 'exchange'])
+        self.assertEqual(len(tree), 5)
+        self.assertEqual(tree.path(exchange), ['main', 'solve', 'exchange'])
+        self.assertEqual(tree.exclusive[exchange], 18)
+        self.assertEqual(tree.calls[exchange], 2)
+        main = tree.node(['main'])
+        self.assertEqual(tree.inclusive[main], 200)
+        # Flat timers that aren't callpath roots are not counted twice
+        rollup = tree.rollup('exclusive')
+        self.assertEqual(rollup[main], 160)
+        self.assertEqual(rollup[tree.ROOT], 160)
+        self.assertEqual(rollup[tree.node(['main', 'solve'])], 138)
+        offsets, nodes = tree.children()
+        self.assertItemsEqual(nodes[offsets[main]:offsets[main + 1]], 
+                              [tree.node(['main', 'solve']), tree.node(['main', 'exchange'])])
+
+    def test_prune(self):
+        tree = callpath.build(self._load())
+        pruned = tree.prune(0.05)
+        self.assertEqual(len(pruned), 4)
+        self.assertEqual(pruned.rollup('exclusive')[pruned.ROOT], 160)
+        main = pruned.node(['main'])
+        self.assertEqual(pruned.exclusive[main], 22)
+
+    def test_write_collapsed(self):
+        stream = StringIO()
+        callpath.build(self._load()).write_collapsed(stream)
+        self.assertListEqual(sorted(stream.getvalue().splitlines()), 
+                             ['main 20', 'main;exchange 2', 'main;solve 120', 'main;solve;exchange 18'])
+
+    def test_write_tree(self):
+        stream = StringIO()
+        callpath.write_tree(self._load(), stream, threshold=0.05, header={'trial': 1})
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(lines[0], 'Trial 1')
+        self.assertListEqual([line.split()[-1] for line in lines[2:-1]], ['main', 'solve', 'exchange'])
+        self.assertTrue(lines[4].endswith('    exchange'))
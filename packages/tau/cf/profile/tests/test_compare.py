@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Test functions.
+
+Functions used for unit tests of compare.py.
+"""
+#pylint: disable=missing-docstring
+
+import json
+from StringIO import StringIO
+from tau import tests
+from tau.cf import profile
+from tau.cf.profile import compare
+from tau.cf.profile.tests.test_profile import write_trial
+
+
+class CompareTest(tests.TestCase):
+    """Unit tests for tau.cf.profile.compare."""
+
+    def test_function_key(self):
+        self.assertEqual(compare.function_key('main  =>  solve '), 'main => solve')
+        self.assertEqual(compare.function_key('main=>solve'), 'main => solve')
+        self.assertEqual(compare.function_key('int main(int, char **) '), 'int main(int, char **)')
+
+    def test_welch_t_test(self):
+        self.assertIsNone(compare.welch_t_test([1], [2, 3]))
+        self.assertAlmostEqual(compare.welch_t_test([1, 2, 3, 4, 5], [2, 3, 4, 5, 6]), 0.3466, places=4)
+        self.assertAlmostEqual(compare.welch_t_test([10, 11, 12], [20, 24, 22, 21]), 0.000167, places=6)
+        self.assertEqual(compare.welch_t_test([1, 1], [1, 1]), 1.0)
+
+    def test_compare(self):
+        baseline = [{'main': 100, 'solve': 50, 'old': 1}, {'main': 101, 'solve': 51, 'old': 1}]
+        trials = [{'main': 100.5, 'solve': 70}, {'main': 101.5, 'solve': 71, 'new': 2}]
+        records = dict((record['function'], record) for record in compare.compare(baseline, trials))
+        self.assertEqual(records['solve']['status'], 'regressed')
+        self.assertTrue(records['solve']['regression'])
+        self.assertEqual(records['solve']['delta'], 20)
+        self.assertAlmostEqual(records['solve']['ratio'], 70.5 / 50.5)
+        self.assertEqual(records['main']['status'], 'unchanged')
+        self.assertEqual(records['old']['status'], 'removed')
+        self.assertEqual(records['new']['status'], 'added')
+        self.assertIsNone(records['new']['ratio'])
+        # Large but insignificant changes are not regressions
+        noisy = compare.compare([{'main': 100}, {'main': 10}], [{'main': 120}, {'main': 10}])
+        self.assertEqual(noisy[0]['status'], 'unchanged')
+        # Without repeated trials only the threshold is used
+        single = compare.compare([{'main': 100}], [{'main': 104}], threshold=0.05)
+        self.assertEqual(single[0]['status'], 'unchanged')
+        self.assertIsNone(single[0]['p_value'])
+
+    def test_write_report(self):
+        loaders = []
+        for trial, solve in enumerate((20, 20.5, 40)):
+            _, paths = write_trial([[('main', 'TAU_USER', 1, 1, 10, 100), 
+                                     ('main => solve', 'TAU_CALLPATH', 1, 0, solve, solve)]])
+            loaders.append((trial, lambda paths=paths: profile.load(paths)))
+        stream = StringIO()
+        regressions = compare.write_report(loaders[:2], [loaders[2:]], stream, 'TIME', output='json')
+        self.assertEqual(regressions, 1)
+        report = json.loads(stream.getvalue())
+        self.assertListEqual(report['baseline'], [0, 1])
+        self.assertEqual(report['functions'][0]['function'], 'main => solve')
+        self.assertEqual(report['functions'][0]['status'], 'regressed')
+        stream = StringIO()
+        compare.write_report(loaders[:1], [loaders[1:2]], stream, 'TIME')
+        self.assertIn('0 regressed functions', stream.getvalue())
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Test functions.
+
+Functions used for unit tests of imbalance.py.
+"""
+#pylint: disable=missing-docstring
+
+import os
+import json
+from StringIO import StringIO
+from tau import tests
+from tau.cf.profile import cache, imbalance
+from tau.cf.profile.tests.test_profile import write_profile, write_trial
+
+
+class ImbalanceTest(tests.TestCase):
+    """Unit tests for tau.cf.profile.imbalance."""
+
+    def _write_trial(self):
+        funcs_by_thread = {}
+        for node in range(2):
+            for thread in range(2):
+                funcs = [('main', 'TAU_USER', 1, 2, 10, 100), 
+                         ('solve', 'TAU_USER', 10, 0, 10 * (2 * node + thread + 1), 50)]
+                if node and thread:
+                    funcs.append(('exchange', 'MPI', 100, 0, 40, 40))
+                funcs_by_thread[node, 0, thread] = funcs
+        return write_trial(funcs_by_thread)
+
+    def _results(self, prof, *args):
+        return dict((result['function'], result) for result in imbalance.analyze(prof, 'TIME', *args))
+
+    def test_analyze(self):
+        prefix, paths = self._write_trial()
+        prof = cache.load(prefix, paths)
+        results = self._results(prof)
+        solve = results['solve']
+        self.assertEqual(solve['mean'], 25)
+        self.assertEqual(solve['max'], 40)
+        self.assertEqual(solve['max_mean'], 1.6)
+        self.assertAlmostEqual(solve['cv'], 125 ** 0.5 / 25)
+        self.assertEqual(solve['slowest'], '1,0,1')
+        self.assertEqual(solve['fastest'], '0,0,0')
+        self.assertEqual(results['main']['cv'], 0)
+        # Threads that didn't call a function count as zero
+        exchange = results['exchange']
+        self.assertEqual(exchange['min'], 0)
+        self.assertEqual(exchange['max_mean'], 4)
+        self.assertEqual(exchange['fastest'], '0,0,0')
+        self.assertEqual([result['function'] for result in imbalance.most_imbalanced(results.values(), 2)], 
+                         ['exchange', 'solve'])
+        # Ranks add up their threads
+        results = self._results(prof, 'exclusive', 'rank')
+        self.assertEqual(results['solve']['mean'], 50)
+        self.assertEqual(results['solve']['max'], 70)
+        self.assertEqual(results['solve']['slowest'], '1')
+        self.assertEqual(results['exchange']['max_mean'], 2)
+        self.assertEqual(results['exchange']['fastest'], '0')
+
+    def test_cached_analyze(self):
+        prefix, paths = self._write_trial()
+        prof = cache.load(prefix, paths)
+        results = imbalance.cached_analyze(prefix, prof, 'TIME')
+        cache_dir = os.path.join(prefix, imbalance.CACHE_DIR)
+        self.assertEqual(len(os.listdir(cache_dir)), 1)
+        # Saved results are reused until the profile files change
+        saved = os.path.join(cache_dir, os.listdir(cache_dir)[0])
+        with open(saved) as fin:
+            data = json.load(fin)
+        data['results'][0]['mean'] = -1
+        with open(saved, 'w') as fout:
+            json.dump(data, fout)
+        self.assertEqual(imbalance.cached_analyze(prefix, prof, 'TIME')[0]['mean'], -1)
+        write_profile(paths[0], None, [('main', 'TAU_USER', 1, 1, 10, 10)])
+        prof = cache.load(prefix, paths)
+        self.assertNotEqual(imbalance.cached_analyze(prefix, prof, 'TIME')[0]['mean'], -1)
+        self.assertEqual(len(results), 3)
+
+    def test_write_report(self):
+        prefix, paths = self._write_trial()
+        prof = cache.load(prefix, paths)
+        stream = StringIO()
+        imbalance.write_report(prof, stream, count=1, header={'trial': 3})
+        text = stream.getvalue()
+        self.assertIn('Trial 3', text)
+        self.assertIn('exchange', text)
+        self.assertNotIn('solve', text)
+        stream = StringIO()
+        imbalance.write_report(prof, stream, unit='rank', output='json')
+        report = json.loads(stream.getvalue())
+        self.assertEqual(report['units'], 2)
+        self.assertEqual(len(report['functions']), 3)
+        self.assertRaises(imbalance.ProfileError, imbalance.write_report, prof, stream, metric='PAPI_L1_DCM')
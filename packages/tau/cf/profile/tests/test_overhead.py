@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Test functions.
+
+Functions used for unit tests of overhead.py.
+"""
+#pylint: disable=missing-docstring
+
+import json
+from StringIO import StringIO
+from tau import tests
+from tau.cf import profile
+from tau.cf.profile import overhead
+from tau.cf.profile.tests.test_profile import write_trial
+
+
+class OverheadTest(tests.TestCase):
+    """Unit tests for tau.cf.profile.overhead."""
+
+    def _load(self):
+        funcs = [('main', 'TAU_USER', 1, 200001, 100000, 1000000),
+                 ('tiny', 'TAU_USER', 200000, 0, 200000, 200000),
+                 ('big', 'TAU_USER', 1, 0, 700000, 700000),
+                 ('main => tiny', 'TAU_CALLPATH', 200000, 0, 200000, 200000)]
+        _, paths = write_trial([funcs, funcs])
+        return profile.load(paths)
+
+    def test_estimate(self):
+        functions, totals = overhead.estimate(self._load(), 0.5)
+        functions = dict((func['function'], func) for func in functions)
+        self.assertItemsEqual(functions, ['main', 'tiny', 'big'])
+        self.assertEqual(functions['tiny']['calls'], 400000)
+        self.assertEqual(functions['tiny']['overhead'], 200000)
+        self.assertEqual(functions['tiny']['fraction'], 0.5)
+        self.assertTrue(functions['tiny']['exclude'])
+        self.assertFalse(functions['big']['exclude'])
+        self.assertEqual(totals['time'], 2000000)
+        self.assertEqual(totals['overhead'], 200002)
+        self.assertAlmostEqual(totals['fraction'], 0.100001)
+
+    def test_write_report(self):
+        prof = self._load()
+        stream = StringIO()
+        overhead.write_report(prof, stream, 0.5, measured={'uninstrumented': 1.0, 'instrumented': 1.25}, 
+                              count=1, output='json')
+        report = json.loads(stream.getvalue())
+        self.assertEqual(report['measured']['fraction'], 0.25)
+        self.assertEqual([func['function'] for func in report['functions']], ['tiny'])
+        stream = StringIO()
+        overhead.write_report(prof, stream, 0.5, header={'trial': 2})
+        text = stream.getvalue()
+        self.assertIn('Trial 2', text)
+        self.assertIn('(10.0%)', text)
+        self.assertNotIn('Measured', text)
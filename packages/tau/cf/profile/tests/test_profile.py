@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Test functions.
+
+Functions used for unit tests of tau.cf.profile.
+"""
+#pylint: disable=missing-docstring
+
+import os
+from tau import tests, util
+from tau.cf import profile
+
+
+def write_profile(path, metric, functions):
+    """Writes a TAU profile file.
+    
+    Args:
+        path (str): Path to the new file.
+        metric (str): Metric name, or None for a single-metric profile.
+        functions (list): (name, group, calls, subroutines, exclusive, inclusive) tuples.
+    """
+    util.mkdirp(os.path.dirname(path))
+    with open(path, 'w') as fout:
+        kind = 'templated_functions_MULTI_%s' % metric if metric else 'templated_functions'
+        fout.write('%d %s\n' % (len(functions), kind))
+        fout.write('# Name Calls Subrs Excl Incl ProfileCalls # <metadata><attribute><name>Node</name>'
+                   '<value>x</value></attribute></metadata>\n')
+        for name, group, calls, subrs, excl, incl in functions:
+            fout.write('"%s" %d %d %.16G %.16G 0 GROUP="%s"\n' % (name, calls, subrs, excl, incl, group))
+        fout.write('0 aggregates\n')
+
+
+def write_trial(funcs_by_node, metric=None, prefix=None):
+    """Writes a TAU profile file for each thread of a trial.
+    
+    Args:
+        funcs_by_node: Functions as in :any:`write_profile`.  Either a list with the functions of thread 0 
+                       on each node, or a dictionary of functions indexed by (node, context, thread) tuples.
+        metric (str): Metric name, or None for single-metric profiles.  Multi-metric profiles are
+                      written to the ``MULTI__<metric>`` directory.
+        prefix (str): Trial directory.  Default is a new temporary directory in the current directory.
+        
+    Returns:
+        tuple: (prefix, paths) where `paths` lists the new profile files in (node, context, thread) order.
+    """
+    if prefix is None:
+        prefix = util.mkdtemp(dir=os.getcwd())
+    if isinstance(funcs_by_node, dict):
+        threads = sorted(funcs_by_node.iteritems())
+    else:
+        threads = [((node, 0, 0), funcs) for node, funcs in enumerate(funcs_by_node)]
+    profile_dir = os.path.join(prefix, 'MULTI__' + metric) if metric else prefix
+    paths = []
+    for (node, context, thread), funcs in threads:
+        path = os.path.join(profile_dir, 'profile.%d.%d.%d' % (node, context, thread))
+        write_profile(path, metric, funcs)
+        paths.append(path)
+    return prefix, paths
+
+
+class ProfileTest(tests.TestCase):
+    """Unit tests for tau.cf.profile."""
+
+    def test_parse_profile_file(self):
+        path = os.path.join(util.mkdtemp(dir=os.getcwd()), 'profile.0.0.0')
+        funcs = [('.TAU application', 'TAU_DEFAULT', 1, 1, 10.5, 100.25),
+                 ('int main(int, char **) "x" [{hello.c} {3,1}-{9,1}]', 'TAU_USER', 1, 2, 89.75, 89.75)]
+        write_profile(path, None, funcs)
+        metric, functions = profile.parse_profile_file(path)
+        self.assertEqual(metric, 'TIME')
+        self.assertListEqual(functions, funcs)
+        with open(path, 'w') as fout:
+            fout.write('1 templated_functions\n#\n"main" 1 x\n')
+        self.assertRaises(profile.ProfileError, profile.parse_profile_file, path)
+
+    def test_load_multi(self):
+        prefix = util.mkdtemp(dir=os.getcwd())
+        paths = [os.path.join(prefix, 'tauprofile.xml')]
+        for metric, scale in ('TIME', 1.0), ('PAPI_TOT_CYC', 1000.0):
+            for node in range(3):
+                funcs = [('main', 'TAU_USER', 1, 1+node, scale*(node+1), scale*10)]
+                if node != 1:
+                    funcs.append(('compute', 'TAU_USER', 5, 0, scale*2, scale*2))
+                if metric != 'TIME':
+                    funcs.reverse()
+                path = os.path.join(prefix, 'MULTI__'+metric, 'profile.%d.0.0' % node)
+                write_profile(path, metric, funcs)
+                paths.append(path)
+        prof = profile.load(paths)
+        self.assertListEqual(prof.metrics, ['TIME', 'PAPI_TOT_CYC'])
+        self.assertListEqual(prof.functions, ['main', 'compute'])
+        self.assertListEqual(prof.threads, [(0, 0, 0), (1, 0, 0), (2, 0, 0)])
+        self.assertEqual(len(prof), 5)
+        self.assertListEqual(list(prof.thread_rows(1)), [2])
+        self.assertListEqual(list(prof.subroutines), [1, 0, 2, 3, 0])
+        self.assertListEqual(list(prof.function_totals('calls')), [3, 10])
+        self.assertListEqual(list(prof.function_totals('exclusive', 'PAPI_TOT_CYC')), [6000, 4000])
+        self.assertListEqual(list(prof.column('inclusive')), [10, 2, 10, 10, 2])
+        self.assertRaises(profile.ProfileError, profile.load, paths[:1])
+
+    def test_load_parallel(self):
+        prefix = util.mkdtemp(dir=os.getcwd())
+        paths = []
+        for metric in 'TIME', 'PAPI_L1_DCM':
+            for node in range(40):
+                funcs = [('main', 'TAU_USER', 1, 2, node, 100)] + [('f%d' % i, 'TAU_USER', i, 0, 1, 1) 
+                                                                    for i in range(node % 7)]
+                path = os.path.join(prefix, 'MULTI__'+metric, 'profile.%d.0.0' % node)
+                write_profile(path, metric, funcs)
+                paths.append(path)
+        serial = profile.load(paths, processes=1)
+        parallel = profile.load(paths, processes=3)
+        for attr in 'metrics', 'functions', 'groups', 'threads', 'thread', 'function', 'calls', 'subroutines':
+            self.assertEqual(getattr(serial, attr), getattr(parallel, attr))
+        self.assertDictEqual(serial.exclusive, parallel.exclusive)
+        self.assertDictEqual(serial.inclusive, parallel.inclusive)
+        bad = os.path.join(prefix, 'MULTI__TIME', 'profile.99.0.0')
+        with open(bad, 'w') as fout:
+            fout.write('garbage\n')
+        self.assertRaises(profile.ProfileError, profile.load, paths + [bad], processes=2)
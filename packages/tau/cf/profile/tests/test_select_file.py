@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Test functions.
+
+Functions used for unit tests of select_file.py.
+"""
+#pylint: disable=missing-docstring
+
+from StringIO import StringIO
+from tau import tests
+from tau.cf import profile
+from tau.cf.profile import select_file
+from tau.cf.profile.tests.test_profile import write_trial
+
+
+class SelectFileTest(tests.TestCase):
+    """Unit tests for tau.cf.profile.select_file."""
+
+    def test_routine_name(self):
+        self.assertEqual(select_file.routine_name('int foo(int) C [{foo.c} {12,1}-{20,1}]'), 'int foo(int) C')
+        self.assertEqual(select_file.routine_name('void bar()'), 'void bar()')
+
+    def test_throttled_functions(self):
+        funcs_by_node = []
+        for node in range(2):
+            funcs = [('int main(int, char **) C [{main.c} {1,1}-{9,1}]', 'TAU_USER', 1, 2, 10, 1000000),
+                     ('double dot(double *, double *) C [{dot.c} {3,1}-{7,1}]', 'TAU_USER', 
+                      200000 * node, 0, 10000, 100000 * node),
+                     ('double slow(double) C [{slow.c} {3,1}-{7,1}]', 'TAU_USER', 200000, 0, 5000000, 5000000),
+                     ('MPI_Comm_rank()', 'MPI', 300000, 0, 1000, 1000),
+                     ('int main(int, char **) C [{main.c} {1,1}-{9,1}] => double dot(double *, double *) C', 
+                      'TAU_CALLPATH', 200000 * node, 0, 10000, 100000 * node)]
+            funcs_by_node.append(funcs)
+        _, paths = write_trial(funcs_by_node)
+        functions = select_file.throttled_functions(profile.load(paths), num_calls=100000, per_call=10)
+        self.assertListEqual(functions, [('double dot(double *, double *) C', 200000, 0.5)])
+        self.assertListEqual(select_file.throttled_functions(profile.load(paths), num_calls=200000), [])
+        stream = StringIO()
+        select_file.write(stream, functions, comment='Line one\nLine two')
+        self.assertEqual(stream.getvalue(), 
+                         '# Line one\n# Line two\nBEGIN_EXCLUDE_LIST\ndouble dot(double *, double *) C\n'
+                         'END_EXCLUDE_LIST\n')
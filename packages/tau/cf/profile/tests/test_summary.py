@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Test functions.
+
+Functions used for unit tests of summary.py.
+"""
+#pylint: disable=missing-docstring
+
+import json
+from StringIO import StringIO
+from tau import tests
+from tau.cf import profile
+from tau.cf.profile import summary
+from tau.cf.profile.tests.test_profile import write_trial
+
+
+class SummaryTest(tests.TestCase):
+    """Unit tests for tau.cf.profile.summary."""
+
+    def _load(self):
+        funcs_by_node = []
+        for node in range(4):
+            funcs = [('main', 'TAU_USER', 1, 2, 10, 100), 
+                     ('solve', 'TAU_USER', 10, 0, 20 * (node + 1), 20 * (node + 1))]
+            if node % 2:
+                funcs.append(('exchange', 'MPI', 100, 0, 50, 50))
+            funcs_by_node.append(funcs)
+        _, paths = write_trial(funcs_by_node)
+        return profile.load(paths)
+
+    def test_function_statistics(self):
+        prof = self._load()
+        stats = summary.function_statistics(prof, 'TIME')
+        solve = prof.functions.index('solve')
+        exchange = prof.functions.index('exchange')
+        self.assertEqual(stats['exclusive']['total'][solve], 200)
+        self.assertEqual(stats['exclusive']['mean'][solve], 50)
+        self.assertEqual(stats['exclusive']['min'][solve], 20)
+        self.assertEqual(stats['exclusive']['max'][solve], 80)
+        self.assertAlmostEqual(stats['exclusive']['stddev'][solve], 500 ** 0.5)
+        # Threads that didn't call a function count as zero
+        self.assertEqual(stats['calls']['min'][exchange], 0)
+        self.assertEqual(stats['calls']['mean'][exchange], 50)
+        self.assertEqual(stats['per_call'][exchange], 0.5)
+        self.assertListEqual([prof.functions[i] for i in summary.top_functions(stats, 'exclusive', 2)], 
+                             ['solve', 'exchange'])
+        self.assertListEqual([prof.functions[i] for i in summary.top_functions(stats, 'per_call', 1)], ['main'])
+
+    def test_write_report(self):
+        prof = self._load()
+        stream = StringIO()
+        summary.write_report(prof, stream, key='calls', count=2, header={'trial': 3})
+        text = stream.getvalue()
+        self.assertIn('Top 2 functions by TIME calls across 4 threads', text)
+        self.assertIn('exchange', text)
+        self.assertNotIn('main', text)
+        stream = StringIO()
+        summary.write_report(prof, stream, count=1, output='json', header={'trial': 3})
+        report = json.loads(stream.getvalue())
+        self.assertEqual(report['trial'], 3)
+        self.assertEqual(report['functions'][0]['function'], 'solve')
+        self.assertEqual(report['functions'][0]['exclusive']['max'], 80)
+        self.assertRaises(profile.ProfileError, summary.write_report, prof, stream, metrics=['PAPI_TOT_CYC'])
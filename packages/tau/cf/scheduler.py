@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Local scheduling of concurrent subprocesses.
+
+Runs tasks on a fixed number of worker threads and gives each worker its own set of CPUs
+so subprocesses running at the same time don't compete for cores.  Subprocesses are pinned 
+to their CPU sets with ``taskset`` when it is available.
+"""
+
+import sys
+import threading
+import multiprocessing
+from tau import logger, util
+
+
+LOGGER = logger.get_logger(__name__)
+
+_JOIN_INTERVAL = 0.1
+"""Seconds between checks for interrupts while waiting for worker threads."""
+
+
+def parse_cpu_list(cpu_list):
+    """Parses a Linux CPU list, e.g. "0-3,8-11".
+    
+    Args:
+        cpu_list (str): Comma-separated CPU numbers and ranges of CPU numbers.
+        
+    Returns:
+        list: Sorted CPU numbers.
+        
+    Raises:
+        ValueError: `cpu_list` is not a valid CPU list.
+    """
+    cpus = set()
+    for span in cpu_list.split(','):
+        span = span.strip()
+        if span:
+            first, _, last = span.partition('-')
+            cpus.update(range(int(first), int(last or first) + 1))
+    return sorted(cpus)
+
+
+def allowed_cpus():
+    """Gets the CPUs this process may run on according to its CPU affinity mask.
+    
+    Returns:
+        list: Sorted CPU numbers.
+    """
+    try:
+        with open('/proc/self/status') as fin:
+            for line in fin:
+                if line.startswith('Cpus_allowed_list:'):
+                    cpus = parse_cpu_list(line.split(':', 1)[1])
+                    if cpus:
+                        return cpus
+    except (IOError, ValueError):
+        pass
+    return range(multiprocessing.cpu_count())
+
+
+def cpu_sets(count):
+    """Partitions the allowed CPUs into disjoint sets of (nearly) equal size.
+    
+    Args:
+        count (int): Number of CPU sets.
+        
+    Returns:
+        list: `count` lists of CPU numbers, or `count` Nones if there are fewer allowed CPUs than 
+              CPU sets or if only one set is requested, i.e. if subprocesses should not be pinned.
+    """
+    cpus = allowed_cpus()
+    if count <= 1:
+        return [None] * count
+    if count > len(cpus):
+        LOGGER.warning("Only %d CPUs are available for %d concurrent tasks: tasks will share CPUs", len(cpus), count)
+        return [None] * count
+    size, extra = divmod(len(cpus), count)
+    sets = []
+    start = 0
+    for i in xrange(count):
+        end = start + size + (1 if i < extra else 0)
+        sets.append(cpus[start:end])
+        start = end
+    return sets
+
+
+def pinned_command(cmd, cpus):
+    """Modifies a command so it runs on the given CPUs.
+    
+    Args:
+        cmd (list): Command and its command line arguments.
+        cpus (list): CPU numbers, or None to leave `cmd` unpinned.
+        
+    Returns:
+        list: The pinned command, or `cmd` if `cpus` is None or ``taskset`` is not available.
+    """
+    if not cpus:
+        return cmd
+    taskset = util.which('taskset')
+    if not taskset:
+        LOGGER.debug("taskset not found: not pinning %s to CPUs %s", cmd, cpus)
+        return cmd
+    return [taskset, '-c', ','.join(str(cpu) for cpu in cpus)] + cmd
+
+
+def run_concurrently(func, count, concurrency):
+    """Calls a function for each of a number of tasks using a fixed number of worker threads.
+    
+    Tasks are started in order.  Each worker has a slot number so tasks can use per-worker 
+    resources, e.g. the CPU sets from :any:`cpu_sets`.  An exception in one task does not 
+    stop the other tasks.  If the calling thread is interrupted (e.g. by Ctrl-C) no further
+    tasks are started and the :any:`KeyboardInterrupt` is raised immediately.
+    
+    Args:
+        func: Callable taking a worker slot number and a task index.
+        count (int): Number of tasks.
+        concurrency (int): Maximum number of tasks to run at once.
+        
+    Returns:
+        tuple: (results, errors) where ``results[i]`` is the return value of task `i` and ``errors[i]`` 
+               is the :any:`sys.exc_info` tuple of the exception raised by task `i`, or None.
+               
+    Raises:
+        KeyboardInterrupt: The calling thread was interrupted before all tasks ended.
+    """
+    results = [None] * count
+    errors = [None] * count
+    tasks = iter(xrange(count))
+    tasks_lock = threading.Lock()
+    interrupted = threading.Event()
+    def worker(slot):
+        while not interrupted.is_set():
+            with tasks_lock:
+                idx = next(tasks, None)
+            if idx is None:
+                return
+            try:
+                results[idx] = func(slot, idx)
+            except Exception:  # pylint: disable=broad-except
+                errors[idx] = sys.exc_info()
+            except:
+                # KeyboardInterrupt or SystemExit, e.g. when a task runs on the calling thread
+                errors[idx] = sys.exc_info()
+                interrupted.set()
+                raise
+    concurrency = max(1, min(concurrency, count))
+    if concurrency == 1:
+        worker(0)
+    else:
+        threads = [threading.Thread(target=worker, args=(slot,)) for slot in xrange(concurrency)]
+        try:
+            for thread in threads:
+                thread.daemon = True
+                thread.start()
+            for thread in threads:
+                # Thread.join() without a timeout blocks signals in the calling thread
+                while thread.is_alive():
+                    thread.join(_JOIN_INTERVAL)
+        except KeyboardInterrupt:
+            interrupted.set()
+            raise
+    return results, errors
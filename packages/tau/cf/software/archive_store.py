@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Content-addressed software source archive store.
+
+Each storage level keeps source archives in ``<prefix>/src/sha256/<digest>``, where ``<digest>`` is
+the SHA-256 checksum of the archive file, and a manifest file ``<prefix>/src/manifest.json`` mapping
+each archive source (a URL or file path) to the checksum of the archive acquired from that source.
+An archive is only used if its checksum matches the manifest, so damaged or truncated archives are
+detected before extraction instead of after.  Archives are hardlinked rather than copied whenever
+possible, e.g. when they are acquired from a local mirror directory, and archives found in another
+storage level are hardlinked into the highest writable level so each archive is stored only once.
+
+The ``build.source_mirror`` configuration item is a comma-separated list of mirror directories, 
+``file://`` URLs, or HTTP URLs.  Archives are acquired from the mirrors by file name, in order, 
+before falling back to their original source, so software can be installed without network access.
+Interrupted downloads are resumed, see :any:`util.download`.
+"""
+
+import os
+import json
+import time
+import threading
+import fasteners
+from tau import logger, util, configuration
+from tau.cf.storage import StorageError
+from tau.cf.storage.levels import ORDERED_LEVELS, highest_writable_storage
+
+
+LOGGER = logger.get_logger(__name__)
+
+MANIFEST_FILE = 'manifest.json'
+"""str: Name of the file recording the checksum of the archive acquired from each source."""
+
+_MANIFEST_LOCK = threading.Lock()
+
+_DOWNLOAD_LOCKS_LOCK = threading.Lock()
+
+_DOWNLOAD_LOCKS = {}
+
+
+def _store_prefix(storage):
+    return os.path.join(storage.prefix, 'src')
+
+
+def _archive_path(storage, digest):
+    return os.path.join(_store_prefix(storage), 'sha256', digest)
+
+
+def _download_lock(path):
+    """Gets the lock that keeps other threads in this process from writing to a download path."""
+    with _DOWNLOAD_LOCKS_LOCK:
+        return _DOWNLOAD_LOCKS.setdefault(path, threading.Lock())
+
+
+def _read_manifest(storage):
+    try:
+        with open(os.path.join(_store_prefix(storage), MANIFEST_FILE)) as fin:
+            return json.load(fin)
+    except (IOError, ValueError):
+        return {}
+
+
+def _update_manifest(storage, src, digest):
+    prefix = _store_prefix(storage)
+    util.mkdirp(prefix)
+    # fasteners locks are per-process so also lock out other threads
+    with _MANIFEST_LOCK, fasteners.InterProcessLock(os.path.join(prefix, '.lock')):
+        manifest = _read_manifest(storage)
+        manifest[src] = digest
+        tmp_path = os.path.join(prefix, '%s.%d.tmp' % (MANIFEST_FILE, os.getpid()))
+        with open(tmp_path, 'w') as fout:
+            json.dump(manifest, fout, indent=2, sort_keys=True)
+        os.rename(tmp_path, os.path.join(prefix, MANIFEST_FILE))
+
+
+def expected_checksum(src):
+    """Finds the expected checksum of an archive.
+
+    Args:
+        src (str): URL or path to the archive file.
+
+    Returns:
+        str: Hexadecimal SHA-256 digest from the first storage level manifest that lists `src`, or None.
+    """
+    for storage in ORDERED_LEVELS:
+        try:
+            digest = _read_manifest(storage).get(src)
+        except StorageError:
+            continue
+        if digest:
+            return digest
+    return None
+
+
+def lookup(src):
+    """Finds a previously acquired archive in the store.
+
+    Args:
+        src (str): URL or path to the archive file.
+
+    Returns:
+        str: Path to a verified archive file, or None if `src` hasn't been acquired or the archive is damaged.
+    """
+    digest = expected_checksum(src)
+    if not digest:
+        return None
+    for storage in ORDERED_LEVELS:
+        try:
+            path = _archive_path(storage, digest)
+        except StorageError:
+            continue
+        if os.path.isfile(path):
+            if util.sha256sum(path) == digest:
+                LOGGER.debug("Found '%s' at '%s'", src, path)
+                return path
+            LOGGER.warning("Archive '%s' is damaged and will be acquired again", path)
+    return None
+
+
+def age(src):
+    """Finds how old an archive in the store is.
+
+    Args:
+        src (str): URL or path to the archive file.
+
+    Returns:
+        float: Seconds since the archive was downloaded, or None if `src` hasn't been acquired.
+    """
+    path = lookup(src)
+    if not path:
+        return None
+    # Downloads are new files and hardlinks keep the modification time of the original file
+    return time.time() - os.path.getmtime(path)
+
+
+def _link_into(storage, src, path):
+    """Hardlinks an archive found in another storage level into `storage`.
+
+    A damaged archive already in `storage` is replaced.  The manifest of `storage` records `src`
+    whenever `storage` has a verified copy of the archive.
+
+    Args:
+        storage: Storage level to link the archive into.
+        src (str): URL or path the archive was acquired from.
+        path (str): Path to a verified archive file.
+
+    Returns:
+        str: Path to the archive in `storage`, or `path` if the archive couldn't be linked.
+    """
+    digest = os.path.basename(path)
+    dest = _archive_path(storage, digest)
+    if dest != path and not (os.path.isfile(dest) and util.sha256sum(dest) == digest):
+        tmp_path = '%s.%d.%d.tmp' % (dest, os.getpid(), threading.current_thread().ident)
+        try:
+            util.mkdirp(os.path.dirname(dest))
+            os.link(path, tmp_path)
+            os.rename(tmp_path, dest)
+        except OSError as err:
+            # Probably on a different filesystem, so don't waste space on a copy
+            LOGGER.debug("Cannot link '%s' to '%s': %s", path, dest, err)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return path
+        LOGGER.debug("Linked '%s' to '%s'", path, dest)
+    if _read_manifest(storage).get(src) != digest:
+        _update_manifest(storage, src, digest)
+    return dest
+
+
+def _mirrors():
+    try:
+        mirrors = configuration.get('build.source_mirror')
+    except KeyError:
+        return []
+    return [mirror.strip() for mirror in str(mirrors).split(',') if mirror.strip()]
+
+
+def acquire(src, refresh=False, mirrors=None):
+    """Gets a verified copy of an archive in the store, downloading or copying it if necessary.
+
+    If the manifest already lists a checksum for `src` then a newly acquired archive must match
+    that checksum unless `refresh` is True.  Archives are added to the highest writable storage level,
+    and archives already in another storage level are hardlinked into it if possible.
+    Only one thread in one process downloads to a given path at a time.  Others wait and then use
+    the archive it acquired.
+
+    Args:
+        src (str): URL or path to the archive file.
+        refresh (bool): If True, always acquire a new copy of the archive and accept any checksum.
+        mirrors (list): Paths or URLs of directories to search for the archive before trying `src`.
+                        Default is the ``build.source_mirror`` configuration item.
+
+    Returns:
+        str: Path to the archive file.
+
+    Raises:
+        util.ChecksumError: The acquired archive does not match the expected checksum.
+        IOError: The archive could not be acquired.
+    """
+    storage = highest_writable_storage()
+    if not refresh:
+        path = lookup(src)
+        if path:
+            return _link_into(storage, src, path)
+    # Download next to the store so the archive can be renamed into place and so 
+    # partial downloads can be resumed if this fails
+    download_path = os.path.join(_store_prefix(storage), 'downloads', os.path.basename(src))
+    util.mkdirp(os.path.dirname(download_path))
+    # fasteners locks are per-process so also lock out other threads
+    with _download_lock(download_path), fasteners.InterProcessLock(download_path + '.lock'):
+        if not refresh:
+            # Another process may have acquired the archive while we waited for the lock
+            path = lookup(src)
+            if path:
+                return path
+        expected = None if refresh else expected_checksum(src)
+        util.download(src, download_path, mirrors=_mirrors() if mirrors is None else mirrors, sha256=expected)
+        digest = util.sha256sum(download_path)
+        path = _archive_path(storage, digest)
+        util.mkdirp(os.path.dirname(path))
+        os.rename(download_path, path)
+        _update_manifest(storage, src, digest)
+    LOGGER.debug("Stored '%s' at '%s'", src, path)
+    return path
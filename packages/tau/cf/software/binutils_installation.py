@@ -35,7 +35,6 @@ import os
 import sys
 import glob
 import shutil
-import fileinput
 from tau import logger, util
 from tau.error import ConfigurationError
 from tau.cf.target import DARWIN_OS, IBM_BGP_ARCH, IBM_BGQ_ARCH, IBM64_ARCH, INTEL_KNC_ARCH
@@ -114,9 +113,8 @@ class BinutilsInstallation(AutotoolsInstallation):
         shutil.copy(os.path.join(self.src_prefix, 'opcodes', 'libopcodes.a'), self.lib_path)
 
         LOGGER.debug("Fixing BFD header")
-        for line in fileinput.input(os.path.join(self.include_path, 'bfd.h'), inplace=1):
-            # fileinput.input with inplace=1 redirects stdout to the input file ... freaky
-            sys.stdout.write(line.replace('#if !defined PACKAGE && !defined PACKAGE_VERSION', '#if 0'))
+        util.replace_in_file(os.path.join(self.include_path, 'bfd.h'), 
+                             '#if !defined PACKAGE && !defined PACKAGE_VERSION', '#if 0')
 
     def compiletime_config(self, opts=None, env=None):
         """Configure compilation environment to use this software package. 
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Software build timing history.
+
+The wall clock time and CPU time of each build phase (e.g. `configure`, `make`, `make install`) 
+of each software package are appended to a history file in user-level storage along with the
+host name, the number of CPU cores, and the number of parallel `make` jobs.  The history is used 
+to estimate how long future builds will take and to show which phases are slowest, e.g. to reveal 
+hosts that are underprovisioned for parallel builds.
+"""
+
+import os
+import json
+import time
+import platform
+import threading
+import multiprocessing
+from tau import logger, util
+from tau.cf.storage.levels import USER_STORAGE
+
+
+LOGGER = logger.get_logger(__name__)
+
+HISTORY_FILE = os.path.join(USER_STORAGE.prefix, 'build_stats.jsonl')
+"""str: Path to the file recording build phase timings, one JSON object per line."""
+
+_HISTORY_LOCK = threading.Lock()
+
+
+def record(package, phase, jobs, wall, cpu):
+    """Records the timing of a completed build phase.
+    
+    Failure to record timing is not an error.
+    
+    Args:
+        package (str): Software package name, e.g. 'tau' or 'papi'.
+        phase (str): Build phase name, e.g. 'configure'.
+        jobs (int): Number of parallel `make` jobs, or None if the phase wasn't parallel.
+        wall (float): Wall clock time in seconds.
+        cpu (float): CPU time (user plus system) in seconds.
+    """
+    entry = {'package': package, 'phase': phase, 'host': platform.node(), 
+             'cores': multiprocessing.cpu_count(), 'jobs': jobs, 
+             'wall': wall, 'cpu': cpu, 'time': time.time()}
+    try:
+        util.mkdirp(os.path.dirname(HISTORY_FILE))
+        with _HISTORY_LOCK, open(HISTORY_FILE, 'a') as fout:
+            fout.write(json.dumps(entry, sort_keys=True) + '\n')
+    except (OSError, IOError) as err:
+        LOGGER.debug("Cannot record build timing: %s", err)
+
+
+def history():
+    """Reads the build timing history.
+    
+    Returns:
+        list: Build phase timing dictionaries, oldest first.
+    """
+    entries = []
+    try:
+        with open(HISTORY_FILE) as fin:
+            for line in fin:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    # Lines may be truncated if TAU Commander was killed while writing
+                    continue
+    except IOError:
+        pass
+    return entries
+
+
+def estimate(package, phase, jobs):
+    """Estimates how long a build phase will take on this host.
+    
+    The estimate is the median wall clock time of the last five builds of the same phase of the 
+    same package on this host, preferring builds that used the same number of `make` jobs.
+    
+    Args:
+        package (str): Software package name, e.g. 'tau' or 'papi'.
+        phase (str): Build phase name, e.g. 'configure'.
+        jobs (int): Number of parallel `make` jobs, or None if the phase isn't parallel.
+    
+    Returns:
+        float: Estimated wall clock time in seconds, or None if there is no history.
+    """
+    host = platform.node()
+    cores = multiprocessing.cpu_count()
+    similar = [entry for entry in history() 
+               if (entry.get('package'), entry.get('phase'), entry.get('host'), entry.get('cores')) == 
+               (package, phase, host, cores)]
+    same_jobs = [entry for entry in similar if entry.get('jobs') == jobs]
+    recent = sorted(entry['wall'] for entry in (same_jobs or similar)[-5:])
+    if not recent:
+        return None
+    return recent[len(recent) // 2]
+
+
+def summary():
+    """Summarizes the build timing history.
+    
+    Builds are grouped by package, phase, host, core count, and `make` job count.
+    
+    Returns:
+        list: Dictionaries with keys 'package', 'phase', 'host', 'cores', 'jobs', 'builds', 'wall', 'cpu', 
+              and 'efficiency', sorted by average wall clock time, slowest first.  'wall' and 'cpu' are averages. 
+              'efficiency' is CPU time divided by the product of wall clock time and `make` jobs, i.e. the
+              fraction of the requested parallelism the build actually achieved.
+    """
+    groups = {}
+    for entry in history():
+        try:
+            key = (entry['package'], entry['phase'], entry['host'], entry['cores'], entry['jobs'])
+            groups.setdefault(key, []).append((float(entry['wall']), float(entry['cpu'])))
+        except (KeyError, TypeError, ValueError):
+            continue
+    rows = []
+    for (package, phase, host, cores, jobs), timings in groups.iteritems():
+        wall = sum(timing[0] for timing in timings) / len(timings)
+        cpu = sum(timing[1] for timing in timings) / len(timings)
+        efficiency = cpu / (wall * (jobs or 1)) if wall else 0.0
+        rows.append({'package': package, 'phase': phase, 'host': host, 'cores': cores, 'jobs': jobs,
+                     'builds': len(timings), 'wall': wall, 'cpu': cpu, 'efficiency': efficiency})
+    return sorted(rows, key=lambda row: row['wall'], reverse=True)
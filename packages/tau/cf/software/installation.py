@@ -29,40 +29,181 @@
 
 import os
 import sys
+import json
+import fcntl
+import tarfile
+import threading
+import subprocess
 import multiprocessing
+from contextlib import contextmanager
+from StringIO import StringIO
 from tau import logger, util, configuration
 from tau.error import ConfigurationError
+from tau.progress import progress_spinner
+from tau.cf import scheduler
 from tau.cf.storage.levels import ORDERED_LEVELS
 from tau.cf.storage.levels import highest_writable_storage 
-from tau.cf.software import SoftwarePackageError
+from tau.cf.software import SoftwarePackageError, archive_store, build_stats
 from tau.cf.target import Architecture, OperatingSystem
 from tau.cf.compiler.host import CC, CXX
 
 LOGGER = logger.get_logger(__name__)
 
 
+_TMPFS_PREFIX_LOCK = threading.Lock()
+
+_HELD_INSTALL_LOCKS_LOCK = threading.Lock()
+
+_HELD_INSTALL_LOCKS = {}
+
+BINARY_CACHE_MANIFEST = '.tau_binary_cache'
+"""str: Name of the archive member in a binary cache archive that records where the archived files were installed."""
+
+VERIFY_STAMP = '.tau_verified'
+"""str: Name of the file in an installation prefix that records successful verifications."""
+
+
+MAKE_JOB_MEMORY = 512 * 1024 * 1024
+"""int: Bytes of memory to reserve for each parallel `make` job."""
+
+
+def _read_first_line(path):
+    try:
+        with open(path) as fin:
+            return fin.readline().strip()
+    except IOError:
+        return None
+
+
+def available_cpus():
+    """Number of CPU cores this process may use.
+    
+    Accounts for the CPU affinity mask and for cgroup CPU bandwidth limits, e.g. as 
+    imposed by container runtimes or by batch systems on shared login nodes.
+    
+    Returns:
+        float: Number of CPU cores, possibly fractional if limited by a cgroup quota.
+    """
+    cpus = float(min(multiprocessing.cpu_count(), len(scheduler.allowed_cpus())))
+    # cgroup v2 then cgroup v1
+    quota = _read_first_line('/sys/fs/cgroup/cpu.max')
+    if quota:
+        quota, _, period = quota.partition(' ')
+    else:
+        quota = _read_first_line('/sys/fs/cgroup/cpu/cpu.cfs_quota_us')
+        period = _read_first_line('/sys/fs/cgroup/cpu/cpu.cfs_period_us')
+    try:
+        quota, period = int(quota), int(period)
+    except (TypeError, ValueError):
+        pass
+    else:
+        if quota > 0 and period > 0:
+            cpus = min(cpus, float(quota) / period)
+    return max(1.0, cpus)
+
+
+def available_memory():
+    """Bytes of memory available to new processes without swapping.
+    
+    Accounts for cgroup memory limits as well as system-wide available memory.
+    
+    Returns:
+        int: Available memory in bytes, or None if it cannot be determined.
+    """
+    available = None
+    try:
+        with open('/proc/meminfo') as fin:
+            for line in fin:
+                if line.startswith('MemAvailable:'):
+                    available = int(line.split()[1]) * 1024
+                    break
+    except (IOError, ValueError, IndexError):
+        pass
+    for limit_file, usage_file in (('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory.current'),
+                                   ('/sys/fs/cgroup/memory/memory.limit_in_bytes', 
+                                    '/sys/fs/cgroup/memory/memory.usage_in_bytes')):
+        try:
+            headroom = int(_read_first_line(limit_file)) - int(_read_first_line(usage_file))
+        except (TypeError, ValueError):
+            # Unlimited ('max') or not in a cgroup
+            continue
+        available = headroom if available is None else min(available, headroom)
+        break
+    return available
+
+
+def max_make_jobs():
+    """Maximum number of parallel `make` jobs to use when building software.
+    
+    Uses the ``build.max_make_jobs`` configuration item if it is set.  Otherwise the job count
+    is one less than the number of available CPU cores (see :any:`available_cpus`), reduced to 
+    the number of cores that are idle according to the system load average, and reduced further
+    if there isn't :any:`MAKE_JOB_MEMORY` available memory per job.
+    
+    Returns:
+        int: Maximum number of parallel `make` jobs.
+        
+    Raises:
+        ConfigurationError: ``build.max_make_jobs`` is not a positive integer.
+    """
+    try:
+        nprocs = configuration.get('build.max_make_jobs')
+    except KeyError:
+        cpus = available_cpus()
+        nprocs = int(cpus) - 1
+        try:
+            nprocs = min(nprocs, int(cpus - os.getloadavg()[0]))
+        except OSError:
+            pass
+        memory = available_memory()
+        if memory is not None:
+            nprocs = min(nprocs, memory // MAKE_JOB_MEMORY)
+        nprocs = max(1, nprocs)
+        LOGGER.debug("%d make jobs for %g available CPUs and %s bytes available memory", nprocs, cpus, memory)
+    try:
+        nprocs = int(nprocs)
+        if nprocs < 1:
+            raise ValueError
+    except ValueError:
+        raise ConfigurationError("Invalid parallel make job count: %s" % nprocs)
+    return nprocs
+
+
 def parallel_make_flags(nprocs=None):
     """Flags to enable parallel compilation with `make`.
     
+    `make` is also asked not to start new jobs while the system load average exceeds
+    the number of available CPU cores so concurrent builds don't overload the system.
+    
     Args:
-        ncores (int): Number of parallel processes to use.  
-                      Default is one less than the number of CPU cores.
+        nprocs (int): Number of parallel processes to use.  
+                      Default is :any:`max_make_jobs`.
                       
     Returns:
         list: Command line arguments to pass to `make`.
     """
     if not nprocs:
-        try:
-            nprocs = configuration.get('build.max_make_jobs')
-        except KeyError:
-            nprocs = max(1, multiprocessing.cpu_count() - 1)
-        try:
-            nprocs = int(nprocs)
-            if nprocs < 1:
-                raise ValueError
-        except ValueError:
-            raise ConfigurationError("Invalid parallel make job count: %s" % nprocs)
-    return ['-j', str(nprocs)]
+        nprocs = max_make_jobs()
+    return ['-j', str(nprocs), '-l', '%g' % available_cpus()]
+
+
+def reduced_make_jobs(nprocs):
+    """Parallel `make` job counts to try, in order, when a parallel build fails.
+    
+    Parallel builds most often fail because of missing dependencies in makefiles or 
+    because the system ran out of memory, so halve the job count on each retry rather 
+    than immediately falling back to a serial build.
+    
+    Args:
+        nprocs (int): Number of parallel processes used by the first attempt.
+        
+    Returns:
+        list: Job counts, starting with `nprocs` and ending with 1.
+    """
+    counts = [max(1, nprocs)]
+    while counts[-1] > 1:
+        counts.append(counts[-1] // 2)
+    return counts
 
 
 def tmpfs_prefix():
@@ -76,33 +217,283 @@ def tmpfs_prefix():
         str: Path to a uniquely-named directory in the temporary filesystem. The directory 
             and all its contents **will be deleted** when the program exits.
     """
+    with _TMPFS_PREFIX_LOCK:
+        try:
+            tmp_prefix = tmpfs_prefix.value
+        except AttributeError:
+            import tempfile
+            import subprocess
+            from stat import S_IRUSR, S_IWUSR, S_IEXEC
+            for prefix in "/dev/shm", tempfile.gettempdir(), highest_writable_storage().prefix:
+                try:
+                    tmp_prefix = util.mkdtemp(dir=prefix)
+                except (OSError, IOError) as err:
+                    LOGGER.debug(err)
+                    continue
+                # Check execute privilages some distros mount tmpfs with the noexec option.
+                try:
+                    with tempfile.NamedTemporaryFile(dir=tmp_prefix, delete=False) as tmp_file:
+                        tmp_path = tmp_file.name
+                        tmp_file.write("#!/bin/sh\nexit 0")
+                    os.chmod(tmp_path, S_IRUSR | S_IWUSR | S_IEXEC)
+                    subprocess.check_call([tmp_path])
+                except (OSError, IOError, subprocess.CalledProcessError) as err:
+                    LOGGER.debug(err)
+                    continue
+                else:
+                    break
+            tmpfs_prefix.value = tmp_prefix
+        return tmp_prefix
+
+
+@contextmanager
+def install_lock(path, shared=False):
+    """Interprocess reader/writer lock on a software installation.
+    
+    Any number of processes may hold a shared lock while no process holds the exclusive lock.
+    Verifying an installation needs a shared lock and installing software needs an exclusive lock, 
+    so processes only wait for each other when one of them is actually installing the package.
+    
+    The lock is held by the process, not the thread.  If this process already holds the lock 
+    exclusively, or holds it shared and `shared` is True, then the lock is acquired immediately.
+    This lets the threads started by :any:`install_packages` verify what they are installing.
+    A thread holding a shared lock must not request an exclusive lock on the same file.
+    If the lock file cannot be created, e.g. in a read-only system installation, then no lock
+    is acquired since this process couldn't install software there anyway.  Only the exclusive
+    lock creates the lock file, so verifying software doesn't create files or directories, e.g. 
+    in storage levels where the software isn't installed.  No shared lock is acquired if the 
+    lock file doesn't exist since the software hasn't been installed there by this program.
+    
+    Args:
+        path (str): Path to the lock file.
+        shared (bool): If True, acquire a shared lock.  Otherwise acquire an exclusive lock.
+    """
+    with _HELD_INSTALL_LOCKS_LOCK:
+        held = _HELD_INSTALL_LOCKS.get(path)
+        if held and (shared or not held['shared']):
+            held['count'] += 1
+        else:
+            held = None
+    if not held:
+        try:
+            if shared:
+                lock_file = open(path, 'r')
+            else:
+                util.mkdirp(os.path.dirname(path))
+                lock_file = open(path, 'a')
+        except (OSError, IOError) as err:
+            LOGGER.debug("Cannot lock '%s': %s", path, err)
+            yield
+            return
+        LOGGER.debug("Acquiring %s lock '%s'", 'shared' if shared else 'exclusive', path)
+        fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        with _HELD_INSTALL_LOCKS_LOCK:
+            held = _HELD_INSTALL_LOCKS.setdefault(path, {'file': lock_file, 'shared': shared, 'count': 0})
+            held['count'] += 1
+        if held['file'] is not lock_file:
+            # Another thread acquired the same shared lock at the same time
+            lock_file.close()
     try:
-        tmp_prefix = tmpfs_prefix.value
-    except AttributeError:
-        import tempfile
-        import subprocess
-        from stat import S_IRUSR, S_IWUSR, S_IEXEC
-        for prefix in "/dev/shm", tempfile.gettempdir(), highest_writable_storage().prefix:
-            try:
-                tmp_prefix = util.mkdtemp(dir=prefix)
-            except (OSError, IOError) as err:
-                LOGGER.debug(err)
+        yield
+    finally:
+        with _HELD_INSTALL_LOCKS_LOCK:
+            held['count'] -= 1
+            if not held['count']:
+                del _HELD_INSTALL_LOCKS[path]
+                fcntl.flock(held['file'], fcntl.LOCK_UN)
+                held['file'].close()
+
+
+def install_packages(packages, force_reinstall=False):
+    """Installs software packages and all the packages they depend on.
+    
+    Packages are installed in dependency order but packages that do not depend on each 
+    other are built concurrently.  Packages that appear more than once in the dependency
+    graph (e.g. binutils is required by both TAU and Score-P) are only installed once.
+    The `make` job budget from :any:`max_make_jobs` is divided evenly among the builds 
+    that are running or ready to run when a build starts.  Each build extracts its source 
+    code to its own directory below :any:`tmpfs_prefix` and logs to its own file, see
+    :any:`Installation.build_log`.  Each package is first verified under a shared :any:`install_lock`
+    so any number of processes can use the package at the same time.  Only packages that fail 
+    verification are installed, under an exclusive lock, and they are verified again once the 
+    exclusive lock is held in case another process installed the package in the meantime.
+    
+    Args:
+        packages (list): :any:`Installation` objects to install.
+        force_reinstall (bool): If True, reinstall even if the software package passes verification.
+        
+    Raises:
+        SoftwarePackageError: Installation failed.  If several packages fail then the first error is raised.
+    """
+    # Build the dependency graph.  Packages are identified by their installation prefix.
+    nodes = {}
+    prereqs = {}
+    def visit(pkg):
+        key = pkg.install_prefix
+        if key not in nodes:
+            nodes[key] = pkg
+            prereqs[key] = set(visit(dep) for dep in pkg.dependencies.itervalues())
+        return key
+    for pkg in packages:
+        visit(pkg)
+    if not nodes:
+        return
+    total_jobs = max_make_jobs()
+    pending = set(nodes)
+    running = set()
+    completed = set()
+    errors = []
+    cond = threading.Condition()
+
+    def worker(key, pkg):
+        try:
+            # pylint: disable=protected-access
+            if force_reinstall or not pkg._verified():
+                with pkg._install_lock():
+                    pkg._install_package(force_reinstall)
+        except Exception:                               # pylint: disable=broad-except
+            with cond:
+                errors.append(sys.exc_info())
+        else:
+            with cond:
+                completed.add(key)
+        finally:
+            with cond:
+                running.remove(key)
+                cond.notify()
+
+    with cond:
+        while pending or running:
+            ready = [] if errors else [key for key in pending if prereqs[key] <= completed]
+            if ready:
+                jobs = max(1, total_jobs // (len(ready) + len(running)))
+                for key in ready:
+                    pkg = nodes[key]
+                    pkg.make_jobs = jobs
+                    LOGGER.debug("Starting %s installation with %d make jobs", pkg.name, jobs)
+                    pending.remove(key)
+                    running.add(key)
+                    thread = threading.Thread(target=worker, args=(key, pkg))
+                    thread.daemon = True
+                    thread.start()
+            elif not running:
+                # A dependency failed so nothing else can be installed
+                break
+            # Wait with a timeout so the main thread still responds to KeyboardInterrupt
+            cond.wait(0.25)
+    if errors:
+        exc_type, exc_value, exc_tb = errors[0]
+        raise exc_type, exc_value, exc_tb
+
+
+def binary_cache_prefix():
+    """Path to the binary cache directory.
+    
+    Packed software installations are kept in the directory named by the ``build.binary_cache`` 
+    configuration item.  The directory may be on a shared filesystem so that installations are 
+    reused across hosts and user accounts, e.g. ``tau configure --system build.binary_cache /shared/tau``.
+
+    Returns:
+        str: Absolute path to the binary cache directory, or None if the binary cache is disabled.
+    """
+    try:
+        prefix = configuration.get('build.binary_cache')
+    except KeyError:
+        return None
+    if not prefix:
+        return None
+    return os.path.abspath(os.path.expanduser(prefix))
+
+
+def _relocate_rpath(patchelf, path, replacements):
+    """Rewrite the RPATH or RUNPATH of an ELF file that has moved.
+    
+    Args:
+        patchelf (str): Path to the `patchelf` command.
+        path (str): Path to the ELF file.
+        replacements (list): (old, new) path string tuples, longest first.
+        
+    Returns:
+        bool: True if the file no longer contains any old path, False otherwise.
+    """
+    try:
+        rpath = subprocess.check_output([patchelf, '--print-rpath', path], stderr=subprocess.STDOUT).strip()
+        relocated = rpath
+        for old, new in replacements:
+            relocated = relocated.replace(old, new)
+        if relocated != rpath:
+            LOGGER.debug("Changing RPATH of '%s' to '%s'", path, relocated)
+            subprocess.check_output([patchelf, '--set-rpath', relocated, path], stderr=subprocess.STDOUT)
+        with open(path, 'rb') as fin:
+            data = fin.read()
+    except (subprocess.CalledProcessError, OSError, IOError) as err:
+        LOGGER.debug("Cannot relocate '%s': %s", path, err)
+        return False
+    return not any(old in data for old, _ in replacements)
+
+
+def _relocate(prefix, replacements):
+    """Rewrite absolute paths in an installation that has moved.
+    
+    Replaces paths in text files and symbolic link targets.  Binary files can't be rewritten
+    in general, but if `patchelf` is installed then the RPATH or RUNPATH of ELF files is updated.
+    
+    Args:
+        prefix (str): Path to the installation directory.
+        replacements (list): (old, new) path string tuples.
+        
+    Returns:
+        list: Paths to binary files that still contain an old path and would not work after the move.
+    """
+    # Replace longer paths first in case one path is a prefix of another
+    replacements = sorted(replacements, key=lambda item: len(item[0]), reverse=True)
+    patchelf = util.which('patchelf')
+    unrelocated = []
+    for root, _, files in os.walk(prefix):
+        for name in files:
+            path = os.path.join(root, name)
+            if os.path.islink(path):
+                target = os.readlink(path)
+                for old, new in replacements:
+                    if target.startswith(old):
+                        os.unlink(path)
+                        os.symlink(new + target[len(old):], path)
+                        break
                 continue
-            # Check execute privilages some distros mount tmpfs with the noexec option.
             try:
-                with tempfile.NamedTemporaryFile(dir=tmp_prefix, delete=False) as tmp_file:
-                    tmp_path = tmp_file.name
-                    tmp_file.write("#!/bin/sh\nexit 0")
-                os.chmod(tmp_path, S_IRUSR | S_IWUSR | S_IEXEC)
-                subprocess.check_call([tmp_path])
-            except (OSError, IOError, subprocess.CalledProcessError) as err:
+                with open(path, 'rb') as fin:
+                    text = fin.read()
+            except IOError as err:
                 LOGGER.debug(err)
                 continue
-            else:
-                break
-        tmpfs_prefix.value = tmp_prefix
-    return tmp_prefix
-    
+            if '\0' in text[:8192]:
+                if any(old in text for old, _ in replacements):
+                    if not (patchelf and text.startswith('\x7fELF') and _relocate_rpath(patchelf, path, replacements)):
+                        unrelocated.append(path)
+                continue
+            relocated = text
+            for old, new in replacements:
+                relocated = relocated.replace(old, new)
+            if relocated != text:
+                with open(path, 'wb') as fout:
+                    fout.write(relocated)
+    return unrelocated
+
+
+def _move_into(src, dest):
+    """Move every file in directory `src` to the same relative path in directory `dest`, replacing existing files."""
+    for root, dirs, files in os.walk(src):
+        rel = os.path.relpath(root, src)
+        for name in dirs:
+            path = os.path.join(root, name)
+            if os.path.islink(path):
+                files.append(name)
+        for name in files:
+            target = os.path.normpath(os.path.join(dest, rel, name))
+            util.mkdirp(os.path.dirname(target))
+            if os.path.isdir(target) and not os.path.islink(target):
+                util.rmtree(target)
+            os.rename(os.path.join(root, name), target)
 
 
 class Installation(object):
@@ -119,6 +510,7 @@ class Installation(object):
         verify_libraries (list): List of libraries that are present in a valid installation.
         verify_headers (list): List of header files that are present in a valid installation.
         src_prefix (str): Directory containing package source code.
+        make_jobs (int): Number of parallel `make` jobs to use when building, or None for the default.
     """
     
     def __init__(self, name, title, sources, target_arch, target_os, compilers, 
@@ -170,6 +562,7 @@ class Installation(object):
         self.lib_path = None
         self._build_prefix = None
         self._install_prefix = None
+        self.make_jobs = None
 
     def _calculate_uid(self):
         # Most packages only care about changes in C/C++ compilers
@@ -215,6 +608,28 @@ class Installation(object):
     def install_prefix(self, value):
         self._set_install_prefix(value)
 
+    @property
+    def build_log(self):
+        """Path to the file recording output from the most recent build of this package."""
+        return os.path.join(os.path.dirname(logger.LOG_FILE), 'build_logs', 
+                            '%s.%s.log' % (self.name, os.path.basename(self.install_prefix)))
+
+    def _install_lock(self, shared=False):
+        """Interprocess lock on this package's installation prefix, see :any:`install_lock`.
+        
+        The lock file is a sibling of the installation prefix so every installation of 
+        the same package with the same uid uses the same lock file.
+        
+        Args:
+            shared (bool): If True, acquire a shared lock for verification.  Otherwise acquire an 
+                           exclusive lock for installation.
+        
+        Returns:
+            A context manager that holds the lock.
+        """
+        prefix = self.install_prefix
+        return install_lock(os.path.join(os.path.dirname(prefix), '.%s.lock' % os.path.basename(prefix)), shared)
+
     def _lookup_target_os_list(self, dct):
         if not dct:
             return []
@@ -226,11 +641,130 @@ class Installation(object):
         else:
             return arch_dct.get(self.target_os, arch_dct.get(None, default))
         
+    def _binary_cache_archive(self):
+        """Path to the archive file for this installation in the binary cache.
+        
+        Archives are named by the installation's unique identifier so they are only reused 
+        by installations of the same source, architecture, operating system, and compilers.
+
+        Returns:
+            str: Absolute path to the archive file, or None if this installation can't be cached.
+        """
+        cache_prefix = binary_cache_prefix()
+        # Don't cache installations that TAU Commander didn't build
+        if not (cache_prefix and self.install_prefix and self.src):
+            return None
+        uid = os.path.basename(self.install_prefix)
+        return os.path.join(cache_prefix, self.name, uid + '.tgz')
+
+    def _save_to_binary_cache(self, files=None):
+        """Pack this installation into the binary cache.
+        
+        The archive records the installation prefix and the installation prefixes of all
+        dependencies in a :any:`BINARY_CACHE_MANIFEST` member so :any:`_restore_from_binary_cache` 
+        can relocate the installation.  Failure to save an archive is not an error.
+        
+        Args:
+            files (list): Paths relative to the installation prefix to pack.  By default the
+                          whole installation prefix is packed.
+        """
+        archive = self._binary_cache_archive()
+        if not archive:
+            return
+        manifest = json.dumps({'prefix': self.install_prefix,
+                               'dependencies': dict((name, pkg.install_prefix) 
+                                                    for name, pkg in self.dependencies.iteritems())})
+        if files is None:
+            files = [name for name in os.listdir(self.install_prefix) if name != VERIFY_STAMP]
+        tmp_archive = '%s.%d.tmp' % (archive, os.getpid())
+        LOGGER.info("Adding %s to binary cache '%s'", self.title, archive)
+        try:
+            util.mkdirp(os.path.dirname(archive))
+            # Verification stamps are not valid after the archive is restored somewhere else
+            exclude_stamp = lambda info: None if os.path.basename(info.name) == VERIFY_STAMP else info
+            with progress_spinner(show_cpu=False):
+                with tarfile.open(tmp_archive, 'w:gz') as fout:
+                    info = tarfile.TarInfo(BINARY_CACHE_MANIFEST)
+                    info.size = len(manifest)
+                    fout.addfile(info, StringIO(manifest))
+                    for name in sorted(files):
+                        fout.add(os.path.join(self.install_prefix, name), arcname=name, filter=exclude_stamp)
+            # Other hosts may be reading the cache so replace the archive atomically
+            os.rename(tmp_archive, archive)
+        except (OSError, IOError, tarfile.TarError) as err:
+            LOGGER.warning("Failed to add %s to binary cache: %s", self.title, err)
+            if os.path.exists(tmp_archive):
+                os.remove(tmp_archive)
+
+    def _restore_from_binary_cache(self, merge=False):
+        """Restore this installation from the binary cache, if possible.
+        
+        Unpacks the cached archive, rewrites paths if the installation or its dependencies 
+        were originally installed elsewhere, and verifies the restored installation.
+        The archive is not restored if it contains binary files that refer to the original 
+        installation paths and can't be relocated, see :any:`_relocate`.
+        
+        Args:
+            merge (bool): If True, add the archived files to an existing installation prefix.
+                          Otherwise existing installations are never overwritten.
+        
+        Returns:
+            bool: True if the installation was restored and verified, False otherwise.
+        """
+        archive = self._binary_cache_archive()
+        if not (archive and os.path.isfile(archive)) or (os.path.exists(self.install_prefix) and not merge):
+            return False
+        LOGGER.info("Restoring %s from binary cache '%s'", self.title, archive)
+        parent = os.path.dirname(self.install_prefix)
+        util.mkdirp(parent)
+        # Extract next to the installation prefix so the final move is atomic
+        tmp_prefix = util.mkdtemp(dir=parent)
+        restored = os.path.join(tmp_prefix, os.path.basename(self.install_prefix))
+        try:
+            with tarfile.open(archive) as fin:
+                manifest = json.load(fin.extractfile(BINARY_CACHE_MANIFEST))
+                members = [info for info in fin.getmembers() if info.name != BINARY_CACHE_MANIFEST]
+                for info in members:
+                    if os.path.isabs(info.name) or os.path.normpath(info.name).startswith('..'):
+                        raise tarfile.TarError("Unsafe archive member '%s'" % info.name)
+                fin.extractall(restored, members)
+            replacements = [(str(manifest['prefix']), self.install_prefix)]
+            for name, old_prefix in manifest['dependencies'].iteritems():
+                pkg = self.dependencies.get(name)
+                if pkg:
+                    replacements.append((str(old_prefix), pkg.install_prefix))
+            replacements = [item for item in replacements if item[0] != item[1]]
+            if replacements:
+                LOGGER.debug("Relocating restored %s installation: %s", self.title, replacements)
+                unrelocated = _relocate(restored, replacements)
+                if unrelocated:
+                    LOGGER.info("Not restoring %s from binary cache: '%s' can't be relocated", 
+                                self.title, unrelocated[0])
+                    return False
+            if os.path.exists(self.install_prefix):
+                _move_into(restored, self.install_prefix)
+            else:
+                os.rename(restored, self.install_prefix)
+        except (OSError, IOError, ValueError, KeyError, tarfile.TarError) as err:
+            LOGGER.warning("Failed to restore %s from binary cache: %s", self.title, err)
+            return False
+        finally:
+            util.rmtree(tmp_prefix, ignore_errors=True)
+        try:
+            self.verify()
+        except SoftwarePackageError as err:
+            LOGGER.warning("%s restored from binary cache is invalid: %s", self.title, err)
+            if not merge:
+                util.rmtree(self.install_prefix, ignore_errors=True)
+            return False
+        return True
+
     def _prepare_src(self, reuse_archive=True):
         """Prepares source code for installation.
         
         Acquires package source code archive file via download or file copy,
-        unpacks the archive, and verifies that required paths exist.
+        unpacks the archive, and verifies that required paths exist.  If a reused 
+        archive can't be unpacked then a fresh copy of the archive is acquired.
         
         Args:
             reuse_archive (bool): If True, attempt to reuse archive files.
@@ -243,36 +777,177 @@ class Installation(object):
         """
         if not self.src:
             raise ConfigurationError("No source code provided for %s" % self.title)
-        archive_name = os.path.basename(self.src)
-        # Acquire a new copy of the source archive, if needed.
-        if not reuse_archive:
-            archive_prefix = os.path.join(highest_writable_storage().prefix, "src")
-            archive = os.path.join(archive_prefix, archive_name)
-            try:
-                util.download(self.src, archive)
-            except IOError:
-                raise ConfigurationError("Cannot acquire source archive '%s'" % self.src,
-                                         "Check that the file or directory is accessable")
-        # Locate archive file
-        for storage in ORDERED_LEVELS:
-            archive_prefix = os.path.join(storage.prefix, "src")
-            archive = os.path.join(archive_prefix, archive_name)
-            if os.path.exists(archive):
-                LOGGER.info("Using %s source archive '%s'", self.title, archive)
-                break
         try:
-            return util.extract_archive(archive, tmpfs_prefix())
+            archive = archive_store.acquire(self.src, refresh=not reuse_archive)
+        except util.ChecksumError as err:
+            raise ConfigurationError("Cannot verify source archive '%s': %s" % (self.src, err),
+                                     "Use `tau software prefetch --refresh` to accept a new archive")
+        except IOError as err:
+            raise ConfigurationError("Cannot acquire source archive '%s': %s" % (self.src, err),
+                                     "Check that the file or directory is accessable")
+        LOGGER.info("Using %s source archive '%s'", self.title, archive)
+        try:
+            # Extract to a private directory since other packages may be building concurrently
+            return util.extract_archive(archive, util.mkdtemp(prefix=self.name+'-', dir=tmpfs_prefix()))
         except IOError as err:
             if reuse_archive:
-                # Try again with a fresh copy of the source archive
+                # The archive matches its recorded checksum so the recorded archive itself is damaged
+                LOGGER.warning("Cannot extract source archive '%s', acquiring a fresh copy: %s", archive, err)
                 return self._prepare_src(reuse_archive=False)
             raise ConfigurationError("Cannot extract source archive '%s': %s" % (archive, err),
                                      "Check that the file or directory is accessable")
 
+    def _run_phase(self, phase, cmd, env=None, jobs=None):
+        """Runs a build command in the source directory and records how long it took.
+        
+        A progress bar with an estimated time remaining is shown if this phase has been
+        run on this host before, see :any:`build_stats`.
+        
+        Args:
+            phase (str): Build phase name, e.g. 'configure'.
+            cmd (list): Command and its arguments.
+            env (dict): Environment variables to set before invoking the command.
+            jobs (int): Number of parallel `make` jobs passed in `cmd`, or None if the phase isn't parallel.
+            
+        Returns:
+            int: Command return code.
+        """
+        expected = build_stats.estimate(self.name, phase, jobs)
+        timing = {}
+        retval = util.create_subprocess(cmd, cwd=self.src_prefix, env=env, stdout=False, show_progress=True,
+                                        expected_duration=expected, timing=timing)
+        if not retval:
+            build_stats.record(self.name, phase, jobs, timing['wall'], timing['cpu'])
+        return retval
+
+    def _run_make(self, phase, args, env=None, parallel=True):
+        """Runs `make` in the source directory, retrying with fewer parallel jobs if it fails.
+        
+        Args:
+            phase (str): Build phase name, e.g. 'make install'.
+            args (list): Targets and flags to pass to `make`.
+            env (dict): Environment variables to set before invoking `make`.
+            parallel (bool): If True, pass parallelization flags to `make`.
+            
+        Returns:
+            int: Return code of the last `make` invocation.
+        """
+        attempts = reduced_make_jobs(self.make_jobs or max_make_jobs()) if parallel else [1]
+        for i, jobs in enumerate(attempts):
+            if i:
+                LOGGER.warning("%s %s failed, retrying with %d make job%s", 
+                               self.title, phase, jobs, '' if jobs == 1 else 's')
+            if jobs > 1:
+                retval = self._run_phase(phase, ['make'] + parallel_make_flags(jobs) + args, env, jobs)
+            else:
+                retval = self._run_phase(phase, ['make'] + args, env)
+            if not retval:
+                break
+        return retval
+
+    def _verify_stamp_key(self):
+        """Identifies the configuration checked by :any:`verify` in the verification stamp.
+        
+        Subclasses that install several configurations to the same prefix should override this.
+        
+        Returns:
+            str: Verification stamp key.
+        """
+        return os.path.basename(self.install_prefix)
+
+    def _verify_paths(self):
+        """Files and directories whose modification may invalidate the installation.
+        
+        These are the commands, libraries, and headers checked by :any:`_verify`.  Subclasses that 
+        check other files or directories in :any:`_verify` should extend this.
+        
+        Returns:
+            list: Paths to files and directories.
+        """
+        paths = [os.path.join(self.bin_path, cmd) for cmd in self.verify_commands]
+        for lib in self.verify_libraries:
+            paths.append(os.path.join(self.lib_path, lib))
+            paths.append(os.path.join(self.lib_path+'64', lib))
+        paths.extend(os.path.join(self.include_path, header) for header in self.verify_headers)
+        return paths
+
+    def _verify_fingerprint(self):
+        """Cheaply summarize the state of the installation.
+        
+        If an installation's fingerprint hasn't changed since it was last verified then it's still valid.
+        The fingerprint records the modification time, size, and mode of each path in :any:`_verify_paths`, 
+        so replacing or removing any file that :any:`_verify` checks is detected, and the installation 
+        prefix of each dependency.
+        
+        Returns:
+            list: JSON serializable fingerprint data.
+        """
+        fingerprint = []
+        for path in self._verify_paths():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                fingerprint.append([path, None])
+            else:
+                fingerprint.append([path, stat.st_mtime, stat.st_size, stat.st_mode])
+        for name, pkg in sorted(self.dependencies.iteritems()):
+            fingerprint.append([name, pkg.install_prefix])
+        return fingerprint
+
     def verify(self):
         """Check if the installation at :any:`installation_prefix` is valid.
         
         A valid installation provides all expected files and commands.
+        A stamp file recording the installation's fingerprint is written to the installation 
+        prefix after the installation is verified.  Later verifications only check the stamp 
+        unless the fingerprint has changed.  See :any:`_verify_fingerprint`.
+        Verification waits for other processes that are installing this package.
+        
+        Raises:
+          SoftwarePackageError: Describs why the installation is invalid.
+        """
+        with self._install_lock(shared=True):
+            self._verify_stamped()
+
+    def _verified(self):
+        """Check if the installation is valid without raising an exception.
+
+        Returns:
+            bool: True if :any:`verify` passed, False otherwise.
+        """
+        try:
+            self.verify()
+        except SoftwarePackageError as err:
+            LOGGER.debug(err)
+            return False
+        return True
+
+    def _verify_stamped(self):
+        stamp_file = os.path.join(self.install_prefix, VERIFY_STAMP)
+        key = self._verify_stamp_key()
+        fingerprint = self._verify_fingerprint()
+        try:
+            with open(stamp_file) as fin:
+                stamps = json.load(fin)
+        except (IOError, ValueError):
+            stamps = {}
+        if stamps.get(key) == fingerprint:
+            LOGGER.debug("%s installation at '%s' was verified by '%s'", self.name, self.install_prefix, stamp_file)
+            return
+        self._verify()
+        stamps[key] = fingerprint
+        tmp_file = '%s.%d.%d.tmp' % (stamp_file, os.getpid(), threading.current_thread().ident)
+        try:
+            with open(tmp_file, 'w') as fout:
+                json.dump(stamps, fout)
+            os.rename(tmp_file, stamp_file)
+        except (OSError, IOError) as err:
+            # Probably a read-only installation, we'll just verify it again next time
+            LOGGER.debug("Cannot write '%s': %s", stamp_file, err)
+
+    def _verify(self):
+        """Check every file and command expected in the installation.
+        
         Subclasses may wish to perform additional checks.
         
         Raises:
@@ -316,9 +991,28 @@ class Installation(object):
         cls = getattr(pkg, cls_name)
         self.dependencies[name] = cls(sources, self.target_arch, self.target_os, self.compilers, *args, **kwargs)
 
-    def install(self, force_reinstall):
-        """Installs the software package.
+    def install(self, force_reinstall=False):
+        """Installs the software package and all its dependencies.
+        
+        Dependencies are installed concurrently where possible, see :any:`install_packages`.
+        
+        Args:
+            force_reinstall (bool): If True, reinstall even if the software package passes verification.
+            
+        Raises:
+            SoftwarePackageError: Installation failed.
+        """
+        logger.activate_debug_log()
+        install_packages([self], force_reinstall)
+
+    def _install_package(self, force_reinstall):
+        """Installs only this software package.
+        
+        All dependencies must already be installed.
         
+        Args:
+            force_reinstall (bool): If True, reinstall even if the software package passes verification.
+
         Raises:
             NotImplementedError: This method must be overridden by a subclass.
         """
@@ -412,7 +1106,7 @@ class AutotoolsInstallation(Installation):
         flags += ['--prefix=%s' % self.install_prefix]
         cmd = ['./configure'] + flags
         LOGGER.info("Configuring %s...", self.title)
-        if util.create_subprocess(cmd, cwd=self.src_prefix, env=env, stdout=False, show_progress=True):
+        if self._run_phase('configure', cmd, env):
             raise SoftwarePackageError('%s configure failed' % self.title)   
     
     def make(self, flags, env, parallel=True):
@@ -431,14 +1125,9 @@ class AutotoolsInstallation(Installation):
         """
         assert self.src_prefix
         LOGGER.debug("Making %s at '%s'", self.name, self.src_prefix)
-        flags = list(flags)
-        par_flags = parallel_make_flags() if parallel else []
-        cmd = ['make'] + par_flags + flags
         LOGGER.info("Compiling %s...", self.title)
-        if util.create_subprocess(cmd, cwd=self.src_prefix, env=env, stdout=False, show_progress=True):
-            cmd = ['make'] + flags
-            if util.create_subprocess(cmd, cwd=self.src_prefix, env=env, stdout=False, show_progress=True):
-                raise SoftwarePackageError('%s compilation failed' % self.title)
+        if self._run_make('make', list(flags), env, parallel):
+            raise SoftwarePackageError('%s compilation failed' % self.title)
 
     def make_install(self, flags, env, parallel=False):
         """Invoke `make install`.
@@ -457,18 +1146,14 @@ class AutotoolsInstallation(Installation):
         """
         assert self.src_prefix
         LOGGER.debug("Installing %s to '%s'", self.name, self.install_prefix)
-        flags = list(flags)
-        if parallel:
-            flags += parallel_make_flags()
-        cmd = ['make', 'install'] + flags
         LOGGER.info("Installing %s...", self.title)
-        if util.create_subprocess(cmd, cwd=self.src_prefix, env=env, stdout=False, show_progress=True):
+        if self._run_make('make install', ['install'] + list(flags), env, parallel):
             raise SoftwarePackageError('%s installation failed' % self.title)
         # Some systems use lib64 instead of lib
         if os.path.isdir(self.lib_path+'64') and not os.path.isdir(self.lib_path):
             os.symlink(self.lib_path+'64', self.lib_path)
 
-    def install(self, force_reinstall=False):
+    def _install_package(self, force_reinstall):
         """Execute the typical GNU Autotools installation sequence.
         
         Modifies the system by building and installing software.
@@ -479,9 +1164,6 @@ class AutotoolsInstallation(Installation):
         Raises:
             SoftwarePackageError: Installation failed.
         """
-        logger.activate_debug_log()
-        for pkg in self.dependencies.itervalues():
-            pkg.install(force_reinstall)
         if not self.src or not force_reinstall:
             try:
                 return self.verify()
@@ -492,28 +1174,33 @@ class AutotoolsInstallation(Installation):
                                                "Specify source code path or URL to enable package reinstallation.")
                 elif not force_reinstall:
                     LOGGER.debug(err)
-        LOGGER.info("Installing %s to '%s'", self.title, self.install_prefix)
         if os.path.isdir(self.install_prefix):
             LOGGER.info("Cleaning %s installation prefix '%s'", self.title, self.install_prefix)
             util.rmtree(self.install_prefix, ignore_errors=True)
+        if not force_reinstall and self._restore_from_binary_cache():
+            return
+        LOGGER.info("Installing %s to '%s'", self.title, self.install_prefix)
         # Environment variables are shared between the subprocesses
         # created for `configure` ; `make` ; `make install`
         env = {}
-        try:
-            self.src_prefix = self._prepare_src()
-            self.configure([], env)
-            self.make([], env)
-            self.make_install([], env)
-        except Exception as err:
-            LOGGER.info("%s installation failed: %s ", self.title, err)
-            raise
-        else:
-            # Delete the decompressed source code to save space and clean up in preperation for
-            # future reconfigurations.  The compressed source archive is retained.
-            LOGGER.debug("Deleting '%s'", self.src_prefix)
-            util.rmtree(self.src_prefix, ignore_errors=True)
-            self.src_prefix = None
+        with logger.thread_log_file(self.build_log):
+            try:
+                self.src_prefix = self._prepare_src()
+                self.configure([], env)
+                self.make([], env)
+                self.make_install([], env)
+            except Exception as err:
+                LOGGER.info("%s installation failed: %s ", self.title, err)
+                LOGGER.info("See '%s' for details", self.build_log)
+                raise
+            else:
+                # Delete the decompressed source code to save space and clean up in preperation for
+                # future reconfigurations.  The compressed source archive is retained.
+                LOGGER.debug("Deleting '%s'", self.src_prefix)
+                util.rmtree(self.src_prefix, ignore_errors=True)
+                self.src_prefix = None
 
         # Verify the new installation
         LOGGER.info("Verifying %s installation...", self.title)
-        return self.verify()
+        self.verify()
+        self._save_to_binary_cache()
@@ -32,8 +32,6 @@ instrumentation, and other measurement approaches.
 """
 
 import os
-import sys
-import fileinput
 from tau import logger, util
 from tau.error import ConfigurationError
 from tau.cf.target import IBM_BGQ_ARCH, CRAY_CNL_OS, ARM64_ARCH, LINUX_OS, PPC64LE_ARCH, PPC64_ARCH
@@ -73,18 +71,15 @@ class LibunwindInstallation(AutotoolsInstallation):
         env['CXX'] = self.compilers[CXX].unwrap().absolute_path
         if self.target_arch is IBM_BGQ_ARCH:
             flags.append('--disable-shared')
-            for line in fileinput.input(os.path.join(self.src_prefix, 'src', 'unwind', 'Resume.c'), inplace=1):
-                # fileinput.input with inplace=1 redirects stdout to the input file ... freaky
-                sys.stdout.write(line.replace('_Unwind_Resume', '_Unwind_Resume_other'))
+            util.replace_in_file(os.path.join(self.src_prefix, 'src', 'unwind', 'Resume.c'), 
+                                 '_Unwind_Resume', '_Unwind_Resume_other')
         elif self.target_os is CRAY_CNL_OS:
             env['CFLAGS'] = '-fPIC'
             env['CXXFLAGS'] = '-fPIC'
             flags.append('--disable-shared')
 	    flags.append('--disable-minidebuginfo')
         # Fix test so `make install` succeeds more frequently 
-        for line in fileinput.input(os.path.join(self.src_prefix, 'tests', 'crasher.c'), inplace=1):
-            # fileinput.input with inplace=1 redirects stdout to the input file ... freaky
-            sys.stdout.write(line.replace('r = c(1);', 'r = 1;'))
+        util.replace_in_file(os.path.join(self.src_prefix, 'tests', 'crasher.c'), 'r = c(1);', 'r = 1;')
         return super(LibunwindInstallation, self).configure(flags, env)
 
     def make(self, flags, env, parallel=True):
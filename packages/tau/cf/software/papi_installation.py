@@ -31,8 +31,6 @@ PAPI is used to measure hardware performance counters.
 """
 
 import os
-import sys
-import fileinput
 from tau import logger, util
 from tau.cf.software.installation import AutotoolsInstallation
 
@@ -59,9 +57,7 @@ class PapiInstallation(AutotoolsInstallation):
 
     def make(self, flags, env, parallel=True):
         # PAPI's tests often fail to compile, so disable them.
-        for line in fileinput.input(os.path.join(self.src_prefix, 'Makefile'), inplace=1):
-            # fileinput.input with inplace=1 redirects stdout to the input file ... freaky
-            sys.stdout.write(line.replace('TESTS =', '#TESTS ='))
+        util.replace_in_file(os.path.join(self.src_prefix, 'Makefile'), 'TESTS =', '#TESTS =')
         super(PapiInstallation, self).make(flags, env, parallel)
 
 
@@ -31,7 +31,7 @@ TAU uses PDT for source instrumentation.
 """
 
 import os
-from tau import logger, util
+from tau import logger
 from tau.error import ConfigurationError
 from tau.cf.target import TauArch, X86_64_ARCH, LINUX_OS, DARWIN_OS, IBM_BGQ_ARCH, IBM_CNK_OS, PPC64LE_ARCH
 from tau.cf.software import SoftwarePackageError
@@ -172,5 +172,5 @@ class PdtInstallation(AutotoolsInstallation):
         prefix_flag = '-prefix=%s' % self.install_prefix
         cmd = ['./configure', prefix_flag, compiler_flag]
         LOGGER.info("Configuring PDT...")
-        if util.create_subprocess(cmd, cwd=self.src_prefix, stdout=False, show_progress=True):
+        if self._run_phase('configure', cmd):
             raise SoftwarePackageError('PDT configure failed')
@@ -155,8 +155,19 @@ class ScorepInstallation(AutotoolsInstallation):
             flags.append('--with-pdt=%s' % pdt.bin_path)
         return flags
 
-    def verify(self):
-        super(ScorepInstallation, self).verify()
+    def _verify_paths(self):
+        paths = super(ScorepInstallation, self)._verify_paths()
+        paths.append(os.path.join(self.bin_path, 'scorep-info'))
+        return paths
+
+    def _verify_fingerprint(self):
+        # _verify checks that Score-P was configured with exactly these flags
+        fingerprint = super(ScorepInstallation, self)._verify_fingerprint()
+        fingerprint.append(['flags'] + self._get_flags())
+        return fingerprint
+
+    def _verify(self):
+        super(ScorepInstallation, self)._verify()
         # Use Score-P's `scorep-info` command to check if this Score-P installation
         # was configured with the flags we need.
         cmd = [os.path.join(self.bin_path, 'scorep-info'), 'config-summary']
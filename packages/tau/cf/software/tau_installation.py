@@ -31,18 +31,22 @@ TAU is the core software package of TAU Commander.
 """
 
 import os
+import sys
+import json
 import glob
 import shutil
 import resource
+import threading
 from tau import logger, util
 from tau.error import ConfigurationError, InternalError
-from tau.cf.software import SoftwarePackageError
-from tau.cf.software.installation import Installation, parallel_make_flags
+from tau.cf.software import SoftwarePackageError, archive_store
+from tau.cf.software.installation import Installation, install_packages, max_make_jobs
 from tau.cf.compiler import host
 from tau.cf.compiler.host import CC, CXX, FC, UPC
 from tau.cf.compiler.mpi import MPI_CC, MPI_CXX, MPI_FC
 from tau.cf.compiler.shmem import SHMEM_CC, SHMEM_CXX, SHMEM_FC
 from tau.cf.target import TauArch, CRAY_CNL_OS, DARWIN_OS
+from tau.cf.trace import merge as trace_merge
 
 
 LOGGER = logger.get_logger(__name__)
@@ -51,6 +55,9 @@ REPOS = {None: 'http://tau.uoregon.edu/tau.tgz'}
 
 NIGHTLY = 'http://fs.paratools.com/tau-nightly.tgz'
 
+NIGHTLY_MAX_AGE = 24 * 60 * 60
+"""int: Seconds before a downloaded nightly TAU archive is downloaded again."""
+
 COMMANDS = {None: 
             ['jumpshot',
              'paraprof',
@@ -120,6 +127,161 @@ TAU_COMPILER_WRAPPERS = {CC: 'tau_cc.sh',
 
 TAU_MINIMAL_COMPILERS = [CC, CXX]
 
+TIMER_OVERHEAD_CALLS = 1000000
+"""int: Number of timer calls made by :any:`TauInstallation.measure_timer_overhead`."""
+
+_TIMER_OVERHEAD_SOURCE = r"""
+#include <stdio.h>
+#include <stdlib.h>
+#include <sys/time.h>
+#include <TAU.h>
+
+static double seconds(void)
+{
+  struct timeval tv;
+  gettimeofday(&tv, NULL);
+  return tv.tv_sec + tv.tv_usec * 1.0e-6;
+}
+
+int main(int argc, char **argv)
+{
+  long i, calls = argc > 1 ? atol(argv[1]) : 1000000;
+  volatile long sink = 0;
+  double start, empty, timed;
+  TAU_PROFILE_INIT(argc, argv);
+  TAU_PROFILE_SET_NODE(0);
+  start = seconds();
+  for (i = 0; i < calls; ++i) {
+    sink += i;
+  }
+  empty = seconds() - start;
+  start = seconds();
+  for (i = 0; i < calls; ++i) {
+    TAU_START("timer_overhead");
+    sink += i;
+    TAU_STOP("timer_overhead");
+  }
+  timed = seconds() - start;
+  printf("TIMER_OVERHEAD_USEC %.6f\n", (timed - empty) * 1.0e6 / calls);
+  return 0;
+}
+"""
+
+MAKEFILE_INDEX = '.tau_makefiles'
+"""str: Prefix of the files in a TAU installation prefix that index TAU makefiles by their tags."""
+
+_MAKEFILE_INDEX_CACHE = {}
+
+# Configurations built concurrently share an installation prefix so they are installed one at a time
+_MAKE_INSTALL_LOCK = threading.Lock()
+
+
+def install_configurations(installations):
+    """Installs several TAU configurations at once.
+    
+    TAU builds one configuration (makefile, libraries, etc.) each time it is configured and compiled.
+    All dependencies of all configurations are installed first, see :any:`install_packages`.  Then 
+    each configuration that doesn't pass verification is configured and compiled in its own copy
+    of the TAU source code.  These builds run concurrently and divide the `make` job budget evenly,
+    so installing several configurations takes about as long as installing the slowest one.  
+    The configurations share the installation prefix so they are installed one at a time after 
+    they are compiled, and each copy of the source code is deleted once its configuration is installed.
+    The installation prefix is locked exclusively while the configurations are built, see :any:`install_lock`.
+    
+    Args:
+        installations (list): :any:`TauInstallation` objects describing the configurations to install.
+        
+    Raises:
+        SoftwarePackageError: Installation failed.  If several configurations fail then the first error is raised.
+    """
+    logger.activate_debug_log()
+    configurations = {}
+    for tau in installations:
+        if tau.forced_makefile:
+            tau.install()
+        else:
+            # pylint: disable=protected-access
+            configurations.setdefault((tau.install_prefix, tau._verify_stamp_key()), tau)
+    install_packages([dep for tau in configurations.itervalues() for dep in tau.dependencies.itervalues()])
+    builds = _unverified(configurations.itervalues())
+    if len(builds) < 2:
+        for tau in builds:
+            tau.install()
+        return
+    # Lock every prefix we build in, in a consistent order so processes don't deadlock
+    # pylint: disable=protected-access
+    prefixes = dict((tau.install_prefix, tau) for tau in builds)
+    locks = [prefixes[prefix]._install_lock() for prefix in sorted(prefixes)]
+    for lock in locks:
+        lock.__enter__()
+    try:
+        _build_configurations(builds)
+    finally:
+        for lock in reversed(locks):
+            lock.__exit__(None, None, None)
+
+
+def _unverified(taus):
+    failed = []
+    for tau in taus:
+        try:
+            tau.verify()
+        except SoftwarePackageError as err:
+            if not tau.src:
+                raise SoftwarePackageError("%s source package is unavailable and the installation at '%s' "
+                                           "is invalid: %s" % (tau.title, tau.install_prefix, err),
+                                           "Specify source code path or URL to enable package reinstallation.")
+            failed.append(tau)
+    return failed
+
+
+def _remove_src(src_prefix):
+    LOGGER.debug("Deleting '%s'", src_prefix)
+    util.rmtree(src_prefix, ignore_errors=True)
+    # Also remove the temporary directory the archive was extracted to if it's now empty
+    try:
+        os.rmdir(os.path.dirname(src_prefix))
+    except OSError:
+        pass
+
+
+def _build_configurations(builds):
+    # Another process may have installed some configurations while we waited for the locks
+    builds = _unverified(builds)
+    # pylint: disable=protected-access
+    if any([tau._restore_from_binary_cache() for tau in builds]):
+        builds = _unverified(builds)
+    if not builds:
+        return
+    # Prepare source code first so the source archive is only acquired once
+    sources = []
+    try:
+        for tau in builds:
+            sources.append(tau._prepare_src())
+    except Exception:
+        for src_prefix in sources:
+            _remove_src(src_prefix)
+        raise
+    make_jobs = max(1, max_make_jobs() // len(builds))
+    errors = []
+    def worker(tau, src_prefix):
+        tau.make_jobs = make_jobs
+        try:
+            tau._build(src_prefix)
+        except Exception:   # pylint: disable=broad-except
+            errors.append(sys.exc_info())
+    threads = [threading.Thread(target=worker, args=args) for args in zip(builds, sources)]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        exc_type, exc_value, exc_tb = errors[0]
+        raise exc_type, exc_value, exc_tb
+    for tau in builds:
+        tau._save_to_binary_cache()
+
 
 class TauInstallation(Installation):
     """Encapsulates a TAU installation.
@@ -265,6 +427,7 @@ class TauInstallation(Installation):
         self.throttle_per_call = throttle_per_call
         self.throttle_num_calls = throttle_num_calls
         self.forced_makefile = forced_makefile
+        self._installed_files = None
         if forced_makefile is None:
             for pkg in 'binutils', 'libunwind', 'papi', 'pdt':
                 uses_pkg = getattr(self, '_uses_'+pkg)
@@ -313,11 +476,44 @@ class TauInstallation(Installation):
 
     def _prepare_src(self, reuse_archive=True):
         if self.src == NIGHTLY:
-            reuse_archive = False
+            age = archive_store.age(NIGHTLY)
+            if age is None or age > NIGHTLY_MAX_AGE:
+                reuse_archive = False
         return super(TauInstallation, self)._prepare_src(reuse_archive)
 
-    def verify(self):
-        super(TauInstallation, self).verify()
+    @property
+    def build_log(self):
+        # TAU installs every configuration to the same prefix so logs are named by configuration
+        config = '-'.join([os.path.basename(self.install_prefix)] + sorted(self.get_tags()))
+        return os.path.join(os.path.dirname(logger.LOG_FILE), 'build_logs', '%s.%s.log' % (self.name, config))
+
+    def _verify_stamp_key(self):
+        # TAU installs every configuration to the same prefix
+        tags = sorted(self.get_tags())
+        if self.io_inst:
+            tags.append('iowrap')
+        return ' '.join([os.path.basename(self.install_prefix)] + tags)
+
+    def _verify_paths(self):
+        paths = super(TauInstallation, self)._verify_paths()
+        # The makefile is selected from the files in lib_path
+        paths.append(self.lib_path)
+        try:
+            tau_makefile = self.get_makefile()
+        except SoftwarePackageError:
+            return paths
+        paths.append(tau_makefile)
+        makefile_tags = os.path.basename(tau_makefile).replace("Makefile.tau", "")
+        for pattern in "libtau%s.*" % makefile_tags, "libTAUsh%s.*" % makefile_tags:
+            paths.extend(sorted(glob.glob(os.path.join(self.lib_path, pattern))))
+        if self.io_inst:
+            paths.append(os.path.join(self.lib_path, 'shared'))
+            paths.extend(sorted(glob.glob(os.path.join(self.lib_path, 'shared', 'libTAU-iowrap*'))))
+            paths.append(os.path.join(self.lib_path, 'wrappers', 'io_wrapper', 'link_options.tau'))
+        return paths
+
+    def _verify(self):
+        super(TauInstallation, self)._verify()
 
         # Check for TAU libraries
         tau_makefile = self.get_makefile()
@@ -480,6 +676,7 @@ class TauInstallation(Installation):
         
         flags = [flag for flag in
                  ['-arch=%s' % self.arch,
+                  '-prefix=%s' % self.install_prefix if self.src_prefix != self.install_prefix else None,
                   '-cc=%s' % cc_command,
                   '-c++=%s' % cxx_command,
                   '-fortran=%s' % fortran_magic if fortran_magic else None,
@@ -512,26 +709,73 @@ class TauInstallation(Installation):
             flags.append('-iowrapper')
         cmd = ['./configure'] + flags
         LOGGER.info("Configuring TAU...")
-        if util.create_subprocess(cmd, cwd=self.src_prefix, stdout=False, show_progress=True):
+        if self._run_phase('configure', cmd):
             raise SoftwarePackageError('TAU configure failed')
     
     def make_install(self):
-        """Installs TAU to ``self.install_prefix``.
+        """Compiles TAU and installs it to ``self.install_prefix``.
         
-        Executes 'make install' to build and install TAU.
+        Executes 'make' to compile TAU and then 'make install' to install it.  Configurations
+        built concurrently by :any:`install_configurations` compile at the same time but only
+        one of them runs 'make install' at a time since they share the installation prefix.
         
         Raises:
-            SoftwarePackageError: 'make install' failed.
+            SoftwarePackageError: 'make' or 'make install' failed.
+        """
+        LOGGER.info('Compiling TAU...')
+        if self._run_make('make', []):
+            raise SoftwarePackageError('TAU compilation failed')
+        LOGGER.info('Installing TAU...')
+        with _MAKE_INSTALL_LOCK:
+            before = self._arch_files()
+            if self._run_make('make install', ['install']):
+                raise SoftwarePackageError('TAU installation failed')
+            after = self._arch_files()
+        self._installed_files = sorted(path for path, state in after.iteritems() if before.get(path) != state)
+
+    def _arch_files(self):
+        """Gets the modification time and size of every file in the architecture directory.
+
+        Returns:
+            dict: (mtime, size) tuples indexed by path relative to the installation prefix.
         """
-        cmd = ['make', 'install'] + parallel_make_flags()
-        LOGGER.info('Compiling and installing TAU...')
-        if util.create_subprocess(cmd, cwd=self.src_prefix, stdout=False, show_progress=True):
-            raise SoftwarePackageError('TAU compilation/installation failed')
+        files = {}
+        arch_path = os.path.join(self.install_prefix, self.arch.name)
+        for root, dirs, names in os.walk(arch_path):
+            for name in names + [name for name in dirs if os.path.islink(os.path.join(root, name))]:
+                path = os.path.join(root, name)
+                stat = os.lstat(path)
+                files[os.path.relpath(path, self.install_prefix)] = (stat.st_mtime, stat.st_size)
+        return files
+
+    def _binary_cache_archive(self):
+        # TAU installs every configuration to the same prefix so each configuration has its own archive
+        archive = super(TauInstallation, self)._binary_cache_archive()
+        if not archive:
+            return None
+        config = '-'.join(self._verify_stamp_key().split()[1:]) or 'default'
+        return os.path.join(os.path.splitext(archive)[0], config + '.tgz')
+
+    def _save_to_binary_cache(self, files=None):
+        # Only cache the headers and the files this configuration installed in the architecture 
+        # directory, not the TAU source code or other configurations
+        if files is None:
+            if not self._installed_files:
+                return
+            files = list(self._installed_files)
+            if os.path.isdir(self.include_path):
+                files.append(os.path.relpath(self.include_path, self.install_prefix))
+        super(TauInstallation, self)._save_to_binary_cache(files)
+
+    def _restore_from_binary_cache(self, merge=True):
+        # Configurations are restored to the installation prefix shared with other configurations
+        return super(TauInstallation, self)._restore_from_binary_cache(merge)
     
     def install(self, force_reinstall=False):
         """Installs TAU.
         
         Configures, compiles, and installs TAU with all necessarry makefiles and libraries.
+        TAU's dependencies are installed first, concurrently where possible.
         
         Args:
             force_reinstall (bool): Set to True to force reinstall even if TAU is already installed and working.
@@ -539,10 +783,16 @@ class TauInstallation(Installation):
         Raises:
             SoftwarePackageError: TAU failed installation or did not pass verification after it was installed.
         """
+        if not self.forced_makefile:
+            return super(TauInstallation, self).install(force_reinstall)
         logger.activate_debug_log()
-        if (not self.src or not force_reinstall) and not self.forced_makefile:
-            for pkg in self.dependencies.itervalues():
-                pkg.install(force_reinstall)
+        super(TauInstallation, self)._set_install_prefix(os.path.abspath(
+            os.path.join(os.path.dirname(self.forced_makefile), '..', '..')))
+        install_packages(self.dependencies.values(), force_reinstall=False)
+        return True
+
+    def _install_package(self, force_reinstall):
+        if not self.src or not force_reinstall:
             try:
                 return self.verify()
             except SoftwarePackageError as err:
@@ -552,27 +802,49 @@ class TauInstallation(Installation):
                                                "Specify source code path or URL to enable package reinstallation.")
                 elif not force_reinstall:
                     LOGGER.debug(err)
-        else:
-            super(TauInstallation, self)._set_install_prefix(os.path.abspath(
-                os.path.join(os.path.dirname(self.forced_makefile), '..', '..')))
-            for pkg in self.dependencies.itervalues():
-                pkg.install(force_reinstall=False)
-            return True
+            if self._restore_from_binary_cache():
+                return
+        self._build()
+        self._save_to_binary_cache()
+
+    def _build(self, src_prefix=None):
+        """Configures, compiles, installs, and verifies this TAU configuration.
+        
+        Args:
+            src_prefix (str): Path to a private copy of the TAU source code, or None to build in 
+                              the installation prefix.  The private copy is deleted after the build.
+                              
+        Raises:
+            SoftwarePackageError: TAU failed installation or did not pass verification after it was installed.
+        """
         LOGGER.info("Installing %s at '%s'", self.title, self.install_prefix)       
-        try:
-            # Keep reconfiguring the same source because that's how TAU works
-            if not (self.include_path and os.path.isdir(self.include_path)):
-                shutil.move(self._prepare_src(), self.install_prefix)
-            self.src_prefix = self.install_prefix
-            self.configure()
-            self.make_install()
-        except Exception as err:
-            LOGGER.info("%s installation failed: %s ", self.title, err)
-            raise
+        with logger.thread_log_file(self.build_log):
+            try:
+                if not src_prefix:
+                    if not os.path.exists(self.install_prefix):
+                        shutil.move(self._prepare_src(), self.install_prefix)
+                    if os.path.exists(os.path.join(self.install_prefix, 'configure')):
+                        # Keep reconfiguring the same source because that's how TAU works
+                        src_prefix = self.install_prefix
+                    else:
+                        # Configurations built by install_configurations don't leave source code in the prefix
+                        src_prefix = self._prepare_src()
+                self.src_prefix = src_prefix
+                self.configure()
+                self.make_install()
+                self.update_makefile_index()
+            except Exception as err:
+                LOGGER.info("%s installation failed: %s ", self.title, err)
+                LOGGER.info("See '%s' for details", self.build_log)
+                raise
+            finally:
+                if src_prefix and src_prefix != self.install_prefix:
+                    _remove_src(src_prefix)
+                    self.src_prefix = None
 
         # Verify the new installation
         LOGGER.info("Verifying %s installation...", self.title)
-        return self.verify()
+        self.verify()
 
     def get_tags(self):
         """Get tags for this TAU installation.
@@ -639,11 +911,76 @@ class TauInstallation(Installation):
         LOGGER.debug("Incompatible tags: %s", tags)
         return set(tags)
 
+    def _makefile_index_file(self):
+        # One index per architecture since lib_path depends on the target architecture
+        return os.path.join(self.install_prefix, '%s.%s' % (MAKEFILE_INDEX, self.arch.name))
+
+    def update_makefile_index(self):
+        """Indexes the TAU makefiles in ``self.lib_path`` by their tags.
+        
+        The index is written to the installation prefix along with the modification time of
+        ``self.lib_path`` so that :any:`makefile_index` can tell when the index is out of date.
+        
+        Returns:
+            dict: Sets of makefile tags indexed by makefile name, e.g. ``{'Makefile.tau-papi-pdt': set(['papi', 'pdt'])}``.
+        """
+        index_file = self._makefile_index_file()
+        try:
+            # Get the modification time first so makefiles added while we scan make the index stale
+            mtime = os.stat(self.lib_path).st_mtime
+        except OSError:
+            return {}
+        makefiles = {}
+        for path in glob.glob(os.path.join(self.lib_path, 'Makefile.tau*')):
+            name = os.path.basename(path)
+            makefiles[name] = set(name.split('.')[1].split('-')[1:])
+        LOGGER.debug("Indexed makefiles in '%s': %s", self.lib_path, sorted(makefiles))
+        tmp_file = '%s.%d.%d.tmp' % (index_file, os.getpid(), threading.current_thread().ident)
+        try:
+            with open(tmp_file, 'w') as fout:
+                json.dump({'mtime': mtime, 'makefiles': dict((name, sorted(tags)) for name, tags in makefiles.iteritems())}, 
+                          fout, indent=2, sort_keys=True)
+            os.rename(tmp_file, index_file)
+        except (OSError, IOError) as err:
+            # Probably a read-only installation, we'll keep the index in memory
+            LOGGER.debug("Cannot write '%s': %s", index_file, err)
+        _MAKEFILE_INDEX_CACHE[index_file] = (mtime, makefiles)
+        return makefiles
+
+    def makefile_index(self):
+        """Gets the index of TAU makefiles in ``self.lib_path``.
+        
+        The index is read from the installation prefix and kept in memory.  It is only rebuilt,
+        see :any:`update_makefile_index`, if ``self.lib_path`` has changed since it was indexed.
+        
+        Returns:
+            dict: Sets of makefile tags indexed by makefile name, e.g. ``{'Makefile.tau-papi-pdt': set(['papi', 'pdt'])}``.
+        """
+        index_file = self._makefile_index_file()
+        try:
+            mtime = os.stat(self.lib_path).st_mtime
+        except OSError:
+            return {}
+        cached_mtime, makefiles = _MAKEFILE_INDEX_CACHE.get(index_file, (None, None))
+        if cached_mtime == mtime:
+            return makefiles
+        try:
+            with open(index_file) as fin:
+                index = json.load(fin)
+            if index['mtime'] == mtime:
+                makefiles = dict((name, set(tags)) for name, tags in index['makefiles'].iteritems())
+                _MAKEFILE_INDEX_CACHE[index_file] = (mtime, makefiles)
+                return makefiles
+        except (IOError, ValueError, KeyError, TypeError, AttributeError):
+            pass
+        return self.update_makefile_index()
+
     def get_makefile(self):
         """Returns an absolute path to a TAU_MAKEFILE.
 
         The file returned *should* supply all requested measurement features 
         and application support features specified in the constructor.
+        Makefiles are found via :any:`makefile_index`.
 
         Returns:
             str: A file path that could be used to set the TAU_MAKEFILE environment
@@ -651,19 +988,15 @@ class TauInstallation(Installation):
         """
         if self.forced_makefile:
             return self.forced_makefile
-        tau_makefiles = glob.glob(os.path.join(self.lib_path, 'Makefile.tau*'))
-        LOGGER.debug("Found makefiles: '%s'", tau_makefiles)
+        tau_makefiles = self.makefile_index()
         config_tags = self.get_tags()
         LOGGER.debug("Searching for makefile with tags: %s", config_tags)
         approx_tags = None
         approx_makefile = None
         dangerous_tags = self._incompatible_tags()
         LOGGER.debug("Will not use makefiles containing tags: %s", dangerous_tags)
-        for makefile in tau_makefiles:
-            tags = set(os.path.basename(makefile).split('.')[1].split('-')[1:])
-            LOGGER.debug("%s has tags: %s", makefile, tags)
+        for makefile, tags in sorted(tau_makefiles.iteritems()):
             if config_tags <= tags:
-                LOGGER.debug("%s contains desired tags: %s", makefile, config_tags)
                 if tags <= config_tags:
                     makefile = os.path.join(self.lib_path, makefile) 
                     LOGGER.debug("Found TAU makefile %s", makefile)
@@ -672,7 +1005,6 @@ class TauInstallation(Installation):
                     if not approx_tags or tags < approx_tags:
                         approx_makefile = makefile
                         approx_tags = tags
-                    LOGGER.debug("Best approximate match is: %s", approx_tags)
         LOGGER.debug("No TAU makefile exactly matches tags '%s'", config_tags)
         if approx_makefile:
             makefile = os.path.join(self.lib_path, approx_makefile) 
@@ -864,6 +1196,48 @@ class TauInstallation(Installation):
                                      "Use tau --log and see detailed output at the end of '%s'" % logger.LOG_FILE)
         return retval
 
+    def measure_timer_overhead(self, prefix, calls=TIMER_OVERHEAD_CALLS):
+        """Measures the cost of starting and stopping a timer in this TAU configuration.
+        
+        Builds and runs a micro-benchmark like ``examples/timerOverhead`` that times a loop with and without
+        a TAU timer around the loop body.  The benchmark runs with the same TAU runtime configuration as 
+        the application, e.g. metrics and callpaths, but without throttling so every call is measured.
+        
+        Args:
+            prefix (str): Directory to build and run the benchmark in.
+            calls (int): Number of timer calls.
+            
+        Returns:
+            float: Microseconds per timer start and stop.
+            
+        Raises:
+            ConfigurationError: The benchmark could not be built or run.
+        """
+        util.mkdirp(prefix)
+        source = os.path.join(prefix, 'timer_overhead.c')
+        exe = os.path.join(prefix, 'timer_overhead')
+        output = os.path.join(prefix, 'timer_overhead.out')
+        with open(source, 'w') as fout:
+            fout.write(_TIMER_OVERHEAD_SOURCE)
+        opts, env = self.compiletime_config()
+        cmd = [TAU_COMPILER_WRAPPERS[CC]] + opts + [source, '-o', exe]
+        LOGGER.info("Building timer overhead benchmark")
+        if util.create_subprocess(cmd, cwd=prefix, env=env, stdout=False):
+            raise ConfigurationError("TAU was unable to build the timer overhead benchmark.",
+                                     "Use tau --log and see detailed output at the end of '%s'" % logger.LOG_FILE)
+        cmd, env = self.get_application_command([], [exe, str(calls)])
+        env.update(TAU_THROTTLE='0', PROFILEDIR=prefix, TRACEDIR=prefix)
+        LOGGER.info("Measuring timer overhead")
+        if util.create_subprocess(cmd, cwd=prefix, env=env, stdout=False, tee={'stdout': output}):
+            raise ConfigurationError("The timer overhead benchmark failed.",
+                                     "Use tau --log and see detailed output at the end of '%s'" % logger.LOG_FILE)
+        with open(output) as fin:
+            for line in fin:
+                if line.startswith('TIMER_OVERHEAD_USEC'):
+                    return max(0.0, float(line.split()[1]))
+        raise ConfigurationError("The timer overhead benchmark did not report a result.", 
+                                 "See '%s'" % output)
+
     def get_application_command(self, launcher_cmd, application_cmd):
         """Build a command line to launch an application under TAU.
         
@@ -962,10 +1336,7 @@ class TauInstallation(Installation):
                     edf_files = glob.glob(os.path.join(path, '*.edf'))
                     if not (trc_files and edf_files):
                         raise ConfigurationError("No *.trc or *.edf files!")
-                    cmd = ['tau_treemerge.pl']
-                    retval = util.create_subprocess(cmd, cwd=path, env=env, log=False)
-                    if retval != 0:
-                        raise InternalError("Nonzero return code from tau_treemerge.pl")
+                    trace_merge.merge_traces(path, env)
                 cmd = ['tau2slog2', 'tau.trc', 'tau.edf', '-o', 'tau.slog2']
                 retval = util.create_subprocess(cmd, cwd=path, env=env, log=False)
                 if retval != 0:
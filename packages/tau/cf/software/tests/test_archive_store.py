@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Test functions.
+
+Functions used for unit tests of archive_store.py.
+"""
+
+import os
+import shutil
+import time
+import threading
+from tau import util
+from tau.tests import TestCase
+from tau.cf.storage.local_file import LocalFileStorage
+from tau.cf.software import archive_store
+
+
+class ArchiveStoreTest(TestCase):
+    """Unit tests for the source archive store."""
+
+    def setUp(self):
+        # Each test gets empty storage levels so archives acquired by earlier tests are not found
+        self.user = LocalFileStorage('user', util.mkdtemp(dir=os.getcwd()))
+        self.system = LocalFileStorage('system', util.mkdtemp(dir=os.getcwd()))
+        self.levels = archive_store.ORDERED_LEVELS, archive_store.highest_writable_storage
+        archive_store.ORDERED_LEVELS = (self.user, self.system)
+        archive_store.highest_writable_storage = lambda: self.system
+
+    def tearDown(self):
+        archive_store.ORDERED_LEVELS, archive_store.highest_writable_storage = self.levels
+
+    def _create_file(self, name, data):
+        prefix = util.mkdtemp(dir=os.getcwd())
+        path = os.path.join(prefix, name)
+        with open(path, 'w') as fout:
+            fout.write(data)
+        return path
+
+    def test_acquire_lookup(self):
+        src = self._create_file('pkg.tgz', 'version 1')
+        self.assertIsNone(archive_store.lookup(src))
+        path = archive_store.acquire(src)
+        self.assertEqual(os.path.basename(path), util.sha256sum(src))
+        self.assertEqual(archive_store.lookup(src), path)
+        self.assertEqual(archive_store.acquire('file://' + src), archive_store.acquire('file://' + src))
+
+    def test_checksum_mismatch(self):
+        src = self._create_file('pkg.tgz', 'version 1')
+        path = archive_store.acquire(src)
+        os.remove(path)
+        with open(src, 'w') as fout:
+            fout.write('version 2')
+        with self.assertRaises(util.ChecksumError):
+            archive_store.acquire(src)
+        path = archive_store.acquire(src, refresh=True)
+        self.assertEqual(archive_store.lookup(src), path)
+
+    def test_damaged_archive(self):
+        src = self._create_file('pkg.tgz', 'version 1')
+        path = archive_store.acquire(src)
+        os.chmod(path, 0644)
+        with open(path, 'w') as fout:
+            fout.write('damaged')
+        self.assertIsNone(archive_store.lookup(src))
+
+    def test_mirror(self):
+        mirrored = self._create_file('pkg.tgz', 'mirrored')
+        src = 'http://invalid.invalid/pkg.tgz'
+        path = archive_store.acquire(src, mirrors=['file://' + os.path.dirname(mirrored)])
+        self.assertEqual(util.sha256sum(path), util.sha256sum(mirrored))
+        self.assertEqual(archive_store.lookup(src), path)
+
+    def test_concurrent_acquire(self):
+        src = self._create_file('pkg.tgz', 'version 1')
+        downloads = []
+        real_download = util.download
+        def download(*args, **kwargs):
+            downloads.append(args[0])
+            time.sleep(0.2)
+            real_download(*args, **kwargs)
+        paths = []
+        threads = [threading.Thread(target=lambda: paths.append(archive_store.acquire(src))) for _ in xrange(4)]
+        util.download = download
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            util.download = real_download
+        self.assertEqual(len(downloads), 1)
+        self.assertEqual(len(paths), 4)
+        self.assertEqual(len(set(paths)), 1)
+
+    def test_link_between_levels(self):
+        src = self._create_file('pkg.tgz', 'other level')
+        digest = util.sha256sum(src)
+        other_path = archive_store._archive_path(self.user, digest)
+        util.mkdirp(os.path.dirname(other_path))
+        shutil.copy(src, other_path)
+        archive_store._update_manifest(self.user, src, digest)
+        path = archive_store.acquire(src)
+        self.assertEqual(path, archive_store._archive_path(self.system, digest))
+        self.assertTrue(os.path.samefile(path, other_path))
+        self.assertEqual(archive_store._read_manifest(self.system)[src], digest)
+        # Already linked, so the same archive is used and the manifest is updated for other sources
+        self.assertEqual(archive_store.acquire(src), path)
+        alias = 'http://invalid.invalid/pkg.tgz'
+        archive_store._update_manifest(self.user, alias, digest)
+        self.assertEqual(archive_store.acquire(alias), path)
+        self.assertEqual(archive_store._read_manifest(self.system)[alias], digest)
+        # A damaged archive in the writable level is replaced
+        os.remove(path)
+        with open(path, 'w') as fout:
+            fout.write('damaged')
+        self.assertEqual(archive_store.acquire(src), path)
+        self.assertTrue(os.path.samefile(path, other_path))
+
+    def test_age(self):
+        src = self._create_file('pkg.tgz', 'aging')
+        self.assertIsNone(archive_store.age(src))
+        path = archive_store.acquire(src)
+        self.assertLess(archive_store.age(src), 60)
+        mtime = time.time() - 2 * 24 * 60 * 60
+        os.utime(path, (mtime, mtime))
+        self.assertGreater(archive_store.age(src), 24 * 60 * 60)
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Test functions.
+
+Functions used for unit tests of build_stats.py.
+"""
+
+import uuid
+from tau.tests import TestCase
+from tau.cf.software import build_stats
+
+
+class BuildStatsTest(TestCase):
+    """Unit tests for software build timing history."""
+
+    def test_estimate(self):
+        package = uuid.uuid4().hex
+        self.assertIsNone(build_stats.estimate(package, 'make', 4))
+        for wall in 10, 30, 20:
+            build_stats.record(package, 'make', 4, wall, wall*3)
+        build_stats.record(package, 'make', 1, 100, 100)
+        self.assertEqual(build_stats.estimate(package, 'make', 4), 20)
+        self.assertEqual(build_stats.estimate(package, 'make', 1), 100)
+        self.assertIn(build_stats.estimate(package, 'make', 8), (20, 30))
+        self.assertIsNone(build_stats.estimate(package, 'configure', 4))
+
+    def test_summary(self):
+        package = uuid.uuid4().hex
+        build_stats.record(package, 'configure', None, 5, 5)
+        build_stats.record(package, 'make', 4, 10, 20)
+        build_stats.record(package, 'make', 4, 30, 60)
+        rows = [row for row in build_stats.summary() if row['package'] == package]
+        self.assertEqual([row['phase'] for row in rows], ['make', 'configure'])
+        self.assertEqual(rows[0]['builds'], 2)
+        self.assertAlmostEqual(rows[0]['wall'], 20)
+        self.assertAlmostEqual(rows[0]['efficiency'], 0.5)
+        self.assertAlmostEqual(rows[1]['efficiency'], 1.0)
@@ -30,9 +30,325 @@
 Functions used for unit tests of installation.py.
 """
 
-
+import os
+import sys
+import time
+import tarfile
+import threading
+import subprocess
+from tau import configuration, util
 from tau.tests import TestCase, not_implemented
+from tau.cf.target import host
+from tau.cf.storage.levels import USER_STORAGE
+from tau.cf.software import SoftwarePackageError, archive_store
+from tau.cf.software.installation import Installation, install_packages, install_lock, max_make_jobs, reduced_make_jobs
+from tau.cf.software.installation import BINARY_CACHE_MANIFEST
+
+
+class _FakeInstallation(Installation):
+    """Records when the package was "installed" instead of building anything."""
+
+    def __init__(self, name, record, fail=False):
+        prefix = os.path.join(os.getcwd(), name)
+        if not os.path.isdir(prefix):
+            os.mkdir(prefix)
+        super(_FakeInstallation, self).__init__(name, name, {name: prefix}, host.architecture(),
+                                                host.operating_system(), None, None, None, None, None)
+        self.record = record
+        self.fail = fail
+
+    def _install_package(self, force_reinstall):
+        self.record.append(('start', self.name, threading.current_thread().ident))
+        time.sleep(0.1)
+        if self.fail:
+            raise SoftwarePackageError("%s failed" % self.name)
+        self.record.append(('end', self.name, self.make_jobs))
+
+
+class _SlowVerifyInstallation(_FakeInstallation):
+    """Records when verification starts and ends and takes a while to verify."""
+
+    def __init__(self, name, record_path):
+        super(_SlowVerifyInstallation, self).__init__(name, [])
+        self.record_path = record_path
+
+    def _verify(self):
+        with open(self.record_path, 'a') as fout:
+            fout.write('start %r\n' % time.time())
+        time.sleep(1)
+        with open(self.record_path, 'a') as fout:
+            fout.write('end %r\n' % time.time())
+
+    def _install_package(self, force_reinstall):
+        with open(self.record_path, 'a') as fout:
+            fout.write('install\n')
+
 
 @not_implemented
 class InstallationTest(TestCase):
     pass
+
+
+class InstallPackagesTest(TestCase):
+    """Unit tests for install_packages."""
+
+    def _dependency_graph(self, record, fail=None):
+        leaves = [_FakeInstallation(name, record, name == fail) for name in 'binutils', 'libunwind', 'papi']
+        scorep = _FakeInstallation('scorep', record, fail == 'scorep')
+        scorep.dependencies = {'binutils': _FakeInstallation('binutils', record, fail == 'binutils')}
+        tau = _FakeInstallation('tau', record)
+        tau.dependencies = dict((pkg.name, pkg) for pkg in leaves + [scorep])
+        # Fail verification so every package is "installed"
+        for pkg in leaves + [scorep, scorep.dependencies['binutils'], tau]:
+            pkg.verify_libraries = ['lib%s.a' % pkg.name]
+        return tau
+
+    def test_dependency_order(self):
+        record = []
+        install_packages([self._dependency_graph(record)])
+        events = [(event, name) for event, name, _ in record]
+        started = [name for event, name in events if event == 'start']
+        self.assertEqual(sorted(started), ['binutils', 'libunwind', 'papi', 'scorep', 'tau'])
+        for dep, pkg in ('binutils', 'scorep'), ('scorep', 'tau'), ('papi', 'tau'):
+            self.assertLess(events.index(('end', dep)), events.index(('start', pkg)))
+
+    def test_concurrent_leaves(self):
+        record = []
+        install_packages([self._dependency_graph(record)])
+        leaf_threads = set(ident for event, name, ident in record 
+                           if event == 'start' and name in ('binutils', 'libunwind', 'papi'))
+        self.assertEqual(len(leaf_threads), 3)
+        first_ends = [idx for idx, item in enumerate(record) if item[0] == 'end']
+        self.assertGreater(first_ends[0], 2)
+
+    def test_failure_stops_dependents(self):
+        record = []
+        with self.assertRaises(SoftwarePackageError):
+            install_packages([self._dependency_graph(record, fail='binutils')])
+        started = [name for event, name, _ in record if event == 'start']
+        self.assertNotIn('scorep', started)
+        self.assertNotIn('tau', started)
+
+
+class BinaryCacheTest(TestCase):
+    """Unit tests for the binary build cache."""
+
+    def _installation(self, prefix, dep_prefix):
+        dep = _FakeInstallation('binutils', [])
+        dep.install_prefix = dep_prefix
+        inst = _FakeInstallation('papi', [])
+        inst.src = 'papi.tgz'
+        inst.install_prefix = os.path.join(prefix, 'papi', 'abcdef')
+        inst.dependencies = {'binutils': dep}
+        inst.verify_libraries = ['libpapi.a']
+        return inst
+
+    def _save(self, cwd, binary):
+        old = self._installation(os.path.join(cwd, 'old'), '/old/binutils')
+        os.makedirs(old.lib_path)
+        with open(os.path.join(old.lib_path, 'libpapi.a'), 'w') as fout:
+            fout.write(binary)
+        with open(os.path.join(old.lib_path, 'papi.pc'), 'w') as fout:
+            fout.write('prefix=%s\nlibs=-L/old/binutils/lib\n' % old.install_prefix)
+        old._save_to_binary_cache()
+        self.assertTrue(os.path.isfile(os.path.join(cwd, 'cache', 'papi', 'abcdef.tgz')))
+        self.assertFalse(os.path.exists(os.path.join(old.install_prefix, BINARY_CACHE_MANIFEST)))
+        return old
+
+    def test_save_restore(self):
+        cwd = util.mkdtemp(dir=os.getcwd())
+        configuration.put('build.binary_cache', os.path.join(cwd, 'cache'), storage=USER_STORAGE)
+        try:
+            self._save(cwd, '\0binary')
+            new = self._installation(os.path.join(cwd, 'new'), '/new/binutils')
+            self.assertTrue(new._restore_from_binary_cache())
+            with open(os.path.join(new.lib_path, 'papi.pc')) as fin:
+                self.assertEqual(fin.read(), 'prefix=%s\nlibs=-L/new/binutils/lib\n' % new.install_prefix)
+            with open(os.path.join(new.lib_path, 'libpapi.a')) as fin:
+                self.assertEqual(fin.read(), '\0binary')
+            self.assertFalse(os.path.exists(os.path.join(new.install_prefix, BINARY_CACHE_MANIFEST)))
+            self.assertFalse(new._restore_from_binary_cache())
+        finally:
+            configuration.delete('build.binary_cache', storage=USER_STORAGE)
+
+    def test_unrelocatable_binary(self):
+        cwd = util.mkdtemp(dir=os.getcwd())
+        configuration.put('build.binary_cache', os.path.join(cwd, 'cache'), storage=USER_STORAGE)
+        try:
+            old = self._save(cwd, '\0binary ' + os.path.join(cwd, 'old', 'papi', 'abcdef'))
+            new = self._installation(os.path.join(cwd, 'new'), '/new/binutils')
+            self.assertFalse(new._restore_from_binary_cache())
+            self.assertFalse(os.path.exists(new.install_prefix))
+            # Restoring to the original prefix doesn't need relocation
+            util.rmtree(old.install_prefix)
+            self.assertTrue(old._restore_from_binary_cache())
+        finally:
+            configuration.delete('build.binary_cache', storage=USER_STORAGE)
+
+    def test_cache_disabled(self):
+        inst = self._installation(os.getcwd(), '/binutils')
+        self.assertIsNone(inst._binary_cache_archive())
+
+
+class PrepareSourceTest(TestCase):
+    """Unit tests for acquiring and unpacking source archives."""
+
+    def test_damaged_archive(self):
+        prefix = util.mkdtemp(dir=os.getcwd())
+        inst = _FakeInstallation('libunwind', [])
+        inst.src = os.path.join(prefix, 'libunwind.tgz')
+        with open(inst.src, 'w') as fout:
+            fout.write('truncated')
+        archive_store.acquire(inst.src)
+        # The recorded archive can't be unpacked so a fresh copy is acquired
+        os.mkdir(os.path.join(prefix, 'libunwind-1.0'))
+        with open(os.path.join(prefix, 'libunwind-1.0', 'configure'), 'w') as fout:
+            fout.write('#!/bin/sh\n')
+        os.remove(inst.src)
+        archive = tarfile.open(inst.src, 'w:gz')
+        archive.add(os.path.join(prefix, 'libunwind-1.0'), 'libunwind-1.0')
+        archive.close()
+        src_prefix = inst._prepare_src()
+        self.assertTrue(os.path.isfile(os.path.join(src_prefix, 'configure')))
+        util.rmtree(os.path.dirname(src_prefix))
+        self.assertEqual(archive_store.lookup(inst.src), archive_store.acquire(inst.src))
+        self.assertEqual(util.sha256sum(archive_store.lookup(inst.src)), util.sha256sum(inst.src))
+
+
+class VerifyStampTest(TestCase):
+    """Unit tests for installation verification stamps."""
+
+    def test_verify_stamp(self):
+        inst = _FakeInstallation('papi', [])
+        inst.verify_libraries = ['libpapi.a']
+        os.mkdir(os.path.join(inst.install_prefix, 'lib'))
+        with open(os.path.join(inst.lib_path, 'libpapi.a'), 'w') as fout:
+            fout.write('libpapi')
+        checks = []
+        real_verify = inst._verify
+        def _verify():
+            checks.append(inst.install_prefix)
+            real_verify()
+        inst._verify = _verify
+        inst.verify()
+        inst.verify()
+        self.assertEqual(len(checks), 1)
+        os.remove(os.path.join(inst.lib_path, 'libpapi.a'))
+        self.assertRaises(SoftwarePackageError, inst.verify)
+        self.assertEqual(len(checks), 2)
+
+    def test_verify_stamp_file_changed(self):
+        inst = _FakeInstallation('pdt', [])
+        inst.verify_headers = ['pdt.h']
+        os.mkdir(os.path.join(inst.install_prefix, 'include'))
+        header = os.path.join(inst.include_path, 'pdt.h')
+        with open(header, 'w') as fout:
+            fout.write('pdt')
+        checks = []
+        real_verify = inst._verify
+        def _verify():
+            checks.append(inst.install_prefix)
+            real_verify()
+        inst._verify = _verify
+        inst.verify()
+        dir_stat = os.stat(inst.include_path)
+        # Rewriting a file doesn't change its directory
+        with open(header, 'w') as fout:
+            fout.write('pdt header')
+        os.utime(inst.include_path, (dir_stat.st_atime, dir_stat.st_mtime))
+        inst.verify()
+        self.assertEqual(len(checks), 2)
+        inst.verify()
+        self.assertEqual(len(checks), 2)
+
+
+class MakeJobsTest(TestCase):
+    """Unit tests for parallel `make` job selection."""
+
+    def test_max_make_jobs(self):
+        self.assertGreaterEqual(max_make_jobs(), 1)
+        configuration.put('build.max_make_jobs', 3, storage=USER_STORAGE)
+        try:
+            self.assertEqual(max_make_jobs(), 3)
+        finally:
+            configuration.delete('build.max_make_jobs', storage=USER_STORAGE)
+
+    def test_reduced_make_jobs(self):
+        self.assertListEqual(reduced_make_jobs(8), [8, 4, 2, 1])
+        self.assertListEqual(reduced_make_jobs(6), [6, 3, 1])
+        self.assertListEqual(reduced_make_jobs(1), [1])
+
+    def test_run_make_retry(self):
+        inst = _FakeInstallation('papi', [])
+        inst.make_jobs = 4
+        commands = []
+        def _run_phase(phase, cmd, env=None, jobs=None):
+            commands.append(cmd)
+            return 0 if jobs == 2 else 1
+        inst._run_phase = _run_phase
+        self.assertEqual(inst._run_make('make', ['all']), 0)
+        self.assertEqual([cmd[:3] for cmd in commands], [['make', '-j', '4'], ['make', '-j', '2']])
+        self.assertIn('-l', commands[0])
+        del commands[:]
+        self.assertEqual(inst._run_make('make', ['install'], parallel=False), 1)
+        self.assertListEqual(commands, [['make', 'install']])
+
+
+class InstallLockTest(TestCase):
+    """Unit tests for interprocess installation locks."""
+
+    @staticmethod
+    def _try_lock(path, shared):
+        # Locks held by this process don't block this process so try the lock from another process
+        mode = 'LOCK_SH' if shared else 'LOCK_EX'
+        script = "import fcntl; fcntl.flock(open(%r, 'a'), fcntl.%s | fcntl.LOCK_NB)" % (path, mode)
+        return subprocess.call([sys.executable, '-c', script], stderr=open(os.devnull, 'w')) == 0
+
+    def test_shared_exclusive(self):
+        path = os.path.join(os.getcwd(), '.papi.lock')
+        # Only the exclusive lock creates the lock file
+        with install_lock(path, shared=True):
+            self.assertFalse(os.path.exists(path))
+        with install_lock(path):
+            self.assertFalse(self._try_lock(path, shared=True))
+            # Reentrant within the process
+            with install_lock(path, shared=True):
+                pass
+            self.assertFalse(self._try_lock(path, shared=True))
+        self.assertTrue(self._try_lock(path, shared=False))
+        with install_lock(path, shared=True):
+            self.assertTrue(self._try_lock(path, shared=True))
+            self.assertFalse(self._try_lock(path, shared=False))
+        self.assertTrue(self._try_lock(path, shared=False))
+
+    def test_verify_missing(self):
+        inst = _FakeInstallation('libunwind', [])
+        inst.verify_libraries = ['libunwind.a']
+        prefix = os.path.join(util.mkdtemp(dir=os.getcwd()), 'missing', 'libunwind')
+        inst.install_prefix = prefix
+        self.assertRaises(SoftwarePackageError, inst.verify)
+        self.assertFalse(os.path.exists(os.path.dirname(prefix)))
+
+    def test_concurrent_verify(self):
+        script = ("import sys\n"
+                  "from tau.cf.software.installation import install_packages\n"
+                  "from tau.cf.software.tests.test_installation import _SlowVerifyInstallation\n"
+                  "install_packages([_SlowVerifyInstallation('papi', sys.argv[1])])\n")
+        records = [os.path.join(os.getcwd(), 'verify.%d' % i) for i in range(2)]
+        procs = [subprocess.Popen([sys.executable, '-c', script, path], cwd=os.getcwd()) for path in records]
+        self.assertListEqual([proc.wait() for proc in procs], [0, 0])
+        intervals = []
+        for path in records:
+            with open(path) as fin:
+                lines = fin.read().split()
+            self.assertNotIn('install', lines)
+            intervals.append((float(lines[1]), float(lines[3])))
+        # Both processes were verifying at the same time
+        self.assertLess(max(start for start, _ in intervals), min(end for _, end in intervals))
+
+    def test_verify_while_installing(self):
+        inst = _FakeInstallation('papi', [])
+        with inst._install_lock():
+            inst.verify()
+            lock_files = [name for name in os.listdir(os.path.dirname(inst.install_prefix)) if name.endswith('.lock')]
+            self.assertListEqual(lock_files, ['.papi.lock'])
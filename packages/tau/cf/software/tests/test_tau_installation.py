@@ -30,9 +30,163 @@
 Functions used for unit tests of tau_installation.py.
 """
 
-
+import os
+import time
+import tarfile
+import threading
+from tau import configuration
 from tau.tests import TestCase, not_implemented
+from tau.cf.storage.levels import USER_STORAGE
+from tau.cf.target import host, TauArch
+from tau.cf.software import tau_installation
+from tau.cf.software.tau_installation import TauInstallation
 
 @not_implemented
 class TauInstallationTest(TestCase):
     pass
+
+
+class MakefileIndexTest(TestCase):
+    """Unit tests for the TAU makefile index."""
+
+    def _installation(self):
+        # Skip the constructor since it configures compilers and dependencies
+        tau = TauInstallation.__new__(TauInstallation)
+        tau.arch = TauArch.get(host.architecture(), host.operating_system())
+        tau._install_prefix = None
+        tau._set_install_prefix(os.path.join(os.getcwd(), 'tau'))
+        os.makedirs(tau.lib_path)
+        return tau
+
+    def _add_makefile(self, tau, name):
+        with open(os.path.join(tau.lib_path, name), 'w') as fout:
+            fout.write('# %s\n' % name)
+        # Make sure the directory looks modified even on filesystems with coarse timestamps
+        mtime = os.stat(tau.lib_path).st_mtime + len(os.listdir(tau.lib_path))
+        os.utime(tau.lib_path, (mtime, mtime))
+
+    def test_makefile_index(self):
+        tau = self._installation()
+        self.assertDictEqual(tau.makefile_index(), {})
+        self._add_makefile(tau, 'Makefile.tau-papi-mpi-pdt')
+        self.assertDictEqual(tau.makefile_index(), {'Makefile.tau-papi-mpi-pdt': set(['papi', 'mpi', 'pdt'])})
+        self._add_makefile(tau, 'Makefile.tau-pdt')
+        expected = {'Makefile.tau-papi-mpi-pdt': set(['papi', 'mpi', 'pdt']), 'Makefile.tau-pdt': set(['pdt'])}
+        self.assertDictEqual(tau.makefile_index(), expected)
+        # A new process reads the index from the installation prefix
+        tau_installation._MAKEFILE_INDEX_CACHE.clear()
+        self.assertDictEqual(tau.makefile_index(), expected)
+
+
+class _FakeBuildInstallation(TauInstallation):
+    """Records when TAU would be compiled and installed instead of building anything."""
+
+    def __init__(self, prefix, record):
+        # Skip the constructor since it configures compilers and dependencies
+        # pylint: disable=super-init-not-called
+        self.name = 'tau'
+        self.title = 'TAU'
+        self.arch = TauArch.get(host.architecture(), host.operating_system())
+        self._install_prefix = None
+        self._set_install_prefix(prefix)
+        self.make_jobs = 1
+        self.record = record
+        self.src = 'tau.tgz'
+        self.dependencies = {}
+        self.installs = {}
+        self._installed_files = None
+
+    @property
+    def build_log(self):
+        return os.path.join(os.getcwd(), 'build.%d.log' % threading.current_thread().ident)
+
+    def configure(self):
+        pass
+
+    def _verify_stamp_key(self):
+        return 'abcdef pdt'
+
+    def _run_make(self, phase, args, env=None, parallel=True):
+        for path in self.installs.get(phase, []):
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            with open(path, 'w') as fout:
+                fout.write(path)
+        self.record.append(('start', phase, time.time()))
+        time.sleep(0.2)
+        self.record.append(('end', phase, time.time()))
+        return 0
+
+    def update_makefile_index(self):
+        pass
+
+    def verify(self):
+        pass
+
+
+class BuildConfigurationsTest(TestCase):
+    """Unit tests for building several TAU configurations at once."""
+
+    def test_serialized_install(self):
+        record = []
+        prefix = os.path.join(os.getcwd(), 'tau')
+        sources = []
+        threads = []
+        for i in range(2):
+            src_prefix = os.path.join(os.getcwd(), 'src%d' % i, 'tau-2.26')
+            os.makedirs(src_prefix)
+            sources.append(src_prefix)
+            tau = _FakeBuildInstallation(prefix, record)
+            threads.append(threading.Thread(target=tau._build, args=(src_prefix,)))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        ordered = sorted(record, key=lambda item: item[2])
+        # Both configurations compiled at the same time but installed one at a time
+        self.assertListEqual([event for event, phase, _ in ordered if phase == 'make'], 
+                             ['start', 'start', 'end', 'end'])
+        self.assertListEqual([event for event, phase, _ in ordered if phase == 'make install'], 
+                             ['start', 'end', 'start', 'end'])
+        for src_prefix in sources:
+            self.assertFalse(os.path.exists(src_prefix))
+            self.assertFalse(os.path.exists(os.path.dirname(src_prefix)))
+
+
+class BinaryCacheTest(TestCase):
+    """Unit tests for caching TAU configurations in the binary cache."""
+
+    def test_configuration_archive(self):
+        cwd = os.getcwd()
+        configuration.put('build.binary_cache', os.path.join(cwd, 'cache'), storage=USER_STORAGE)
+        try:
+            tau = _FakeBuildInstallation(os.path.join(cwd, 'abcdef'), [])
+            # Source code and a previously installed configuration
+            for path in os.path.join(tau.install_prefix, 'src', 'Profile.cpp'), \
+                        os.path.join(tau.lib_path, 'Makefile.tau-papi'), \
+                        os.path.join(tau.include_path, 'TAU.h'):
+                if not os.path.isdir(os.path.dirname(path)):
+                    os.makedirs(os.path.dirname(path))
+                with open(path, 'w') as fout:
+                    fout.write(path)
+            tau.installs['make install'] = [os.path.join(tau.lib_path, 'Makefile.tau-pdt'), 
+                                            os.path.join(tau.bin_path, 'tau_cc.sh')]
+            tau.make_install()
+            tau._save_to_binary_cache()
+            archive = os.path.join(cwd, 'cache', 'tau', 'abcdef', 'pdt.tgz')
+            with tarfile.open(archive) as fin:
+                names = set(fin.getnames())
+            arch = tau.arch.name
+            self.assertSetEqual(names, set(['.tau_binary_cache', 'include', 'include/TAU.h', 
+                                            arch + '/lib/Makefile.tau-pdt', arch + '/bin/tau_cc.sh']))
+            # Restore next to another configuration in a different prefix
+            other = _FakeBuildInstallation(os.path.join(cwd, 'other', 'abcdef'), [])
+            os.makedirs(other.lib_path)
+            with open(os.path.join(other.lib_path, 'Makefile.tau-papi'), 'w') as fout:
+                fout.write('papi')
+            self.assertTrue(other._restore_from_binary_cache())
+            self.assertListEqual(sorted(os.listdir(other.lib_path)), ['Makefile.tau-papi', 'Makefile.tau-pdt'])
+            with open(os.path.join(other.lib_path, 'Makefile.tau-pdt')) as fin:
+                self.assertEqual(fin.read(), os.path.join(other.lib_path, 'Makefile.tau-pdt'))
+        finally:
+            configuration.delete('build.binary_cache', storage=USER_STORAGE)
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Test functions.
+
+Functions used for unit tests of scheduler.py.
+"""
+#pylint: disable=missing-docstring
+
+import thread
+import time
+import threading
+from tau import tests
+from tau.cf import scheduler
+
+
+class SchedulerTest(tests.TestCase):
+    """Unit tests for tau.cf.scheduler."""
+
+    def test_parse_cpu_list(self):
+        self.assertListEqual(scheduler.parse_cpu_list('0-3,8,10-11\n'), [0, 1, 2, 3, 8, 10, 11])
+        self.assertRaises(ValueError, scheduler.parse_cpu_list, 'all')
+
+    def test_cpu_sets(self):
+        cpus = scheduler.allowed_cpus()
+        self.assertListEqual(scheduler.cpu_sets(1), [None])
+        sets = scheduler.cpu_sets(len(cpus))
+        if len(cpus) > 1:
+            self.assertListEqual(sets, [[cpu] for cpu in cpus])
+        self.assertListEqual(scheduler.cpu_sets(len(cpus) + 1), [None] * (len(cpus) + 1))
+
+    def test_pinned_command(self):
+        self.assertListEqual(scheduler.pinned_command(['true'], None), ['true'])
+        cmd = scheduler.pinned_command(['true'], [0, 1])
+        self.assertEqual(cmd[-1], 'true')
+        if len(cmd) > 1:
+            self.assertListEqual(cmd[1:], ['-c', '0,1', 'true'])
+
+    def test_run_concurrently(self):
+        running = []
+        peak = []
+        lock = threading.Lock()
+        barrier = threading.Event()
+        def task(slot, idx):
+            with lock:
+                running.append(slot)
+                peak.append(len(running))
+                if len(running) == 3:
+                    barrier.set()
+            barrier.wait(5)
+            with lock:
+                running.remove(slot)
+            if idx == 4:
+                raise RuntimeError('task 4')
+            return idx * idx
+        results, errors = scheduler.run_concurrently(task, 7, 3)
+        self.assertEqual(max(peak), 3)
+        self.assertListEqual(results, [0, 1, 4, 9, None, 25, 36])
+        self.assertTrue(all(error is None for idx, error in enumerate(errors) if idx != 4))
+        self.assertIs(errors[4][0], RuntimeError)
+
+    def test_run_concurrently_interrupted(self):
+        started = []
+        release = threading.Event()
+        def task(_, idx):
+            started.append(idx)
+            if idx == 0:
+                thread.interrupt_main()
+            release.wait(5)
+        with self.assertRaises(KeyboardInterrupt):
+            scheduler.run_concurrently(task, 6, 2)
+        release.set()
+        time.sleep(0.5)
+        self.assertIn(sorted(started), ([0], [0, 1]))
+
+    def test_run_concurrently_interrupted_serial(self):
+        started = []
+        def task(_, idx):
+            started.append(idx)
+            if idx == 1:
+                raise KeyboardInterrupt
+            return idx
+        with self.assertRaises(KeyboardInterrupt):
+            scheduler.run_concurrently(task, 4, 1)
+        self.assertListEqual(started, [0, 1])
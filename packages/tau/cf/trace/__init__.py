@@ -0,0 +1,342 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""TAU trace data.
+
+Reads TAU trace files directly so traces can be merged without ``tau_treemerge.pl`` or ``tau_merge``.
+Each thread writes a ``tautrace.<node>.<context>.<thread>.trc`` file of fixed size binary event 
+records in time order and each node writes an ``events.<node>.edf`` file defining the event 
+identifiers used in that node's trace files.  Trace files are written in the byte order of the
+machine that produced them, which is detected from the first record.
+"""
+
+import os
+import re
+import glob
+import struct
+from tau import logger
+from tau.error import ConfigurationError
+
+
+LOGGER = logger.get_logger(__name__)
+
+RECORD_FORMAT = 'iHHqQ'
+"""str: :any:`struct` format of a trace record: event ID, node ID, thread ID, parameter, timestamp."""
+
+RECORD_SIZE = struct.calcsize('<' + RECORD_FORMAT)
+"""int: Size in bytes of one trace record."""
+
+EV_INIT = 60000
+"""int: Identifier of the tracer event that begins every trace file."""
+
+TRACER_EVENT_MIN = 60000
+"""int: Event identifiers at or above this value are reserved for the tracer and mean the same on every node."""
+
+EDF_HEADER = '# FunctionId Group Tag "Name Type" Parameters\n'
+"""str: Comment line following the event count in an event definition file."""
+
+_TRC_FILE_RE = re.compile(r'^tautrace\.(\d+)\.(\d+)\.(\d+)\.trc$')
+
+_EDF_LINE_RE = re.compile(r'^\s*(-?\d+)\s+(\S+)\s+(-?\d+)\s+"(.*)"\s+(\S+)\s*$')
+
+
+class TraceError(ConfigurationError):
+    """Indicates that trace data could not be read."""
+
+
+class EventDef(object):
+    """One event definition from an event definition file.
+
+    Attributes:
+        event_id (int): Event identifier used in trace records.
+        group (str): Event group, e.g. 'TAU_DEFAULT' or 'MPI'.
+        tag (int): Event tag.
+        name (str): Event name.
+        params (str): Event type, e.g. 'EntryExit' or 'TriggerValue'.
+    """
+    __slots__ = ('event_id', 'group', 'tag', 'name', 'params')
+
+    def __init__(self, event_id, group, tag, name, params):
+        self.event_id = event_id
+        self.group = group
+        self.tag = tag
+        self.name = name
+        self.params = params
+
+    def key(self):
+        """Gets the fields that identify the same event on different nodes.
+
+        Returns:
+            tuple: (group, tag, name, params).
+        """
+        return (self.group, self.tag, self.name, self.params)
+
+    def line(self, event_id=None):
+        """Formats this event definition as a line of an event definition file.
+
+        Args:
+            event_id (int): Write this event identifier instead of :any:`event_id`.
+
+        Returns:
+            str: The formatted line, with a newline.
+        """
+        return '%d %s %d "%s" %s\n' % (self.event_id if event_id is None else event_id, 
+                                       self.group, self.tag, self.name, self.params)
+
+
+def trace_file_thread(path):
+    """Gets the thread identifier from a trace file name.
+
+    Args:
+        path (str): Path to a trace file, e.g. 'tautrace.3.0.1.trc'.
+
+    Returns:
+        tuple: (node, context, thread) integers, or None if `path` isn't a per-thread trace file.
+    """
+    match = _TRC_FILE_RE.match(os.path.basename(path))
+    if not match:
+        return None
+    return tuple(int(x) for x in match.groups())
+
+
+def trace_files(prefix):
+    """Finds the per-thread trace files in a directory.
+
+    Args:
+        prefix (str): Path to a directory containing ``tautrace.*.trc`` files.
+
+    Returns:
+        list: (node, context, thread, path) tuples sorted by node, context, and thread.
+    """
+    found = []
+    for path in glob.glob(os.path.join(prefix, 'tautrace.*.trc')):
+        thread = trace_file_thread(path)
+        if thread:
+            found.append(thread + (path,))
+    found.sort()
+    return found
+
+
+def edf_path(prefix, node):
+    """Gets the path to a node's event definition file.
+
+    Args:
+        prefix (str): Path to the directory containing trace files.
+        node (int): Node identifier.
+
+    Returns:
+        str: Path to ``events.<node>.edf`` in `prefix`.
+    """
+    return os.path.join(prefix, 'events.%d.edf' % node)
+
+
+def read_edf(path):
+    """Reads an event definition file.
+
+    Args:
+        path (str): Path to the event definition file.
+
+    Returns:
+        list: :any:`EventDef` objects in file order.
+
+    Raises:
+        TraceError: The file could not be read or is not an event definition file.
+    """
+    events = []
+    try:
+        with open(path) as fin:
+            header = fin.readline().split()
+            if len(header) < 2 or header[1] != 'dynamic_trace_events':
+                raise TraceError("'%s' is not a TAU event definition file" % path)
+            for line in fin:
+                if line.startswith('#') or not line.strip():
+                    continue
+                match = _EDF_LINE_RE.match(line)
+                if not match:
+                    raise TraceError("Invalid event definition in '%s': %s" % (path, line.strip()))
+                event_id, group, tag, name, params = match.groups()
+                events.append(EventDef(int(event_id), group, int(tag), name, params))
+    except IOError as err:
+        raise TraceError("Unable to read '%s': %s" % (path, err))
+    return events
+
+
+def write_edf(path, events):
+    """Writes an event definition file.
+
+    Args:
+        path (str): Path to the event definition file.
+        events (list): (event_id, :any:`EventDef`) tuples.
+    """
+    with open(path, 'w') as fout:
+        fout.write('%d dynamic_trace_events\n' % len(events))
+        fout.write(EDF_HEADER)
+        for event_id, event in events:
+            fout.write(event.line(event_id))
+
+
+def byte_order(path):
+    """Detects the byte order of a trace file.
+
+    Every trace file begins with an :any:`EV_INIT` record.  If the first record isn't recognized, 
+    the byte order giving the smallest event identifier is assumed.
+
+    Args:
+        path (str): Path to the trace file.
+
+    Returns:
+        str: :any:`struct` byte order character, '<' or '>', or None if the file is empty.
+
+    Raises:
+        TraceError: The file could not be read.
+    """
+    try:
+        with open(path, 'rb') as fin:
+            data = fin.read(RECORD_SIZE)
+    except IOError as err:
+        raise TraceError("Unable to read '%s': %s" % (path, err))
+    if len(data) < RECORD_SIZE:
+        return None
+    little = struct.unpack_from('<i', data)[0]
+    big = struct.unpack_from('>i', data)[0]
+    if little == EV_INIT:
+        return '<'
+    elif big == EV_INIT:
+        return '>'
+    LOGGER.debug("'%s' does not begin with EV_INIT, guessing byte order", path)
+    return '<' if abs(little) <= abs(big) else '>'
+
+
+class TraceReader(object):
+    """Reads a trace file in fixed size blocks of records.
+
+    Only one block, plus any records kept from the previous block, is held in memory and the file 
+    is only open while a block is being read, so any number of trace files can be read at once 
+    without exhausting file descriptors.  A block never ends between two records with the same 
+    timestamp, so a block may be longer than requested.
+
+    Attributes:
+        path (str): Path to the trace file.
+        order (str): :any:`struct` byte order character of the records in the file.
+        records (list): Each record in the current block as a string.
+        times (tuple): Timestamp of each record in the current block.
+        eof (bool): True if every record in the file has been read.
+    """
+
+    def __init__(self, path, order, block_records, output_order=None, remap=None):
+        """Initialize the reader.
+
+        Args:
+            path (str): Path to the trace file.
+            order (str): :any:`struct` byte order character of the records in the file.
+            block_records (int): Number of records to read at a time.
+            output_order (str): If given, convert records to this byte order.
+            remap (dict): If given, replace event identifiers that are keys of this dictionary.
+        """
+        self.path = path
+        self.order = order
+        self.records = []
+        self.times = ()
+        self.eof = False
+        self._block_size = max(1, block_records) * RECORD_SIZE
+        self._offset = 0
+        self._output_order = output_order if output_order != order else None
+        self._remap = remap or None
+        self._structs = {}
+
+    def _struct(self, order, count):
+        key = (order, count)
+        try:
+            return self._structs[key]
+        except KeyError:
+            fmt = self._structs[key] = struct.Struct(order + RECORD_FORMAT * count)
+            return fmt
+
+    def _time(self, data, offset):
+        return self._struct(self.order, 1).unpack_from(data, offset)[4]
+
+    def next_block(self, keep=0):
+        """Reads the next block of records.
+
+        Args:
+            keep (int): Number of records at the end of the current block to keep before the new records.
+
+        Returns:
+            bool: True if records were read, False at the end of the file.
+
+        Raises:
+            TraceError: The file could not be read.
+        """
+        kept_records = self.records[len(self.records) - keep:] if keep else []
+        kept_times = self.times[len(self.times) - keep:] if keep else ()
+        if self.eof:
+            self.records, self.times = kept_records, kept_times
+            return False
+        try:
+            with open(self.path, 'rb') as fin:
+                fin.seek(self._offset)
+                data = fin.read(self._block_size)
+                eof = len(data) < self._block_size
+                if not eof:
+                    # Records with the same timestamp in different files are merged in file order
+                    # so every record with the last timestamp in the block must be in the block
+                    last = self._time(data, len(data) - RECORD_SIZE)
+                    chunks = [data]
+                    while True:
+                        record = fin.read(RECORD_SIZE)
+                        if len(record) < RECORD_SIZE:
+                            chunks.append(record)
+                            eof = True
+                            break
+                        if self._time(record, 0) != last:
+                            break
+                        chunks.append(record)
+                    data = ''.join(chunks)
+        except IOError as err:
+            raise TraceError("Unable to read '%s': %s" % (self.path, err))
+        self._offset += len(data)
+        self.eof = eof
+        count = len(data) // RECORD_SIZE
+        if len(data) % RECORD_SIZE:
+            LOGGER.warning("Ignoring %d bytes of incomplete record at the end of '%s'", 
+                           len(data) % RECORD_SIZE, self.path)
+            data = data[:count * RECORD_SIZE]
+        if not count:
+            self.records, self.times = kept_records, kept_times
+            return False
+        values = self._struct(self.order, count).unpack_from(data)
+        if self._remap or self._output_order:
+            values = list(values)
+            if self._remap:
+                get = self._remap.get
+                values[0::5] = [get(event_id, event_id) for event_id in values[0::5]]
+            data = self._struct(self._output_order or self.order, count).pack(*values)
+        records = [data[i:i + RECORD_SIZE] for i in xrange(0, len(data), RECORD_SIZE)]
+        times = tuple(values[4::5])
+        self.records = kept_records + records if keep else records
+        self.times = kept_times + times if keep else times
+        return True
@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Merge per-thread TAU trace files.
+
+Merges ``tautrace.<node>.<context>.<thread>.trc`` files into one trace file ordered by timestamp 
+and the nodes' ``events.<node>.edf`` files into one event definition file, like ``tau_treemerge.pl``.
+The trace files are read in blocks and merged in rounds.  A heap keyed on the timestamp of the last
+record in each file's current block gives the latest timestamp that can be merged without reading
+more blocks, and a heap keyed on the timestamp of each file's next record selects the files with 
+records up to that timestamp.  Those records are ordered with one sort per round, so memory use
+depends on the number of files and the block size and not on the size of the files.
+
+Events with the same group, tag, name, and type on different nodes are given the same identifier
+in the merged event definitions and records are rewritten as needed.  Timestamps are not adjusted.
+"""
+
+import os
+import heapq
+from bisect import bisect_right
+from tau import logger, util
+from tau.error import InternalError
+from tau.cf.trace import (TraceError, TraceReader, RECORD_SIZE, TRACER_EVENT_MIN, 
+                          trace_files, edf_path, read_edf, write_edf, byte_order)
+
+
+LOGGER = logger.get_logger(__name__)
+
+MERGED_TRACE = 'tau.trc'
+"""str: Name of the merged trace file."""
+
+MERGED_EDF = 'tau.edf'
+"""str: Name of the merged event definition file."""
+
+DEFAULT_MEMORY = 8 * 1024 * 1024
+"""int: Default number of bytes of memory to use for trace records while merging."""
+
+MIN_BLOCK_RECORDS = 64
+"""int: Minimum number of records to read from a trace file at a time."""
+
+MAX_BLOCK_RECORDS = 16384
+"""int: Maximum number of records to read from a trace file at a time."""
+
+_OUTPUT_BUFFER = 1024 * 1024
+
+# Memory used by one record while it is merged: the record string, its timestamp, and its share
+# of the lists built to sort each round
+_RECORD_MEMORY = 320
+
+
+def merge_events(node_events):
+    """Merges the event definitions of several nodes.
+
+    An event keeps its identifier unless a different event on an earlier node already has it.
+    Tracer events keep their identifiers.
+
+    Args:
+        node_events (dict): Lists of :any:`EventDef` objects indexed by node identifier.
+
+    Returns:
+        tuple: (events, remaps) where `events` is a list of (event_id, :any:`EventDef`) tuples 
+               sorted by identifier and `remaps` maps each node identifier to a dictionary of 
+               changed identifiers.  Nodes without changed identifiers are not in `remaps`.
+    """
+    next_id = 1 + max([event.event_id for events in node_events.itervalues() for event in events
+                       if event.event_id < TRACER_EVENT_MIN] or [0])
+    by_key = {}
+    by_id = {}
+    remaps = {}
+    for node in sorted(node_events):
+        remap = {}
+        for event in node_events[node]:
+            if event.event_id >= TRACER_EVENT_MIN:
+                by_id.setdefault(event.event_id, event)
+                continue
+            key = event.key()
+            event_id = by_key.get(key)
+            if event_id is None:
+                event_id = event.event_id
+                if event_id in by_id:
+                    event_id = next_id
+                    next_id += 1
+                by_key[key] = event_id
+                by_id[event_id] = event
+            if event_id != event.event_id:
+                remap[event.event_id] = event_id
+        if remap:
+            remaps[node] = remap
+    return sorted(by_id.iteritems()), remaps
+
+
+def _merge_records(readers, block_records, fout):
+    positions = [0] * len(readers)
+    active = range(len(readers))
+    count = 0
+    while active:
+        # Top up every reader that has merged at least half of its records so all blocks
+        # end at about the same time and each round merges many records
+        remaining = []
+        for idx in active:
+            reader = readers[idx]
+            keep = len(reader.times) - positions[idx]
+            if keep <= block_records // 2:
+                reader.next_block(keep)
+                positions[idx] = 0
+            if reader.times:
+                remaining.append(idx)
+        active = remaining
+        # `ends` holds the timestamp of the last record read by each reader so every record up to 
+        # ends[0] can be merged without reading more.  `front` holds the timestamp of each 
+        # reader's next record so only readers with records up to ends[0] take part in a round.
+        front = [(readers[idx].times[positions[idx]], idx) for idx in active]
+        ends = [(readers[idx].times[-1], idx) for idx in active]
+        heapq.heapify(front)
+        heapq.heapify(ends)
+        while ends:
+            watermark = ends[0][0]
+            merging = []
+            while front and front[0][0] <= watermark:
+                merging.append(heapq.heappop(front)[1])
+            merging.sort()
+            times = []
+            records = []
+            for idx in merging:
+                reader = readers[idx]
+                pos = positions[idx]
+                if reader.times[-1] <= watermark:
+                    end = len(reader.times)
+                else:
+                    end = bisect_right(reader.times, watermark, pos)
+                times.extend(reader.times[pos:end])
+                records.extend(reader.records[pos:end])
+                positions[idx] = end
+                if end < len(reader.times):
+                    heapq.heappush(front, (reader.times[end], idx))
+            if len(merging) > 1:
+                # Stable sort keeps records with the same timestamp in reader order
+                records = map(records.__getitem__, sorted(xrange(len(times)), key=times.__getitem__))
+            fout.write(''.join(records))
+            count += len(records)
+            # Read more records before merging past the last record read by a reader
+            refill = False
+            while ends and not refill and positions[ends[0][1]] == len(readers[ends[0][1]].times):
+                refill = not readers[heapq.heappop(ends)[1]].eof
+            if refill:
+                break
+    return count
+
+
+def merge(prefix, output_prefix=None, memory=DEFAULT_MEMORY):
+    """Merges the per-thread trace files in a directory.
+
+    Writes :any:`MERGED_TRACE` and :any:`MERGED_EDF`.  Records are written in the byte order 
+    of the first trace file.  Records with the same timestamp are ordered by node, context, and thread.
+
+    Args:
+        prefix (str): Path to a directory containing ``tautrace.*.trc`` and ``events.*.edf`` files.
+        output_prefix (str): Directory to write the merged files in.  Default is `prefix`.
+        memory (int): Approximate number of bytes of memory to use for trace records.
+
+    Returns:
+        int: Number of records in the merged trace file.
+
+    Raises:
+        TraceError: The trace files could not be read.
+    """
+    files = trace_files(prefix)
+    if not files:
+        raise TraceError("No trace files in '%s'" % prefix)
+    output_prefix = output_prefix or prefix
+    node_events = {}
+    for node in set(node for node, _, _, _ in files):
+        node_events[node] = read_edf(edf_path(prefix, node))
+    events, remaps = merge_events(node_events)
+    block_records = min(MAX_BLOCK_RECORDS, max(MIN_BLOCK_RECORDS, memory // (_RECORD_MEMORY * len(files))))
+    readers = []
+    output_order = None
+    for node, _, _, path in files:
+        order = byte_order(path)
+        if order is None:
+            continue
+        output_order = output_order or order
+        readers.append(TraceReader(path, order, block_records, output_order, remaps.get(node)))
+    LOGGER.debug("Merging %d trace files from '%s' reading %d records at a time", 
+                 len(readers), prefix, block_records)
+    trc_path = os.path.join(output_prefix, MERGED_TRACE)
+    tmp_path = '%s.%d.tmp' % (trc_path, os.getpid())
+    try:
+        with open(tmp_path, 'wb', _OUTPUT_BUFFER) as fout:
+            count = _merge_records(readers, block_records, fout)
+        write_edf(os.path.join(output_prefix, MERGED_EDF), events)
+        os.rename(tmp_path, trc_path)
+    except IOError as err:
+        raise TraceError("Unable to write merged trace in '%s': %s" % (output_prefix, err))
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    LOGGER.debug("Wrote %d records to '%s'", count, trc_path)
+    return count
+
+
+def merge_traces(prefix, env=None):
+    """Merges the per-thread trace files in a directory, using ``tau_treemerge.pl`` if :any:`merge` fails.
+
+    Args:
+        prefix (str): Path to a directory containing ``tautrace.*.trc`` and ``events.*.edf`` files.
+        env (dict): Environment variables to set before running ``tau_treemerge.pl``.
+
+    Raises:
+        InternalError: ``tau_treemerge.pl`` failed too.
+    """
+    try:
+        merge(prefix)
+    except TraceError as err:
+        LOGGER.debug(err)
+        LOGGER.warning("Unable to merge trace files, trying tau_treemerge.pl")
+        retval = util.create_subprocess(['tau_treemerge.pl'], cwd=prefix, env=env, log=False)
+        if retval != 0:
+            raise InternalError("Nonzero return code from tau_treemerge.pl")
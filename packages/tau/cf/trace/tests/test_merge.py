@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Test functions.
+
+Functions used for unit tests of merge.py.
+"""
+#pylint: disable=missing-docstring
+
+import os
+import struct
+from tau import tests, util
+from tau.error import InternalError
+from tau.cf import trace
+from tau.cf.trace import merge
+
+
+def write_trace(path, records, order='<'):
+    with open(path, 'wb') as fout:
+        for record in records:
+            fout.write(struct.pack(order + trace.RECORD_FORMAT, *record))
+
+
+def write_edf(path, events):
+    with open(path, 'w') as fout:
+        fout.write('%d dynamic_trace_events\n' % len(events))
+        fout.write(trace.EDF_HEADER)
+        for event_id, group, name, params in events:
+            fout.write('%d %s 0 "%s" %s\n' % (event_id, group, name, params))
+
+
+def read_trace(path, order='<'):
+    fmt = struct.Struct(order + trace.RECORD_FORMAT)
+    with open(path, 'rb') as fin:
+        data = fin.read()
+    return [fmt.unpack_from(data, i) for i in xrange(0, len(data), fmt.size)]
+
+
+class MergeTest(tests.TestCase):
+    """Unit tests for tau.cf.trace.merge."""
+
+    def _trial(self, records_per_thread=4):
+        prefix = util.mkdtemp(dir=os.getcwd())
+        tracer = (trace.EV_INIT, 'TRACER', 'EV_INIT', 'none')
+        write_edf(os.path.join(prefix, 'events.0.edf'), 
+                  [tracer, (1, 'TAU_DEFAULT', 'main() ', 'EntryExit'), (2, 'MPI', 'MPI_Send() ', 'EntryExit')])
+        write_edf(os.path.join(prefix, 'events.1.edf'), 
+                  [tracer, (1, 'MPI', 'MPI_Send() ', 'EntryExit'), (2, 'TAU_DEFAULT', 'main() ', 'EntryExit'),
+                   (3, 'TAU_USER', 'solve() ', 'EntryExit')])
+        for node in range(2):
+            for thread in range(2):
+                records = [(trace.EV_INIT, node, thread, 3, 0)]
+                for i in xrange(1, records_per_thread):
+                    records.append((1 + i % 3 if node else 1 + i % 2, node, thread, 1, 10 * i + 3 * node + thread))
+                write_trace(os.path.join(prefix, 'tautrace.%d.0.%d.trc' % (node, thread)), records)
+        return prefix
+
+    def test_merge(self):
+        prefix = self._trial()
+        self.assertEqual(merge.merge(prefix), 16)
+        records = read_trace(os.path.join(prefix, merge.MERGED_TRACE))
+        self.assertEqual(len(records), 16)
+        self.assertEqual([rec[4] for rec in records], sorted(rec[4] for rec in records))
+        # Equal timestamps are ordered by node and thread
+        self.assertEqual([(rec[1], rec[2]) for rec in records[:4]], [(0, 0), (0, 1), (1, 0), (1, 1)])
+        events = dict((event.event_id, event) for event in trace.read_edf(os.path.join(prefix, merge.MERGED_EDF)))
+        self.assertItemsEqual(events, [1, 2, 3, trace.EV_INIT])
+        for event_id, node, _, _, _ in records:
+            if node == 1 and event_id != trace.EV_INIT:
+                self.assertIn(events[event_id].name, ['MPI_Send() ', 'main() ', 'solve() '])
+        node1 = [(rec[4], events[rec[0]].name) for rec in records if rec[1] == 1 and rec[2] == 0][1:]
+        self.assertEqual(node1, [(13, 'main() '), (23, 'solve() '), (33, 'MPI_Send() ')])
+
+    def test_merge_events(self):
+        node_events = {0: trace.read_edf(os.path.join(self._trial(), 'events.0.edf')),
+                       1: trace.read_edf(os.path.join(self._trial(), 'events.1.edf'))}
+        events, remaps = merge.merge_events(node_events)
+        self.assertEqual([event_id for event_id, _ in events], [1, 2, 3, trace.EV_INIT])
+        self.assertNotIn(0, remaps)
+        self.assertEqual(remaps[1], {1: 2, 2: 1})
+        node_events[2] = [trace.EventDef(2, 'TAU_USER', 0, 'other() ', 'EntryExit')]
+        events, remaps = merge.merge_events(node_events)
+        self.assertEqual(dict(events)[4].name, 'other() ')
+        self.assertEqual(remaps[2], {2: 4})
+
+    def test_blocks(self):
+        prefix = self._trial(records_per_thread=1000)
+        self.assertEqual(merge.merge(prefix, memory=0), 4000)
+        times = [rec[4] for rec in read_trace(os.path.join(prefix, merge.MERGED_TRACE))]
+        self.assertEqual(times, sorted(times))
+
+    def test_blocks_equal_times(self):
+        prefix = util.mkdtemp(dir=os.getcwd())
+        write_edf(os.path.join(prefix, 'events.0.edf'), [(1, 'TAU_DEFAULT', 'main() ', 'EntryExit')])
+        write_trace(os.path.join(prefix, 'tautrace.0.0.0.trc'), [(1, 0, 0, 1, 5)] * 100 + [(1, 0, 0, 1, 6)])
+        write_trace(os.path.join(prefix, 'tautrace.0.0.1.trc'), [(1, 0, 1, 1, 5)] * 3)
+        # Records with the same timestamp span several blocks of the first file
+        self.assertEqual(merge.merge(prefix, memory=0), 104)
+        records = read_trace(os.path.join(prefix, merge.MERGED_TRACE))
+        self.assertEqual([rec[2] for rec in records], [0] * 100 + [1] * 3 + [0])
+        self.assertEqual([rec[4] for rec in records], [5] * 103 + [6])
+
+    def test_byte_order(self):
+        prefix = util.mkdtemp(dir=os.getcwd())
+        write_edf(os.path.join(prefix, 'events.0.edf'), [(1, 'TAU_DEFAULT', 'main() ', 'EntryExit')])
+        write_trace(os.path.join(prefix, 'tautrace.0.0.0.trc'), 
+                    [(trace.EV_INIT, 0, 0, 3, 0), (1, 0, 0, 1, 5)], order='>')
+        write_trace(os.path.join(prefix, 'tautrace.0.0.1.trc'), 
+                    [(trace.EV_INIT, 0, 1, 3, 0), (1, 0, 1, 1, 2)], order='<')
+        self.assertEqual(trace.byte_order(os.path.join(prefix, 'tautrace.0.0.0.trc')), '>')
+        self.assertEqual(merge.merge(prefix), 4)
+        records = read_trace(os.path.join(prefix, merge.MERGED_TRACE), order='>')
+        self.assertEqual([(rec[2], rec[4]) for rec in records], [(0, 0), (1, 0), (1, 2), (0, 5)])
+
+    def test_no_traces(self):
+        prefix = util.mkdtemp(dir=os.getcwd())
+        self.assertRaises(trace.TraceError, merge.merge, prefix)
+
+    def test_merge_traces(self):
+        prefix = self._trial()
+        merge.merge_traces(prefix)
+        self.assertEqual(len(read_trace(os.path.join(prefix, merge.MERGED_TRACE))), 16)
+        # Fall back to tau_treemerge.pl
+        bin_dir = util.mkdtemp(dir=os.getcwd())
+        script = os.path.join(bin_dir, 'tau_treemerge.pl')
+        with open(script, 'w') as fout:
+            fout.write('#!/bin/sh\necho treemerge > tau.trc\nexit $TREEMERGE_EXIT\n')
+        os.chmod(script, 0755)
+        env = {'PATH': bin_dir + os.pathsep + os.environ['PATH'], 'TREEMERGE_EXIT': '0'}
+        prefix = util.mkdtemp(dir=os.getcwd())
+        merge.merge_traces(prefix, env)
+        with open(os.path.join(prefix, merge.MERGED_TRACE)) as fin:
+            self.assertEqual(fin.read(), 'treemerge\n')
+        env['TREEMERGE_EXIT'] = '1'
+        self.assertRaises(InternalError, merge.merge_traces, prefix, env)
@@ -209,6 +209,8 @@ class InitializeCommand(AbstractCommand):
                            '--link-only=False'] + measurement_args)
             measurement_names.append('trace')
 
+        # Build every TAU configuration at once instead of one at a time as experiments are selected
+        Project.controller().selected().configure()
         select_cmd.main(['--target', target_name, 
                          '--application', application_name, 
                          '--measurement', measurement_names[0]])
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""``tau software list-configs`` subcommand."""
+
+import os
+from texttable import Texttable
+from tau import EXIT_SUCCESS, logger, util
+from tau.cli import arguments
+from tau.cli.command import AbstractCommand
+from tau.model.project import Project
+from tau.cf.software import SoftwarePackageError
+
+
+class SoftwareListConfigsCommand(AbstractCommand):
+    """``tau software list-configs`` subcommand."""
+
+    def _construct_parser(self):
+        usage = "%s [arguments]" % self.command
+        parser = arguments.get_parser(prog=self.command, usage=usage, description=self.summary)
+        return parser
+
+    def main(self, argv):
+        self._parse_args(argv)
+        proj = Project.controller().selected()
+        # Group the project's TAU configurations by the makefile index they use
+        installations = {}
+        for tau in proj.tau_installations():
+            if not tau.forced_makefile:
+                installations.setdefault(tau._makefile_index_file(), []).append(tau)  # pylint: disable=protected-access
+        for _, taus in sorted(installations.iteritems()):
+            used = set()
+            for tau in taus:
+                try:
+                    used.add(tau.get_makefile())
+                except SoftwarePackageError:
+                    pass
+            tau = taus[0]
+            makefiles = tau.makefile_index()
+            print util.hline("TAU configurations in '%s'" % tau.lib_path)
+            if not makefiles:
+                print "No TAU configurations are installed."
+                print
+                continue
+            table = Texttable(logger.LINE_WIDTH)
+            table.set_cols_align(['l', 'l', 'c'])
+            table.set_deco(Texttable.HEADER | Texttable.VLINES)
+            table.header(['Makefile', 'Tags', 'Used by Project'])
+            for name, tags in sorted(makefiles.iteritems()):
+                path = os.path.join(tau.lib_path, name)
+                table.add_row([name, ', '.join(sorted(tags)), 'Yes' if path in used else 'No'])
+            print table.draw()
+            print
+        return EXIT_SUCCESS
+
+
+COMMAND = SoftwareListConfigsCommand(__name__, 
+                                     summary_fmt="List the TAU configurations installed for the selected project.")
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""``tau software prefetch`` subcommand."""
+
+import os
+import threading
+from tau import EXIT_SUCCESS, EXIT_FAILURE
+from tau.cli import arguments
+from tau.cli.command import AbstractCommand
+from tau.cli.arguments import ParseBooleanAction
+from tau.model.project import Project
+from tau.cf.software import archive_store
+
+
+class SoftwarePrefetchCommand(AbstractCommand):
+    """``tau software prefetch`` subcommand."""
+
+    def _construct_parser(self):
+        usage = "%s [arguments]" % self.command
+        parser = arguments.get_parser(prog=self.command, usage=usage, description=self.summary)
+        parser.add_argument('--mirror',
+                            help="search these directories or URLs for source archives before downloading",
+                            metavar='<path>',
+                            nargs='+',
+                            dest='mirrors',
+                            default=arguments.SUPPRESS)
+        parser.add_argument('--refresh',
+                            help="acquire new copies of source archives and accept new checksums",
+                            nargs='?',
+                            const=True,
+                            default=False,
+                            metavar='T/F',
+                            action=ParseBooleanAction)
+        return parser
+
+    @staticmethod
+    def _sources(installations):
+        sources = set()
+        def visit(inst):
+            # Directories are existing installations provided by the user
+            if inst.src and not os.path.isdir(inst.src):
+                sources.add(inst.src)
+            for dep in inst.dependencies.itervalues():
+                visit(dep)
+        for inst in installations:
+            visit(inst)
+        return sources
+
+    def main(self, argv):
+        args = self._parse_args(argv)
+        proj = Project.controller().selected()
+        sources = self._sources(proj.tau_installations())
+        errors = {}
+        def worker(src):
+            try:
+                path = archive_store.acquire(src, refresh=args.refresh, mirrors=getattr(args, 'mirrors', None))
+            except IOError as err:
+                errors[src] = err
+            else:
+                self.logger.info("'%s' is stored at '%s'", src, path)
+        threads = [threading.Thread(target=worker, args=(src,)) for src in sorted(sources)]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for src, err in sorted(errors.iteritems()):
+            self.logger.error("Cannot acquire '%s': %s", src, err)
+        return EXIT_FAILURE if errors else EXIT_SUCCESS
+
+
+COMMAND = SoftwarePrefetchCommand(__name__, summary_fmt="Acquire all source archives the selected project needs.")
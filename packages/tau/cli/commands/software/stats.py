@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""``tau software stats`` subcommand."""
+
+from texttable import Texttable
+from tau import EXIT_SUCCESS, logger
+from tau.cli import arguments
+from tau.cli.command import AbstractCommand
+from tau.cf.software import build_stats
+
+
+def _duration(seconds):
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    return '%d:%02d' % (minutes, seconds)
+
+
+class SoftwareStatsCommand(AbstractCommand):
+    """``tau software stats`` subcommand."""
+
+    def _construct_parser(self):
+        usage = "%s [arguments]" % self.command
+        parser = arguments.get_parser(prog=self.command, usage=usage, description=self.summary)
+        parser.add_argument('--limit',
+                            help="show at most this many build phases",
+                            metavar='<count>',
+                            type=int,
+                            default=20)
+        return parser
+
+    def main(self, argv):
+        args = self._parse_args(argv)
+        rows = build_stats.summary()[:args.limit]
+        if not rows:
+            self.logger.info("No software builds have been recorded.")
+            return EXIT_SUCCESS
+        table = Texttable(logger.LINE_WIDTH)
+        table.set_cols_align(['l', 'l', 'l', 'r', 'r', 'r', 'r', 'r', 'r'])
+        table.set_deco(Texttable.HEADER | Texttable.VLINES)
+        table.header(['Package', 'Phase', 'Host', 'Cores', 'Jobs', 'Builds', 'Wall', 'CPU', 'Efficiency'])
+        for row in rows:
+            table.add_row([row['package'], row['phase'], row['host'], row['cores'], row['jobs'] or 1, row['builds'],
+                           _duration(row['wall']), _duration(row['cpu']), '%d%%' % (100*row['efficiency'])])
+        print table.draw()
+        print
+        print "Wall and CPU times are averages.  Efficiency is CPU time divided by wall time and `make` jobs."
+        return EXIT_SUCCESS
+
+
+COMMAND = SoftwareStatsCommand(__name__, summary_fmt="Show the slowest software build phases recorded on this system.")
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""Test functions.
+
+Functions used for unit tests of stats.py.
+"""
+#pylint: disable=missing-docstring
+
+import sys
+import uuid
+from tau import tests
+from tau.cli.commands.software.stats import COMMAND as stats_cmd
+from tau.cf.software import build_stats
+
+class StatsTest(tests.TestCase):
+    """Tests for :any:`software.stats`."""
+
+    def test_stats(self):
+        package = uuid.uuid4().hex[:5]
+        build_stats.record(package, 'make', 4, sys.maxint, sys.maxint)
+        stdout, stderr = self.assertCommandReturnValue(0, stats_cmd, ['--limit', '1'])
+        self.assertIn(package, stdout)
+        self.assertIn('Efficiency', stdout)
+        self.assertFalse(stderr)
+
+    def test_invalid_limit(self):
+        self.assertNotCommandReturnValue(0, stats_cmd, ['--limit', 'all'])
+
+    def test_h_arg(self):
+        stdout, _ = self.assertCommandReturnValue(0, stats_cmd, ['-h'])
+        self.assertIn('Show this help message and exit', stdout)
+
+    def test_help_arg(self):
+        stdout, _ = self.assertCommandReturnValue(0, stats_cmd, ['--help'])
+        self.assertIn('Show this help message and exit', stdout)
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""``tau trial analyze`` subcommand."""
+
+from tau.cli import arguments
+from tau.cli.command import AbstractCommand
+from tau.model.project import Project
+from tau.cf.profile.imbalance import UNITS, VALUES
+
+class TrialAnalyzeCommand(AbstractCommand):
+    """``tau trial analyze`` subcommand."""
+    
+    def _construct_parser(self):
+        usage = "%s [trial_number] [trial_number] ... --imbalance [arguments]" % self.command
+        parser = arguments.get_parser(prog=self.command, usage=usage, description=self.summary)
+        parser.add_argument('--imbalance', 
+                            help=("show the functions with the most load imbalance: the maximum to mean ratio, "
+                                  "coefficient of variation, and slowest and fastest thread or rank of each function"),
+                            action='store_true',
+                            default=False)
+        parser.add_argument('--metric', 
+                            help="analyze this metric.  Default is TIME",
+                            metavar='<metric>',
+                            default=None)
+        parser.add_argument('--value', 
+                            help="compare this value of each function",
+                            metavar='<value>',
+                            choices=VALUES,
+                            default='exclusive')
+        parser.add_argument('--across', 
+                            help="compare each function across threads or across ranks",
+                            metavar='<unit>',
+                            choices=UNITS,
+                            default='thread')
+        parser.add_argument('--top', 
+                            help="number of functions to show",
+                            metavar='<count>',
+                            type=int,
+                            default=20)
+        parser.add_argument('--json', 
+                            help="write one JSON object per trial",
+                            action='store_true',
+                            default=False)
+        parser.add_argument('numbers', 
+                            help="analyze specified trials",
+                            metavar='<trial_number>',
+                            nargs='*',
+                            default=arguments.SUPPRESS)
+        return parser
+
+    def main(self, argv):
+        args = self._parse_args(argv)
+        if not args.imbalance:
+            self.parser.error("No analysis specified, e.g. --imbalance")
+        if args.top < 1:
+            self.parser.error("--top must be at least 1")
+        numbers = None
+        if getattr(args, 'numbers', None):
+            numbers = []
+            for num in args.numbers:
+                try:
+                    numbers.append(int(num))
+                except ValueError:
+                    self.parser.error("Invalid trial number: %s" % num)
+        proj_ctrl = Project.controller()
+        proj = proj_ctrl.selected()
+        expr = proj.experiment()
+        return expr.analyze_imbalance(trial_numbers=numbers, metric=args.metric, value=args.value, 
+                                      unit=args.across, count=args.top, output='json' if args.json else 'text')
+
+COMMAND = TrialAnalyzeCommand(__name__, summary_fmt="Analyze trial data.")
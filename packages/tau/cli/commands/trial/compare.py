@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""``tau trial compare`` subcommand."""
+
+from tau import EXIT_SUCCESS, EXIT_FAILURE
+from tau.cli import arguments
+from tau.cli.command import AbstractCommand
+from tau.model.project import Project
+from tau.cf.profile import DEFAULT_METRIC
+from tau.cf.profile.compare import AGGREGATES, VALUES
+
+class TrialCompareCommand(AbstractCommand):
+    """``tau trial compare`` subcommand."""
+    
+    def _construct_parser(self):
+        usage = "%s <baseline_trials> <trials> [trials] ... [arguments]" % self.command
+        parser = arguments.get_parser(prog=self.command, usage=usage, description=self.summary)
+        parser.add_argument('groups', 
+                            help=("compare each group of trials to the first group.  A group is a trial number, "
+                                  "a comma-separated list of repeated trials, or a range like 3-7"),
+                            metavar='<trials>',
+                            nargs='+')
+        parser.add_argument('--metric', 
+                            help="compare this metric",
+                            metavar='<metric>',
+                            default=DEFAULT_METRIC)
+        parser.add_argument('--value', 
+                            help="compare this value of each function",
+                            metavar='<value>',
+                            choices=VALUES,
+                            default='exclusive')
+        parser.add_argument('--aggregate', 
+                            help="combine each function's thread values by their total or mean",
+                            metavar='<aggregate>',
+                            choices=AGGREGATES,
+                            default='total')
+        parser.add_argument('--threshold', 
+                            help="ignore changes smaller than this percentage",
+                            metavar='<percent>',
+                            type=float,
+                            default=5.0)
+        parser.add_argument('--alpha', 
+                            help="significance level used to test groups of repeated trials",
+                            metavar='<alpha>',
+                            type=float,
+                            default=0.05)
+        parser.add_argument('--top', 
+                            help="number of functions to show in addition to regressed functions",
+                            metavar='<count>',
+                            type=int,
+                            default=20)
+        parser.add_argument('--json', 
+                            help="write one JSON object listing all functions per compared group",
+                            action='store_true',
+                            default=False)
+        parser.add_argument('--fail-on-regression', 
+                            help="exit with an error status if any function regressed",
+                            action='store_true',
+                            default=False)
+        return parser
+
+    def _parse_group(self, group):
+        numbers = []
+        for part in group.split(','):
+            try:
+                if '-' in part:
+                    first, last = (int(num) for num in part.split('-', 1))
+                    if last < first:
+                        raise ValueError
+                    numbers.extend(range(first, last + 1))
+                else:
+                    numbers.append(int(part))
+            except ValueError:
+                self.parser.error("Invalid trial numbers: %s" % group)
+        return numbers
+
+    def main(self, argv):
+        args = self._parse_args(argv)
+        if len(args.groups) < 2:
+            self.parser.error("At least two groups of trials are required")
+        if args.threshold < 0:
+            self.parser.error("--threshold must not be negative")
+        if not 0 < args.alpha < 1:
+            self.parser.error("--alpha must be between 0 and 1")
+        groups = [self._parse_group(group) for group in args.groups]
+        proj_ctrl = Project.controller()
+        proj = proj_ctrl.selected()
+        expr = proj.experiment()
+        regressions = expr.compare_trials(groups, metric=args.metric, value=args.value, aggregate=args.aggregate, 
+                                          threshold=args.threshold / 100.0, alpha=args.alpha, count=args.top, 
+                                          output='json' if args.json else 'text')
+        if regressions and args.fail_on_regression:
+            return EXIT_FAILURE
+        return EXIT_SUCCESS
+
+COMMAND = TrialCompareCommand(__name__, summary_fmt="Compare trials and detect performance regressions.")
@@ -27,6 +27,7 @@
 #
 """``tau trial create`` subcommand."""
 
+import itertools
 from tau import util
 from tau.error import ConfigurationError
 from tau.cli import arguments
@@ -68,7 +69,46 @@ class TrialCreateCommand(CreateCommand):
                             metavar='<command>',
                             nargs=arguments.REMAINDER,
                             default=arguments.SUPPRESS)
+        parser.add_argument('--repeat',
+                            help="perform this many trials of each parameter set",
+                            metavar='<count>',
+                            type=int,
+                            default=1)
+        parser.add_argument('--concurrency',
+                            help="perform up to this many trials at the same time on disjoint sets of CPUs",
+                            metavar='<count>',
+                            type=int,
+                            default=1)
+        parser.add_argument('--sweep',
+                            help=("perform trials for each value of an environment variable, e.g. "
+                                  "'OMP_NUM_THREADS=1,2,4'.  May be repeated to sweep all combinations of values.  "
+                                  "'{NAME}' in the command line is replaced by the value of NAME"),
+                            metavar='<name>=<value>[,<value>...]',
+                            action='append',
+                            default=[])
         return parser
+
+    def _parse_sweep(self, specs):
+        """Expands ``--sweep`` arguments to a list of parameter sets.
+        
+        Args:
+            specs (list): Strings like 'NAME=VALUE1,VALUE2'.
+            
+        Returns:
+            list: Dictionaries mapping parameter names to values, one for each combination of values.
+        """
+        names, values = [], []
+        for spec in specs:
+            name, _, vals = spec.partition('=')
+            name = name.strip()
+            vals = [val.strip() for val in vals.split(',') if val.strip()]
+            if not name or not vals:
+                self.parser.error("Invalid sweep '%s'.  Use NAME=VALUE1,VALUE2,..." % spec)
+            if name in names:
+                self.parser.error("'%s' is swept more than once" % name)
+            names.append(name)
+            values.append(vals)
+        return [dict(zip(names, combo)) for combo in itertools.product(*values)] if names else None
     
     def _detect_launcher(self, application_cmd):
         cmd = application_cmd[0]
@@ -99,6 +139,11 @@ class TrialCreateCommand(CreateCommand):
 
     def main(self, argv):
         args = self._parse_args(argv)
+        if args.repeat < 1:
+            self.parser.error("--repeat must be at least 1")
+        if args.concurrency < 1:
+            self.parser.error("--concurrency must be at least 1")
+        sweep = self._parse_sweep(args.sweep)
         application_cmd = [args.cmd] + args.cmd_args
         try:
             launcher_cmd = args.launcher
@@ -108,7 +153,8 @@ class TrialCreateCommand(CreateCommand):
         proj_ctrl = Project.controller()
         proj = proj_ctrl.selected()
         expr = proj.experiment()
-        return expr.managed_run(launcher_cmd, application_cmd)
+        return expr.managed_run(launcher_cmd, application_cmd, 
+                                sweep=sweep, repeat=args.repeat, concurrency=args.concurrency)
 
 
 COMMAND = TrialCreateCommand(Trial, __name__, summary_fmt="Run an application under a new experiment trial.")
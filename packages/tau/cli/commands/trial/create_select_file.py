@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""``tau trial create-select-file`` subcommand."""
+
+from tau import EXIT_SUCCESS
+from tau.cli import arguments
+from tau.cli.command import AbstractCommand
+from tau.cli.commands.application.edit import COMMAND as application_edit_cmd
+from tau.cli.commands.application.copy import COMMAND as application_copy_cmd
+from tau.cli.commands.select import COMMAND as select_cmd
+from tau.model.project import Project
+from tau.model.application import Application
+
+
+class TrialCreateSelectFileCommand(AbstractCommand):
+    """``tau trial create-select-file`` subcommand."""
+    
+    def _construct_parser(self):
+        usage = "%s [trial_number] [arguments]" % self.command
+        parser = arguments.get_parser(prog=self.command, usage=usage, description=self.summary)
+        parser.add_argument('number', 
+                            help="use this trial's profiles.  Default is the most recent trial",
+                            metavar='<trial_number>',
+                            nargs='?',
+                            default=arguments.SUPPRESS)
+        parser.add_argument('--output', 
+                            help="path to the new selective instrumentation file",
+                            metavar='<path>',
+                            default=None)
+        parser.add_argument('--num-calls', 
+                            help=("exclude functions called more than this many times.  "
+                                  "Default is the measurement's throttle_num_calls"),
+                            metavar='<count>',
+                            type=int,
+                            default=None)
+        parser.add_argument('--per-call', 
+                            help=("exclude functions with fewer microseconds per call than this.  "
+                                  "Default is the measurement's throttle_per_call"),
+                            metavar='<us>',
+                            type=float,
+                            default=None)
+        parser.add_argument('--application', 
+                            help=("use the new file in this application.  If the application doesn't exist "
+                                  "it is created as a copy of the trial's application"),
+                            metavar='<application_name>',
+                            default=None)
+        return parser
+
+    def main(self, argv):
+        args = self._parse_args(argv)
+        number = None
+        if hasattr(args, 'number'):
+            try:
+                number = int(args.number)
+            except ValueError:
+                self.parser.error("Invalid trial number: %s" % args.number)
+        if args.num_calls is not None and args.num_calls < 0:
+            self.parser.error("--num-calls must not be negative")
+        if args.per_call is not None and args.per_call <= 0:
+            self.parser.error("--per-call must be positive")
+        proj_ctrl = Project.controller()
+        proj = proj_ctrl.selected()
+        expr = proj.experiment()
+        path, functions = expr.create_select_file(args.output, number, args.num_calls, args.per_call)
+        self.logger.info("Excluded %d functions from instrumentation in '%s'", len(functions), path)
+        if args.application:
+            app_name = args.application
+            if Application.controller(proj.storage).one({'name': app_name}):
+                retval = application_edit_cmd.main([app_name, '--select-file', path])
+            else:
+                app = expr.populate('application')
+                retval = application_copy_cmd.main([app['name'], app_name, '--select-file', path])
+            if retval != EXIT_SUCCESS:
+                return retval
+            self.logger.info("Use `%s %s` to build with application '%s'", select_cmd, app_name, app_name)
+        return EXIT_SUCCESS
+
+COMMAND = TrialCreateSelectFileCommand(__name__, summary_fmt=("Create a selective instrumentation file "
+                                                              "excluding lightweight functions measured in a trial."))
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""``tau trial overhead`` subcommand."""
+
+import shlex
+from tau.cli import arguments
+from tau.cli.commands.trial.create import TrialCreateCommand
+from tau.model.trial import Trial
+from tau.model.project import Project
+
+
+class TrialOverheadCommand(TrialCreateCommand):
+    """``tau trial overhead`` subcommand."""
+
+    def _construct_parser(self):
+        usage = "%s [arguments] [[--] <command> [command_arguments]]" % self.command
+        parser = arguments.get_parser(prog=self.command, usage=usage, description=self.summary)
+        parser.add_argument('cmd',
+                            help=("run this command with and without TAU to measure overhead.  "
+                                  "If omitted, only estimate the overhead of an existing trial"),
+                            metavar='<command>',
+                            nargs='?',
+                            default=arguments.SUPPRESS)
+        parser.add_argument('cmd_args', 
+                            help="Executable command arguments",
+                            metavar='[command_arguments]',
+                            nargs=arguments.REMAINDER)
+        parser.add_argument('--launcher',
+                            help="Launcher command with arguments, e.g. 'mpirun -np 4'",
+                            metavar='<command>',
+                            nargs=arguments.REMAINDER,
+                            default=arguments.SUPPRESS)
+        parser.add_argument('--uninstrumented',
+                            help=("uninstrumented command with arguments, e.g. './a.out.orig -n 4'.  "
+                                  "Required if the selected experiment instruments the application when "
+                                  "it's built, otherwise the default is <command>"),
+                            metavar='<command>',
+                            default=None)
+        parser.add_argument('--repeat',
+                            help="run the command this many times with and without TAU",
+                            metavar='<count>',
+                            type=int,
+                            default=1)
+        parser.add_argument('--trial',
+                            help="estimate the overhead of this trial.  Default is the most recent trial",
+                            metavar='<trial_number>',
+                            type=int,
+                            default=None)
+        parser.add_argument('--recalibrate',
+                            help="measure the cost of a timer again even if it was measured before",
+                            action='store_true',
+                            default=False)
+        parser.add_argument('--top', 
+                            help="number of functions to show",
+                            metavar='<count>',
+                            type=int,
+                            default=20)
+        parser.add_argument('--json', 
+                            help="write one JSON object",
+                            action='store_true',
+                            default=False)
+        return parser
+
+    def main(self, argv):
+        args = self._parse_args(argv)
+        if args.repeat < 1:
+            self.parser.error("--repeat must be at least 1")
+        if args.top < 1:
+            self.parser.error("--top must be at least 1")
+        launcher_cmd = application_cmd = None
+        if hasattr(args, 'cmd'):
+            if args.trial is not None:
+                self.parser.error("--trial cannot be used with <command>")
+            application_cmd = [args.cmd] + args.cmd_args
+            try:
+                launcher_cmd = args.launcher
+            except AttributeError:
+                launcher_cmd, application_cmd = self._detect_launcher(application_cmd)
+        uninstrumented_cmd = shlex.split(args.uninstrumented) if args.uninstrumented else None
+        proj_ctrl = Project.controller()
+        proj = proj_ctrl.selected()
+        expr = proj.experiment()
+        return expr.measure_overhead(launcher_cmd, application_cmd, uninstrumented_cmd=uninstrumented_cmd, 
+                                     repeat=args.repeat, trial_number=args.trial, recalibrate=args.recalibrate,
+                                     count=args.top, output='json' if args.json else 'text')
+
+
+COMMAND = TrialOverheadCommand(Trial, __name__, summary_fmt="Measure and estimate instrumentation overhead.")
@@ -30,6 +30,8 @@
 from tau.cli import arguments
 from tau.cli.command import AbstractCommand
 from tau.model.project import Project
+from tau.model.experiment import SUMMARY_PROFILE_TOOL, CALLTREE_PROFILE_TOOL
+from tau.cf.profile.summary import SORT_KEYS
 
 class TrialShowCommand(AbstractCommand):
     """``tau trial show`` subcommand."""
@@ -38,9 +40,39 @@ class TrialShowCommand(AbstractCommand):
         usage = "%s [trial_number] [trial_number] ... [arguments]" % self.command
         parser = arguments.get_parser(prog=self.command, usage=usage, description=self.summary)
         parser.add_argument('--profile-tool', 
-                            help="specify reporting or visualization tool for profiles",
+                            help=("specify reporting or visualization tool for profiles.  "
+                                  "'%s' shows the top functions and '%s' shows the call tree "
+                                  "without any external tools" % (SUMMARY_PROFILE_TOOL, CALLTREE_PROFILE_TOOL)),
                             metavar='<profile_tool>',
                             default=arguments.SUPPRESS)
+        parser.add_argument('--top', 
+                            help="number of functions to show with '--profile-tool=%s'" % SUMMARY_PROFILE_TOOL,
+                            metavar='<count>',
+                            type=int,
+                            default=20)
+        parser.add_argument('--sort', 
+                            help="rank functions by this value with '--profile-tool=%s'" % SUMMARY_PROFILE_TOOL,
+                            metavar='<value>',
+                            choices=SORT_KEYS,
+                            default='exclusive')
+        parser.add_argument('--metric', 
+                            help=("show this metric with '--profile-tool=%s'.  May be repeated.  "
+                                  "Default is all metrics, or TIME with '--profile-tool=%s'" % 
+                                  (SUMMARY_PROFILE_TOOL, CALLTREE_PROFILE_TOOL)),
+                            metavar='<metric>',
+                            dest='metrics',
+                            action='append',
+                            default=None)
+        parser.add_argument('--prune', 
+                            help=("hide call tree nodes smaller than this percentage of the total "
+                                  "with '--profile-tool=%s'" % CALLTREE_PROFILE_TOOL),
+                            metavar='<percent>',
+                            type=float,
+                            default=1.0)
+        parser.add_argument('--json', 
+                            help="write one JSON object per metric with '--profile-tool=%s'" % SUMMARY_PROFILE_TOOL,
+                            action='store_true',
+                            default=False)
         parser.add_argument('--trace-tool', 
                             help="specify reporting or visualization tool for traces",
                             metavar='<trace_tool>',
@@ -70,6 +102,14 @@ class TrialShowCommand(AbstractCommand):
                     self.parser.error("Invalid trial number: %s" % num)
         profile_tool = getattr(args, 'profile_tool', None)
         trace_tool = getattr(args, 'trace_tool', None)
-        return expr.show(trial_numbers=numbers, profile_tool=profile_tool, trace_tool=trace_tool)
+        if args.top < 1:
+            self.parser.error("--top must be at least 1")
+        summary_options = {'key': args.sort, 'count': args.top, 'metrics': args.metrics,
+                           'output': 'json' if args.json else 'text'}
+        if args.prune < 0:
+            self.parser.error("--prune must not be negative")
+        calltree_options = {'metric': args.metrics[0] if args.metrics else None, 'threshold': args.prune / 100.0}
+        return expr.show(trial_numbers=numbers, profile_tool=profile_tool, trace_tool=trace_tool, 
+                         summary_options=summary_options, calltree_options=calltree_options)
 
 COMMAND = TrialShowCommand(__name__, summary_fmt="Display trial data in analysis tool.")
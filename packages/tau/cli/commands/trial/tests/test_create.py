@@ -56,6 +56,23 @@ class CreateTest(tests.TestCase):
         self.assertIn('profile files', stdout)
         self.assertFalse(stderr)
         
+    @unittest.skipIf(host.architecture() in (IBM_BGP_ARCH, IBM_BGQ_ARCH), "Test skipped on BlueGene")
+    def test_repeat_sweep(self):
+        self.reset_project_storage()
+        shutil.copyfile(TAU_HOME+'/.testfiles/hello.c', tests.get_test_workdir()+'/hello.c')
+        cc_cmd = self.get_compiler(CC)
+        self.assertCommandReturnValue(0, build_cmd, [cc_cmd, 'hello.c'])
+        argv = ['--repeat', '2', '--concurrency', '2', '--sweep', 'OMP_NUM_THREADS=1,2', './a.out']
+        stdout, stderr = self.assertCommandReturnValue(0, create_cmd, argv)
+        for number in range(4):
+            self.assertIn('Trial %d produced' % number, stdout)
+        self.assertFalse(stderr)
+
+    def test_invalid_sweep(self):
+        self.reset_project_storage(project_name='proj1')
+        _, stderr = self.assertNotCommandReturnValue(0, create_cmd, ['--sweep', 'OMP_NUM_THREADS', './a.out'])
+        self.assertIn('Invalid sweep', stderr)
+
     def test_h_arg(self):
         self.reset_project_storage(project_name='proj1')
         stdout, _ = self.assertCommandReturnValue(0, create_cmd, ['-h'])
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2015, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""Test functions.
+
+Functions used for unit tests of create_select_file.py.
+"""
+#pylint: disable=missing-docstring
+
+import os
+import shutil
+import unittest
+from tau import tests, TAU_HOME
+from tau.cli.commands.build import COMMAND as build_cmd
+from tau.cli.commands.trial.create import COMMAND as create_cmd
+from tau.cli.commands.trial.create_select_file import COMMAND as create_select_file_cmd
+from tau.cf.compiler.host import CC
+from tau.cf.target import IBM_BGP_ARCH, IBM_BGQ_ARCH
+from tau.cf.target import host
+
+class CreateSelectFileTest(tests.TestCase):
+    """Tests for :any:`trial.create_select_file`."""
+
+    @unittest.skipIf(host.architecture() in (IBM_BGP_ARCH, IBM_BGQ_ARCH), "Test skipped on BlueGene")
+    def test_create_select_file(self):
+        self.reset_project_storage(project_name='proj1')
+        shutil.copyfile(TAU_HOME+'/.testfiles/hello.c', tests.get_test_workdir()+'/hello.c')
+        cc_cmd = self.get_compiler(CC)
+        self.assertCommandReturnValue(0, build_cmd, [cc_cmd, 'hello.c'])
+        self.assertCommandReturnValue(0, create_cmd, ['./a.out'])
+        path = os.path.join(tests.get_test_workdir(), 'select.tau')
+        stdout, stderr = self.assertCommandReturnValue(0, create_select_file_cmd, ['0', '--output', path])
+        self.assertIn('Excluded', stdout)
+        self.assertFalse(stderr)
+        self.assertTrue(os.path.isfile(path))
+
+    def test_invalid_number(self):
+        self.reset_project_storage(project_name='proj1')
+        _, stderr = self.assertNotCommandReturnValue(0, create_select_file_cmd, ['first'])
+        self.assertIn('Invalid trial number', stderr)
+
+    def test_invalid_per_call(self):
+        self.reset_project_storage(project_name='proj1')
+        _, stderr = self.assertNotCommandReturnValue(0, create_select_file_cmd, ['--per-call', '0'])
+        self.assertIn('--per-call must be positive', stderr)
+
+    def test_h_arg(self):
+        self.reset_project_storage(project_name='proj1')
+        stdout, _ = self.assertCommandReturnValue(0, create_select_file_cmd, ['-h'])
+        self.assertIn('Show this help message and exit', stdout)
+
+    def test_help_arg(self):
+        self.reset_project_storage(project_name='proj1')
+        stdout, _ = self.assertCommandReturnValue(0, create_select_file_cmd, ['--help'])
+        self.assertIn('Show this help message and exit', stdout)
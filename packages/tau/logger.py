@@ -35,6 +35,8 @@ TAU Commander has two channels for communicating with the user:
 
 TAU Commander also logs all status messages at the highest reporting level to
 a rotating debug file in the user's TAU Commander project prefix, typically "~/.tau".
+If the TAU_ASYNC_LOG environment variable is set then debug log records are 
+formatted and written on a background thread, see :any:`AsyncHandler`.
 """
 
 import os
@@ -45,7 +47,10 @@ import socket
 import platform
 import string
 import logging
+import threading
+import collections
 from logging import handlers
+from contextlib import contextmanager
 from datetime import datetime
 from termcolor import termcolor
 from tau import USER_PREFIX
@@ -287,21 +292,113 @@ class LogFormatter(logging.Formatter, object):
         parts.extend(self._textwrap([hline]))
         return '\n'.join(parts)
 
+    def _fill(self, line):
+        # Most lines are short and need no wrapping or whitespace replacement
+        if len(line) <= self.line_width and not any(char in line for char in '\t\v\f\r'):
+            return self.line_marker + line
+        return self._text_wrapper.fill(line)
+
     def _textwrap_message(self, record):
         for line in record.getMessage().split('\n'):
             if line and (not self.printable_only or set(line).issubset(self.PRINTABLE_CHARS)):
-                yield self._text_wrapper.fill(line)
+                yield self._fill(line)
             else:
                 yield self.line_marker
 
     def _textwrap(self, lines):
         for line in lines:
             if line:
-                yield self._text_wrapper.fill(line)
+                yield self._fill(line)
             else:
                 yield self.line_marker
 
 
+class AsyncHandler(logging.Handler, object):
+    """Passes log records to another handler on a background thread.
+    
+    Records are buffered by the thread that emits them and formatted and written in batches
+    by the background thread, so slow formatting and file I/O don't delay the caller.  At most 
+    `capacity` records are buffered; if the buffer fills then the emitting thread writes the 
+    buffered records itself so memory use is bounded.  Buffered records are written at least
+    every `interval` seconds and when the handler is flushed or closed, which 
+    :any:`logging.shutdown` does at exit.
+    
+    Args:
+        target (logging.Handler): Handler that formats and writes records.
+        capacity (int): Maximum number of buffered records.
+        interval (float): Maximum seconds between writes.
+    """
+    
+    def __init__(self, target, capacity=10000, interval=0.1):
+        super(AsyncHandler, self).__init__(target.level)
+        self.target = target
+        self.capacity = capacity
+        self.interval = interval
+        self._batch_size = max(1, capacity // 10)
+        # deque.append and deque.popleft are atomic so emitting a record takes no locks
+        self._buffer = collections.deque()
+        self._drain_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _drain(self):
+        with self._drain_lock:
+            while True:
+                try:
+                    record = self._buffer.popleft()
+                except IndexError:
+                    break
+                self.target.handle(record)
+            self.target.flush()
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            self._drain()
+
+    def handle(self, record):
+        # emit() doesn't need the handler's lock
+        rv = self.filter(record)
+        if rv:
+            self.emit(record)
+        return rv
+
+    def emit(self, record):
+        try:
+            # Format the message now since arguments may change before the record is written
+            record.msg = record.getMessage()
+            record.args = None
+            if record.exc_info:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+                record.exc_info = None
+        except Exception:       # pylint: disable=broad-except
+            self.handleError(record)
+            return
+        self._buffer.append(record)
+        size = len(self._buffer)
+        if size >= self.capacity or self._closed:
+            self._drain()
+        elif size % self._batch_size == 0:
+            self._wakeup.set()
+
+    def flush(self):
+        """Writes all buffered records."""
+        self._drain()
+
+    def close(self):
+        """Writes all buffered records and stops the background thread."""
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join()
+        self._drain()
+        self.target.close()
+        super(AsyncHandler, self).close()
+
+
 def get_logger(name):
     """Returns a customized logging object.
     
@@ -333,8 +430,8 @@ def set_log_level(level):
 
 def activate_debug_log():
     """Adds an addtional logging handler to record all messages to :any:`LOG_FILE`."""
-    if _FILE_HANDLER not in _ROOT_LOGGER.handlers:
-        _ROOT_LOGGER.addHandler(_FILE_HANDLER)
+    if _DEBUG_LOG_HANDLER not in _ROOT_LOGGER.handlers:
+        _ROOT_LOGGER.addHandler(_DEBUG_LOG_HANDLER)
         # pylint: disable=logging-not-lazy
         _ROOT_LOGGER.debug("""
 %(bar)s
@@ -358,6 +455,47 @@ Frozen            : %(frozen)s
        'frozen': getattr(sys, 'frozen', False)})
 
 
+class _ThreadFilter(logging.Filter, object):
+    """Accepts only log records emitted by a single thread."""
+    
+    def __init__(self, ident):
+        super(_ThreadFilter, self).__init__()
+        self.ident = ident
+    
+    def filter(self, record):
+        return record.thread == self.ident
+
+
+@contextmanager
+def thread_log_file(path):
+    """Also record all messages emitted by the calling thread to `path`.
+    
+    Messages are still sent to every other handler, e.g. :any:`LOG_FILE`.  This keeps
+    the output of concurrent activities, e.g. software package builds, separated.
+    
+    Args:
+        path (str): Path to the log file.  The file is overwritten if it exists.
+    """
+    prefix = os.path.dirname(path)
+    try:
+        os.makedirs(prefix)
+    except OSError as exc:
+        if not (exc.errno == errno.EEXIST and os.path.isdir(prefix)):
+            raise
+    handler = logging.FileHandler(path, mode='w')
+    handler.setFormatter(LogFormatter(line_width=120, line_marker=LINE_MARKER, allow_colors=False))
+    handler.setLevel(logging.DEBUG)
+    if ASYNC_LOG:
+        handler = AsyncHandler(handler)
+    handler.addFilter(_ThreadFilter(threading.current_thread().ident))
+    _ROOT_LOGGER.addHandler(handler)
+    try:
+        yield
+    finally:
+        _ROOT_LOGGER.removeHandler(handler)
+        handler.close()
+
+
 LOG_LEVEL = 'INFO'
 """str: The global logging level for stdout loggers and software packages.
 
@@ -370,6 +508,9 @@ LOG_FILE = os.path.join(USER_PREFIX, 'debug_log')
 LINE_MARKER = os.environ.get('TAU_LINE_MARKER', '[TAU] ')
 """str: Marker for each line of output."""
 
+ASYNC_LOG = bool(os.environ.get('TAU_ASYNC_LOG'))
+"""bool: If True, format and write debug log records on a background thread."""
+
 TERM_SIZE = get_terminal_size()
 """tuple: (width, height) tuple of detected terminal dimensions in characters."""
 
@@ -394,6 +535,7 @@ if not len(_ROOT_LOGGER.handlers):
     _FILE_HANDLER = handlers.TimedRotatingFileHandler(LOG_FILE, when='D', interval=1, backupCount=3)
     _FILE_HANDLER.setFormatter(LogFormatter(line_width=120, line_marker=LINE_MARKER, allow_colors=False))
     _FILE_HANDLER.setLevel(logging.DEBUG)
+    _DEBUG_LOG_HANDLER = AsyncHandler(_FILE_HANDLER) if ASYNC_LOG else _FILE_HANDLER
     
     _STDOUT_HANDLER = logging.StreamHandler(sys.stdout)
     _STDOUT_HANDLER.setFormatter(LogFormatter(line_width=LINE_WIDTH, line_marker=LINE_MARKER, printable_only=True))
@@ -33,18 +33,26 @@ The selected experiment will be used for application compilation and trial visua
 """
 
 import os
-import fasteners
+import sys
+import json
 from tau import logger, util
 from tau.error import ConfigurationError, InternalError, IncompatibleRecordError
 from tau.mvc.model import Model
 from tau.model.trial import Trial
 from tau.model.project import Project
-from tau.cf.storage.levels import PROJECT_STORAGE, highest_writable_storage
+from tau.cf.storage.levels import PROJECT_STORAGE
+from tau.cf.profile import summary, imbalance, compare, callpath, select_file, overhead
 
 
 LOGGER = logger.get_logger(__name__)
 
-PROFILE_EXPORT_FORMATS = ['ppk', 'zip', 'tar', 'tgz', 'tar.bz2']
+PROFILE_EXPORT_FORMATS = ['ppk', 'zip', 'tar', 'tgz', 'tar.bz2', 'collapsed']
+
+SUMMARY_PROFILE_TOOL = 'summary'
+"""str: Name of the profile tool built into TAU Commander, see :any:`Experiment.show`."""
+
+CALLTREE_PROFILE_TOOL = 'calltree'
+"""str: Name of the call tree viewer built into TAU Commander, see :any:`Experiment.show`."""
 
 
 def attributes():
@@ -92,6 +100,12 @@ def attributes():
     }
 
 
+def _substitute_parameters(args, parameters):
+    for name, value in parameters.iteritems():
+        args = [arg.replace('{%s}' % name, value) for arg in args]
+    return args
+
+
 class Experiment(Model):
     """Experiment data model."""
     
@@ -190,13 +204,26 @@ class Experiment(Model):
         return sum([int(trial.get('data_size', 0)) for trial in self.populate('trials')])
 
     def next_trial_number(self):
-        trials = self.populate('trials')
-        for i, j in enumerate(sorted([trial['number'] for trial in trials])):
-            if i != j:
-                return i
-        return len(trials)
+        return self.next_trial_numbers(1)[0]
+
+    def next_trial_numbers(self, count):
+        """Finds the lowest unused trial numbers.
+        
+        Args:
+            count (int): Number of trial numbers to find.
+            
+        Returns:
+            list: `count` unused trial numbers in ascending order.
+        """
+        used = set(trial['number'] for trial in self.populate('trials'))
+        numbers = []
+        candidate = 0
+        while len(numbers) < count:
+            if candidate not in used:
+                numbers.append(candidate)
+            candidate += 1
+        return numbers
     
-    @fasteners.interprocess_locked(os.path.join(highest_writable_storage().prefix, '.lock'))
     def configure(self):
         """Sets up the Experiment for a new trial.
         
@@ -206,13 +233,30 @@ class Experiment(Model):
         Returns:
             TauInstallation: Object handle for the TAU installation. 
         """
-        from tau.cf.target import Architecture, OperatingSystem
-        from tau.cf.software.tau_installation import TauInstallation
         LOGGER.debug("Configuring experiment %s", self['name'])
         populated = self.populate(defaults=True)
-        target = populated['target']
-        application = populated['application']
-        measurement = populated['measurement']
+        tau = self.tau_installation(populated['target'], populated['application'], populated['measurement'])
+        tau.install()
+        self.controller(self.storage).update({'tau_makefile': os.path.basename(tau.get_makefile())}, self.eid)
+        return tau
+
+    @staticmethod
+    def tau_installation(target, application, measurement):
+        """Describes the TAU configuration required by a target, application, and measurement.
+        
+        Nothing is installed.  Use :any:`configure` to install TAU for an experiment or 
+        :any:`install_configurations` to install many configurations at once.
+        
+        Args:
+            target (Target): Target record.
+            application (Application): Application record.
+            measurement (Measurement): Measurement record.
+        
+        Returns:
+            TauInstallation: Object handle for the TAU installation. 
+        """
+        from tau.cf.target import Architecture, OperatingSystem
+        from tau.cf.software.tau_installation import TauInstallation
         sources = {'tau': target.get('tau_source', None),
                    'binutils': target.get('binutils_source', None),
                    'libunwind': target.get('libunwind_source', None),
@@ -266,8 +310,6 @@ class Experiment(Model):
                     throttle_per_call=measurement.get_or_default('throttle_per_call'),
                     throttle_num_calls=measurement.get_or_default('throttle_num_calls'),
                     forced_makefile=target.get('forced_makefile', None))
-        tau.install()
-        self.controller(self.storage).update({'tau_makefile': os.path.basename(tau.get_makefile())}, self.eid)
         return tau
 
     def managed_build(self, compiler_cmd, compiler_args):
@@ -310,28 +352,45 @@ class Experiment(Model):
                         proj['name'], ' '.join(tau.force_tau_options))
         return tau.compile(installed_compiler, compiler_args)
         
-    def managed_run(self, launcher_cmd, application_cmd):
+    def managed_run(self, launcher_cmd, application_cmd, sweep=None, repeat=1, concurrency=1):
         """Uses this experiment to run an application command.
         
         Performs all relevent system preparation tasks to run the user's application
         under the specified experimental configuration.
         
+        If `sweep`, `repeat`, or `concurrency` are given then one trial is performed for each repetition 
+        of each parameter set in `sweep`.  Parameters are set as environment variables and occurrences of 
+        ``{NAME}`` in the command line are replaced by the value of parameter ``NAME``.
+        See :any:`TrialController.perform_batch`.
+        
         Args:
             launcher_cmd (list): Application launcher with command line arguments.
             application_cmd (list): Application executable with command line arguments.
+            sweep (list): Dictionaries of parameter values, one per parameter set.
+            repeat (int): Number of trials to perform for each parameter set.
+            concurrency (int): Maximum number of trials to perform at the same time.
 
         Raises:
             ConfigurationError: The experiment is not configured to perform the desired run.
             
         Returns:
-            int: Application subprocess return code.
+            int: Application subprocess return code, or the first nonzero return code of all trials.
         """
         command = util.which(application_cmd[0])
         if not command:
             raise ConfigurationError("Cannot find executable: %s" % application_cmd[0])
         tau = self.configure()
-        cmd, env = tau.get_application_command(launcher_cmd, application_cmd)
-        return Trial.controller(self.storage).perform(self, cmd, os.getcwd(), env)
+        if not sweep and repeat == 1 and concurrency == 1:
+            cmd, env = tau.get_application_command(launcher_cmd, application_cmd)
+            return Trial.controller(self.storage).perform(self, cmd, os.getcwd(), env)
+        runs = []
+        for parameters in sweep or [{}]:
+            cmd, env = tau.get_application_command(_substitute_parameters(launcher_cmd, parameters), 
+                                                   _substitute_parameters(application_cmd, parameters))
+            env = dict(env, **parameters)
+            runs.extend([(cmd, env, parameters)] * repeat)
+        retvals = Trial.controller(self.storage).perform_batch(self, runs, os.getcwd(), concurrency)
+        return next((retval for retval in retvals if retval), 0)
 
     def _get_trials(self, trial_numbers=None):
         """Returns trial data for the given trial numbers.  
@@ -370,32 +429,238 @@ class Experiment(Model):
                 raise ConfigurationError("Trial %s is empty." %trial['number'])
         return trials
     
-    def show(self, profile_tool=None, trace_tool=None, trial_numbers=None):
+    def show(self, profile_tool=None, trace_tool=None, trial_numbers=None, summary_options=None, 
+             calltree_options=None):
         """Show experiment trial data.
         
-        Shows the most recent trial or all trials with given numbers.
+        Shows the most recent trial or all trials with given numbers.  If `profile_tool` is 
+        :any:`SUMMARY_PROFILE_TOOL` then profiles are summarized by TAU Commander without 
+        using any external tools, see :any:`tau.cf.profile.summary.write_report`.  Likewise, if
+        `profile_tool` is :any:`CALLTREE_PROFILE_TOOL` then the call tree is shown, see 
+        :any:`tau.cf.profile.callpath.write_tree`.
         
         Args:
             profile_tool (str): Name of the visualization or data processing tool for profiles, e.g. `pprof`.
             trace_tool (str): Name of the visualization or data processing tool for traces, e.g. `vampir`.
             trial_numbers (list): Numbers of trials to show.
+            summary_options (dict): Keyword arguments for :any:`tau.cf.profile.summary.write_report`.
+            calltree_options (dict): Keyword arguments for :any:`tau.cf.profile.callpath.write_tree`.
             
         Raises:
             ConfigurationError: Invalid trial numbers or no trial data for this experiment.
         """
-        tau = self.configure()
         meas = self.populate('measurement')
+        builtin = meas['profile'] != 'none' and profile_tool in (SUMMARY_PROFILE_TOOL, CALLTREE_PROFILE_TOOL)
+        tau = None
+        if not builtin or meas['trace'] != 'none':
+            tau = self.configure()
         for trial in self._get_trials(trial_numbers):
             prefix = trial.prefix
-            if meas['profile'] != 'none':
+            if profile_tool == SUMMARY_PROFILE_TOOL and builtin:
+                summary.write_report(trial.load_profile(), sys.stdout, header={'trial': trial['number']}, 
+                                     **(summary_options or {}))
+            elif profile_tool == CALLTREE_PROFILE_TOOL and builtin:
+                callpath.write_tree(trial.load_profile(), sys.stdout, header={'trial': trial['number']}, 
+                                    **(calltree_options or {}))
+            elif meas['profile'] != 'none':
                 tau.show_profile(prefix, profile_tool)
             if meas['trace'] != 'none':
                 tau.show_trace(prefix, trace_tool)
-                
+
+    def analyze_imbalance(self, trial_numbers=None, **options):
+        """Show load imbalance of each function in experiment trials.
+        
+        Analyzes the most recent trial or all trials with given numbers.  Results are saved in the trial
+        directory and reused until the trial's profile files change, see :any:`tau.cf.profile.imbalance`.
+        
+        Args:
+            trial_numbers (list): Numbers of trials to analyze.
+            options: Keyword arguments for :any:`tau.cf.profile.imbalance.write_report`.
+            
+        Raises:
+            ConfigurationError: Invalid trial numbers, no trial data for this experiment, or no profiles.
+        """
+        meas = self.populate('measurement')
+        if meas['profile'] == 'none':
+            raise ConfigurationError("Measurement '%s' does not record profiles" % meas['name'],
+                                     "Load imbalance analysis requires profile data.")
+        for trial in self._get_trials(trial_numbers):
+            imbalance.write_report(trial.load_profile(), sys.stdout, header={'trial': trial['number']}, 
+                                   prefix=trial.prefix, **options)
+
+    def compare_trials(self, trial_groups, **options):
+        """Compare profile data of groups of experiment trials.
+        
+        Each group of trials is compared to the first group, see :any:`tau.cf.profile.compare`.
+        
+        Args:
+            trial_groups (list): Lists of trial numbers, one per group.  The first group is the baseline.
+            options: Keyword arguments for :any:`tau.cf.profile.compare.write_report`.
+            
+        Returns:
+            int: Number of regressed functions.
+            
+        Raises:
+            ConfigurationError: Invalid trial numbers, no trial data for this experiment, or no profiles.
+        """
+        meas = self.populate('measurement')
+        if meas['profile'] == 'none':
+            raise ConfigurationError("Measurement '%s' does not record profiles" % meas['name'],
+                                     "Trial comparison requires profile data.")
+        groups = [[(trial['number'], trial.load_profile) for trial in self._get_trials(numbers)] 
+                  for numbers in trial_groups]
+        return compare.write_report(groups[0], groups[1:], sys.stdout, **options)
+
+    def create_select_file(self, path=None, trial_number=None, num_calls=None, per_call=None):
+        """Create a selective instrumentation file excluding functions TAU would throttle.
+        
+        Applies the runtime throttling test to the profile data of the most recent trial or a trial
+        with the given number, see :any:`tau.cf.profile.select_file`.
+        
+        Args:
+            path (str): Path to the new file.  Default is ``<experiment>.trial<number>.select`` in 
+                        the current working directory.
+            trial_number (int): Number of the trial to use.
+            num_calls (int): Minimum number of calls.  Default is the measurement's `throttle_num_calls`.
+            per_call (float): Maximum microseconds per call.  Default is the measurement's `throttle_per_call`.
+            
+        Returns:
+            tuple: (path, functions) where `path` is the absolute path to the file and `functions` 
+                   lists the excluded functions as returned by :any:`throttled_functions`.
+            
+        Raises:
+            ConfigurationError: Invalid trial number, no trial data for this experiment, or no profiles.
+        """
+        meas = self.populate('measurement')
+        if meas['profile'] == 'none':
+            raise ConfigurationError("Measurement '%s' does not record profiles" % meas['name'],
+                                     "Selective instrumentation files are created from profile data.")
+        if num_calls is None:
+            num_calls = meas.get_or_default('throttle_num_calls')
+        if per_call is None:
+            per_call = meas.get_or_default('throttle_per_call')
+        trial = self._get_trials(None if trial_number is None else [trial_number])[0]
+        if not path:
+            path = self['name'] + '.trial' + str(trial['number']) + '.select'
+        path = os.path.abspath(path)
+        functions = select_file.throttled_functions(trial.load_profile(), num_calls, per_call)
+        comment = ("Created by TAU Commander from trial %s of experiment '%s'.\n"
+                   "Excludes functions called more than %d times in a thread with less than %s microseconds "
+                   "per call." % (trial['number'], self['name'], num_calls, per_call))
+        with open(path, 'w') as fout:
+            select_file.write(fout, functions, comment)
+        return path, functions
+
+    def timer_overhead(self, recalibrate=False):
+        """Gets the cost of starting and stopping a timer in this experiment, measuring it if necessary.
+        
+        The cost is saved in the experiment directory and measured again if the TAU configuration changes,
+        see :any:`TauInstallation.measure_timer_overhead`.
+        
+        Args:
+            recalibrate (bool): If True, always measure the cost.
+            
+        Returns:
+            float: Microseconds per timer start and stop.
+        """
+        tau = self.configure()
+        prefix = os.path.join(self.prefix, 'overhead')
+        path = os.path.join(prefix, 'calibration.json')
+        _, env = tau.runtime_config()
+        config = [tau.get_makefile()] + sorted('%s=%s' % item for item in env.iteritems() if item[0].startswith('TAU_'))
+        if not recalibrate:
+            try:
+                with open(path) as fin:
+                    saved = json.load(fin)
+            except (IOError, ValueError):
+                pass
+            else:
+                if saved.get('configuration') == config:
+                    return saved['per_call']
+        per_call = tau.measure_timer_overhead(prefix)
+        with open(path, 'w') as fout:
+            json.dump({'configuration': config, 'per_call': per_call}, fout)
+        return per_call
+
+    def measure_overhead(self, launcher_cmd=None, application_cmd=None, uninstrumented_cmd=None, repeat=1, 
+                         trial_number=None, recalibrate=False, **options):
+        """Measure and estimate instrumentation overhead.
+        
+        If `application_cmd` is given then the application is run `repeat` times without TAU and `repeat` 
+        times as new trials of this experiment.  The shortest wall clock time of each is reported as the 
+        measured overhead.  Otherwise the most recent trial or the trial with the given number is used and 
+        only the estimated overhead is reported, see :any:`tau.cf.profile.overhead`.  The uninstrumented
+        runs use an environment without TAU environment variables.
+        
+        Args:
+            launcher_cmd (list): Application launcher with command line arguments.
+            application_cmd (list): Application executable with command line arguments.
+            uninstrumented_cmd (list): Uninstrumented application executable with command line arguments.
+                                       Required if this experiment instruments the application when it 
+                                       is built, otherwise the default is `application_cmd`.
+            repeat (int): Number of times to run the application with and without TAU.
+            trial_number (int): Number of the trial to use if `application_cmd` is not given.
+            recalibrate (bool): If True, always measure the cost of a timer, see :any:`timer_overhead`.
+            options: Keyword arguments for :any:`tau.cf.profile.overhead.write_report`.
+            
+        Returns:
+            int: Application subprocess return code.
+            
+        Raises:
+            ConfigurationError: The application failed, invalid trial number, no profile data, or 
+                                `uninstrumented_cmd` is required but not given.
+        """
+        from tau.cf.software.tau_installation import TauInstallation
+        meas = self.populate('measurement')
+        if meas['profile'] == 'none':
+            raise ConfigurationError("Measurement '%s' does not record profiles" % meas['name'],
+                                     "Overhead is estimated from profile data.")
+        if application_cmd and not uninstrumented_cmd and meas.instruments_at_build():
+            raise ConfigurationError("Measurement '%s' instruments the application when it is built so '%s' "
+                                     "can't be run without TAU" % (meas['name'], ' '.join(application_cmd)),
+                                     "Build the application without TAU and specify the uninstrumented "
+                                     "command with --uninstrumented.")
+        launcher_cmd = launcher_cmd or []
+        per_call = self.timer_overhead(recalibrate)
+        measured = None
+        retval = 0
+        if application_cmd:
+            cmd = launcher_cmd + (uninstrumented_cmd or application_cmd)
+            # Unset TAU environment variables so they don't affect the uninstrumented application
+            clean_env = TauInstallation._sanitize_environment(os.environ)   # pylint: disable=protected-access
+            env = dict((key, None) for key in os.environ if key not in clean_env)
+            walls = []
+            for _ in xrange(repeat):
+                timing = {}
+                LOGGER.info("Running uninstrumented application: %s", ' '.join(cmd))
+                retval = util.create_subprocess(cmd, env=env, timing=timing)
+                if retval:
+                    raise ConfigurationError("Return code %d from uninstrumented application '%s'" % 
+                                             (retval, ' '.join(cmd)))
+                walls.append(timing['wall'])
+            trial_ctrl = Trial.controller(self.storage)
+            existing = set(trial['number'] for trial in trial_ctrl.search({'experiment': self.eid}))
+            retval = self.managed_run(launcher_cmd, application_cmd, repeat=repeat)
+            trials = [trial for trial in trial_ctrl.search({'experiment': self.eid}) 
+                      if trial['number'] not in existing]
+            if not trials:
+                raise ConfigurationError("No new trials in experiment %s" % self['name'])
+            measured = {'uninstrumented': min(walls), 
+                        'instrumented': min(trial.get('wall_time', 0.0) for trial in trials)}
+            trial = max(trials, key=lambda trial: trial['number'])
+        else:
+            trial = self._get_trials(None if trial_number is None else [trial_number])[0]
+        overhead.write_report(trial.load_profile(), sys.stdout, per_call, measured=measured, 
+                              header={'trial': trial['number']},
+                              num_calls=meas.get_or_default('throttle_num_calls'),
+                              throttle_per_call=meas.get_or_default('throttle_per_call'), **options)
+        return retval
+
     def export(self, profile_format=None, trial_numbers=None, export_location=None):
         """Export experiment trial data.
         
-        Exports the most recent trial or all trials with given numbers.
+        Exports the most recent trial or all trials with given numbers.  The 'collapsed' format is the 
+        trial's call tree in collapsed stack format for flame graph tools, see :any:`tau.cf.profile.callpath`.
         
         Args:
             profile_format (str): File format for exported profiles, see :any:`PROFILE_EXPORT_FORMATS` 
@@ -405,7 +670,6 @@ class Experiment(Model):
         Raises:
             ConfigurationError: Invalid trial numbers or no trial data for this experiment.
         """
-        tau = self.configure()
         if profile_format is None:
             meas = self.populate('measurement')
             if meas['trace'] == 'none':
@@ -415,6 +679,13 @@ class Experiment(Model):
         assert profile_format in PROFILE_EXPORT_FORMATS
         if not export_location:
             export_location = os.getcwd()
+        if profile_format == 'collapsed':
+            for trial in self._get_trials(trial_numbers):
+                collapsed_file = self['name'] + '.trial' + str(trial['number']) + '.collapsed'
+                with open(os.path.join(export_location, collapsed_file), 'w') as fout:
+                    callpath.build(trial.load_profile()).write_collapsed(fout)
+            return
+        tau = self.configure()
         if profile_format == 'ppk':
             for trial in self._get_trials(trial_numbers):
                 ppk_file = self['name'] + '.trial' + str(trial['number']) + '.ppk'
@@ -414,6 +414,11 @@ class Measurement(Model):
                                          "in experiment '%s':\n    %s." % (self['name'], expr['name'], err),
                                          "Delete experiment '%s' and try again." % expr['name'])
 
+    def instruments_at_build(self):
+        """Returns True if applications are instrumented or linked with TAU when they are built, False otherwise."""
+        return (self['source_inst'].lower() != 'never' or self['compiler_inst'].lower() != 'never' or 
+                bool(self['link_only']))
+
     def is_selected(self):
         """Returns True if this target configuration is part of the selected experiment, False otherwise."""
         from tau.model.project import Project, ProjectSelectionError, ExperimentSelectionError
@@ -35,7 +35,7 @@ some performance data (profiles, traces, etc.).
 
 import os
 from tau import logger
-from tau.error import InternalError, ConfigurationError
+from tau.error import InternalError, ConfigurationError, IncompatibleRecordError
 from tau.mvc.model import Model
 from tau.mvc.controller import Controller
 from tau.cf.storage.levels import PROJECT_STORAGE
@@ -185,6 +185,41 @@ class Project(Model):
                     changed[attr] = (old_value, new_value)
         return changed
     
+    def tau_installations(self):
+        """Describes every TAU configuration this project's experiments may require.
+        
+        Nothing is installed.  There is one configuration for each mutually compatible 
+        combination of the project's targets, applications, and measurements.
+        
+        Returns:
+            list: :any:`TauInstallation` objects.
+        """
+        from tau.model.experiment import Experiment
+        populated = self.populate()
+        installations = []
+        for targ in populated['targets']:
+            for app in populated['applications']:
+                for meas in populated['measurements']:
+                    try:
+                        for lhs in [targ, app, meas]:
+                            for rhs in [targ, app, meas]:
+                                lhs.check_compatibility(rhs)
+                    except IncompatibleRecordError as err:
+                        LOGGER.debug(err)
+                        continue
+                    installations.append(Experiment.tau_installation(targ, app, meas))
+        return installations
+
+    def configure(self):
+        """Installs every TAU configuration this project's experiments may require.
+        
+        Builds the configurations from :any:`tau_installations` concurrently.  Afterwards,
+        :any:`Experiment.configure` only needs to verify the installation.
+        """
+        from tau.cf.software.tau_installation import install_configurations
+        LOGGER.debug("Configuring project %s", self['name'])
+        install_configurations(self.tau_installations())
+
     @classmethod
     def on_experiment_change(cls, model, attr, new_value):
         from tau.model.experiment import Experiment
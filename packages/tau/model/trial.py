@@ -35,16 +35,27 @@ the performance data.
 import os
 import glob
 import errno
+import fasteners
 from datetime import datetime
-from tau import logger, util
+from tau import logger, util, configuration
+from tau.cf import scheduler
+from tau.cf.profile import cache as profile_cache
+from tau.cf.trace import merge as trace_merge
 from tau.cf.target import IBM_BGQ_ARCH, IBM_BGP_ARCH
-from tau.error import ConfigurationError, InternalError
+from tau.error import ConfigurationError
 from tau.mvc.controller import Controller
 from tau.mvc.model import Model
 
 
 LOGGER = logger.get_logger(__name__)
 
+OUTPUT_FILES = {'stdout': 'stdout.txt', 'stderr': 'stderr.txt'}
+"""dict: Names of the files in the trial directory that record the application's output.
+
+Output is only recorded if the ``trial.record_output`` configuration item is true or
+the output is not sent to the terminal, see :any:`Trial.execute_command`.
+"""
+
 def attributes():
     from tau.model.experiment import Experiment
     return {
@@ -89,10 +100,78 @@ def attributes():
         'data_size': {
             'type': 'integer',
             'description': "the size in bytes of the trial data"
+        },
+        'wall_time': {
+            'type': 'float',
+            'description': "wall clock time in seconds of the command executed when performing the trial"
+        },
+        'user_time': {
+            'type': 'float',
+            'description': "user CPU time in seconds used by the command executed when performing the trial"
+        },
+        'system_time': {
+            'type': 'float',
+            'description': "system CPU time in seconds used by the command executed when performing the trial"
+        },
+        'max_rss': {
+            'type': 'integer',
+            'description': "largest resident set size in bytes of any process started by the trial"
+        },
+        'minor_page_faults': {
+            'type': 'integer',
+            'description': "page faults serviced without I/O while performing the trial"
+        },
+        'major_page_faults': {
+            'type': 'integer',
+            'description': "page faults that required I/O while performing the trial"
+        },
+        'voluntary_context_switches': {
+            'type': 'integer',
+            'description': "context switches due to processes waiting for a resource while performing the trial"
+        },
+        'involuntary_context_switches': {
+            'type': 'integer',
+            'description': "context switches due to processes being preempted while performing the trial"
+        },
+        'peak_memory': {
+            'type': 'integer',
+            'description': "largest sampled total resident set size in bytes of all processes started by the trial"
+        },
+        'peak_processes': {
+            'type': 'integer',
+            'description': "largest sampled number of processes started by the trial"
         }
     }
 
 
+def _sample_interval():
+    try:
+        interval = float(configuration.get('trial.sample_interval'))
+    except KeyError:
+        return None
+    except ValueError:
+        LOGGER.warning("Ignoring invalid trial.sample_interval value '%s'", configuration.get('trial.sample_interval'))
+        return None
+    return interval if interval > 0 else None
+
+
+def _record_output():
+    try:
+        value = configuration.get('trial.record_output')
+    except KeyError:
+        return False
+    try:
+        return util.parse_bool(value)
+    except (TypeError, ValueError):
+        LOGGER.warning("Ignoring invalid trial.record_output value '%s'", value)
+        return False
+
+
+def _banner(mark, name, time):
+    headline = '\n{:=<{}}\n'.format('== %s %s at %s ==' % (mark, name, time), logger.LINE_WIDTH)
+    LOGGER.info(headline)
+
+
 class TrialError(ConfigurationError):
     """Indicates there was an error while performing an experiment trial."""
     message_fmt = ("%(value)s\n"
@@ -103,6 +182,32 @@ class TrialError(ConfigurationError):
                    " send '%(logfile)s' to  %(contact)s for assistance.")
 
 
+def _execute_command(cmd, cwd, env, prefix, host_arch, resources, stdout, sample_interval, record_output):
+    """Runs a trial command without accessing any storage so it's safe to call from any thread.
+    
+    See :any:`Trial.execute_command`.
+    """
+    cmd_str = ' '.join(cmd)
+    tau_env_opts = sorted('%s=%s' % item for item in env.iteritems() if item[0].startswith('TAU_'))
+    LOGGER.info('\n'.join(tau_env_opts))
+    LOGGER.info(cmd_str)
+    try:
+        if record_output:
+            tee = dict((stream, os.path.join(prefix, name)) for stream, name in OUTPUT_FILES.iteritems())
+        else:
+            tee = None
+        retval = util.create_subprocess(cmd, cwd=cwd, env=env, stdout=stdout, tee=tee, 
+                                        resources=resources, sample_interval=sample_interval)
+    except OSError as err:
+        errno_hint = {errno.EPERM: "Check filesystem permissions",
+                      errno.ENOENT: "Check paths and command line arguments",
+                      errno.ENOEXEC: "Check that this host supports '%s'" % host_arch}
+        raise TrialError("Couldn't execute %s: %s" % (cmd_str, err), errno_hint.get(err.errno, None))
+    if retval:
+        LOGGER.warning("Return code %d from '%s'", retval, cmd_str)
+    return retval
+
+
 class TrialController(Controller):
     """Trial data controller."""
 
@@ -134,25 +239,28 @@ class TrialController(Controller):
         return retval
 
     def _perform_interactive(self, expr, trial, cmd, cwd, env):
-        def banner(mark, name, time):
-            headline = '\n{:=<{}}\n'.format('== %s %s at %s ==' % (mark, name, time), logger.LINE_WIDTH)
-            LOGGER.info(headline)
-
-        banner('BEGIN', expr.name, trial['begin_time'])
+        _banner('BEGIN', expr.name, trial['begin_time'])
+        resources = {}
         try:
-            retval = trial.execute_command(expr, cmd, cwd, env)
+            retval = trial.execute_command(expr, cmd, cwd, env, resources=resources)
         except:
             self.delete(trial.eid)
             raise
         else:
             end_time = str(datetime.utcnow())
-            self.update({'end_time': end_time, 'return_code': retval}, trial.eid)
+            resources.update({'end_time': end_time, 'return_code': retval})
+            self.update(resources, trial.eid)
         finally:
             end_time = str(datetime.utcnow())
-            banner('END', expr.name, end_time)
+            _banner('END', expr.name, end_time)
 
-        data_size = sum(os.path.getsize(os.path.join(trial.prefix, f)) for f in os.listdir(trial.prefix))
+        data_size = trial.data_size()
         self.update({'data_size': data_size}, trial.eid)
+        self._check_trial_data(expr, trial, env, retval, data_size)
+        return retval
+
+    @staticmethod
+    def _check_trial_data(expr, trial, env, retval, data_size):
         if retval != 0:
             if data_size != 0:
                 LOGGER.warning("Program exited with nonzero status code: %s", retval)
@@ -192,33 +300,59 @@ class TrialController(Controller):
             LOGGER.info("Trial %s produced %s trace files.", trial['number'], len(traces))
         elif measurement['trace'] != 'none':
             raise TrialError("Application completed successfuly but did not produce any traces.")            
-        return retval
-
-    def perform(self, expr, cmd, cwd, env):
-        """Performs a trial of an experiment.
 
+    def _create_trials(self, expr, cwd, runs):
+        """Allocates trial numbers and creates trial records.
+        
+        Trial numbers are allocated while holding a lock on the experiment's storage so 
+        concurrent invocations of TAU Commander don't allocate the same numbers.
+        
         Args:
             expr (Experiment): Experiment data.
-            cmd (str): Command to profile, with command line arguments.
-            cwd (str): Working directory to perform trial in.
-            env (dict): Environment variables to set before performing the trial.
+            cwd (str): Working directory to perform trials in.
+            runs (list): (cmd, env, parameters) tuples as in :any:`perform_batch`.
+            
+        Returns:
+            list: New Trial records in the same order as `runs`.
         """
-        trial_number = expr.next_trial_number()
-        LOGGER.debug("New trial number is %d", trial_number)
-        trial = self.create({'number': trial_number,
-                             'experiment': expr.eid,
-                             'command': ' '.join(cmd),
-                             'cwd': cwd,
-                             'environment': 'FIXME',
-                             'begin_time': str(datetime.utcnow())})
-
-        # Tell TAU to send profiles and traces to the trial prefix
+        lock_file = os.path.join(self.storage.prefix, '.trial_number.lock')
+        with fasteners.InterProcessLock(lock_file), self.storage:
+            numbers = expr.next_trial_numbers(len(runs))
+            LOGGER.debug("New trial numbers are %s", numbers)
+            begin_time = str(datetime.utcnow())
+            trials = []
+            for number, (cmd, _, parameters) in zip(numbers, runs):
+                environment = ' '.join('%s=%s' % item for item in sorted(parameters.iteritems()))
+                trials.append(self.create({'number': number,
+                                           'experiment': expr.eid,
+                                           'command': ' '.join(cmd),
+                                           'cwd': cwd,
+                                           'environment': environment or 'FIXME',
+                                           'begin_time': begin_time}))
+        return trials
+
+    @staticmethod
+    def _trial_env(expr, trial, env):
+        """Tells TAU to send profiles and traces to the trial prefix."""
+        env = dict(env)
         env['PROFILEDIR'] = trial.prefix
         env['TRACEDIR'] = trial.prefix
         measurement = expr.populate('measurement')
         if measurement['trace'] == 'otf2' or measurement['profile'] == 'cubex':
             env['SCOREP_EXPERIMENT_DIRECTORY'] = trial.prefix
+        return env
+
+    def perform(self, expr, cmd, cwd, env):
+        """Performs a trial of an experiment.
 
+        Args:
+            expr (Experiment): Experiment data.
+            cmd (str): Command to profile, with command line arguments.
+            cwd (str): Working directory to perform trial in.
+            env (dict): Environment variables to set before performing the trial.
+        """
+        trial = self._create_trials(expr, cwd, [(cmd, env, {})])[0]
+        env.update(self._trial_env(expr, trial, env))
         targ = expr.populate('target')
         is_bluegene = targ['host_arch'] in [str(x) for x in IBM_BGQ_ARCH, IBM_BGP_ARCH]
         if is_bluegene:
@@ -226,6 +360,81 @@ class TrialController(Controller):
         else:
             return self._perform_interactive(expr, trial, cmd, cwd, env)
 
+    def perform_batch(self, expr, runs, cwd, concurrency=1):
+        """Performs several trials of an experiment, possibly at the same time.
+        
+        Each trial has its own prefix and environment.  Trial numbers for all trials are allocated
+        together and the trial results are recorded in one transaction when all trials have ended.
+        If the batch is interrupted then trials that had not ended are deleted.
+        Trials performed at the same time are pinned to disjoint CPU sets, see :any:`scheduler.cpu_sets`,
+        and their output is only recorded in their trial directories, see :any:`OUTPUT_FILES`.  A single
+        trial at a time sends its output to the terminal and records it if ``trial.record_output`` is true.
+
+        Args:
+            expr (Experiment): Experiment data.
+            runs (list): (cmd, env, parameters) tuples, one per trial, where `cmd` is the command to profile, 
+                         `env` is a dictionary of environment variables to set before performing the trial,
+                         and `parameters` is a dictionary of the values of any swept parameters.
+            cwd (str): Working directory to perform trials in.
+            concurrency (int): Maximum number of trials to perform at the same time.
+            
+        Returns:
+            list: Subprocess return codes in the same order as `runs`.
+        """
+        targ = expr.populate('target')
+        if targ['host_arch'] in [str(x) for x in IBM_BGQ_ARCH, IBM_BGP_ARCH]:
+            raise TrialError("Repeated or concurrent trials are not supported on BlueGene")
+        trials = self._create_trials(expr, cwd, runs)
+        # Trials are performed on other threads so read everything they need from storage now
+        prefixes = [trial.prefix for trial in trials]
+        envs = [self._trial_env(expr, trial, run[1]) for trial, run in zip(trials, runs)]
+        names = ['%s trial %s' % (expr.name, trial['number']) for trial in trials]
+        sample_interval = _sample_interval()
+        concurrency = max(1, min(concurrency, len(trials)))
+        record_output = concurrency > 1 or _record_output()
+        cpu_sets = scheduler.cpu_sets(concurrency)
+
+        finished = {}
+
+        def perform_one(slot, idx):
+            cmd = scheduler.pinned_command(runs[idx][0], cpu_sets[slot])
+            begin_time = str(datetime.utcnow())
+            _banner('BEGIN', names[idx], begin_time)
+            resources = {}
+            try:
+                retval = _execute_command(cmd, cwd, envs[idx], prefixes[idx], targ['host_arch'], 
+                                          resources, concurrency == 1, sample_interval, record_output)
+            finally:
+                _banner('END', names[idx], str(datetime.utcnow()))
+            resources.update({'begin_time': begin_time, 'end_time': str(datetime.utcnow()), 'return_code': retval})
+            finished[idx] = resources
+            return resources
+
+        try:
+            results, errors = scheduler.run_concurrently(perform_one, len(trials), concurrency)
+        except:
+            with self.storage:
+                for idx, trial in enumerate(trials):
+                    if idx in finished:
+                        finished[idx]['data_size'] = trial.data_size()
+                        self.update(finished[idx], trial.eid)
+                    else:
+                        self.delete(trial.eid)
+            raise
+        with self.storage:
+            for trial, fields, error in zip(trials, results, errors):
+                if error:
+                    self.delete(trial.eid)
+                else:
+                    fields['data_size'] = trial.data_size()
+                    self.update(fields, trial.eid)
+        for error in errors:
+            if error:
+                raise error[0], error[1], error[2]
+        for trial, env, fields in zip(trials, envs, results):
+            self._check_trial_data(expr, trial, env, fields['return_code'], fields['data_size'])
+        return [fields['return_code'] for fields in results]
+
 
 class Trial(Model):
     """Trial data model."""
@@ -253,6 +462,15 @@ class Trial(Model):
             if os.path.exists(self.prefix):
                 LOGGER.error("Could not remove trial data at '%s': %s", self.prefix, err)
 
+    def data_size(self):
+        """Get the total size of this trial's data files, not counting recorded output.
+        
+        Returns:
+            int: Size in bytes.
+        """
+        return sum(os.path.getsize(os.path.join(self.prefix, f)) for f in os.listdir(self.prefix)
+                   if f not in OUTPUT_FILES.values())
+
     def profile_files(self):
         """Get this trial's profile files.
 
@@ -274,6 +492,18 @@ class Trial(Model):
         profiles.extend(glob.glob(os.path.join(self.prefix, '*.cfg')))
         return profiles
 
+    def load_profile(self):
+        """Read this trial's TAU profile files.
+        
+        Returns:
+            Profile: Profile data from all threads and metrics, see :any:`tau.cf.profile`.  The data
+                     is cached in the trial directory, see :any:`tau.cf.profile.cache`.
+            
+        Raises:
+            ProfileError: The trial has no TAU profile files or a profile file is invalid.
+        """
+        return profile_cache.load(self.prefix, self.profile_files())
+
     def trace_files(self, env, post_process=False):
         """Get this trial's trace files.
 
@@ -290,10 +520,7 @@ class Trial(Model):
         otf2_files = glob.glob(os.path.join(self.prefix, 'traces.otf2'))
         if post_process and trc_files and edf_files and not slog2_file:
             if not os.path.isfile(os.path.join(self.prefix, 'tau.trc')):
-                cmd = ['tau_treemerge.pl']
-                retval = util.create_subprocess(cmd, cwd=self.prefix, env=env, log=False)
-                if retval != 0:
-                    raise InternalError("Nonzero return code from tau_treemerge.pl")
+                trace_merge.merge_traces(self.prefix, env)
             cmd = ['tau2slog2', 'tau.trc', 'tau.edf', '-o', 'tau.slog2']
             util.create_subprocess(cmd, cwd=self.prefix, env=env, log=False)
             slog2_file = glob.glob(os.path.join(self.prefix, 'tau.slog2'))
@@ -302,34 +529,30 @@ class Trial(Model):
         else:
             return trc_files + edf_files + def_files + evt_files + otf2_files
 
-    def execute_command(self, expr, cmd, cwd, env):
+    def execute_command(self, expr, cmd, cwd, env, resources=None, stdout=True):
         """Execute a command as part of an experiment trial.
 
         Creates a new subprocess for the command and checks for TAU data files
-        when the subprocess exits.
+        when the subprocess exits.  The command's output is also recorded in the 
+        trial directory if the ``trial.record_output`` configuration item is true 
+        or `stdout` is False, see :any:`OUTPUT_FILES`.
 
         Args:
             expr (Experiment): Experiment data.
             cmd (str): Command to profile, with command line arguments.
             cwd (str): Working directory to perform trial in.
             env (dict): Environment variables to set before performing the trial.
+            resources (dict): If given, updated with the resource usage of the command, see 
+                              :any:`util.create_subprocess`.  The process tree is also sampled 
+                              if the ``trial.sample_interval`` configuration item is set.
+            stdout (bool): If True send the command's output to this processes' stdout and stderr,
+                           otherwise only record it in the trial directory.
 
         Returns:
             int: Subprocess return code.
         """
-        cmd_str = ' '.join(cmd)
-        tau_env_opts = sorted('%s=%s' % item for item in env.iteritems() if item[0].startswith('TAU_'))
-        LOGGER.info('\n'.join(tau_env_opts))
-        LOGGER.info(cmd_str)
-        try:
-            retval = util.create_subprocess(cmd, cwd=cwd, env=env)
-        except OSError as err:
-            target = expr.populate('target')
-            errno_hint = {errno.EPERM: "Check filesystem permissions",
-                          errno.ENOENT: "Check paths and command line arguments",
-                          errno.ENOEXEC: "Check that this host supports '%s'" % target['host_arch']}
-            raise TrialError("Couldn't execute %s: %s" % (cmd_str, err), errno_hint.get(err.errno, None))
-        if retval:
-            LOGGER.warning("Return code %d from '%s'", retval, cmd_str)
-        return retval
+        host_arch = expr.populate('target')['host_arch']
+        record_output = not stdout or _record_output()
+        return _execute_command(cmd, cwd, env, self.prefix, host_arch, resources, stdout, 
+                                _sample_interval(), record_output)
 
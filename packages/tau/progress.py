@@ -83,13 +83,26 @@ def load_average():
 
 
 @contextmanager
-def progress_spinner(show_cpu=True, stream=None):
-    """Show a progress spinner until the wrapped object returns."""
+def progress_spinner(show_cpu=True, stream=None, expected_duration=None):
+    """Show a progress spinner until the wrapped object returns.
+    
+    Args:
+        show_cpu (bool): If True, show CPU load average as well as progress.
+        stream (file): Stream object to write progress indication to.
+        expected_duration (float): If given, show a progress bar that fills in this many seconds instead of a spinner.
+    """
     flag = threading.Event()
     def show_progress():
-        with ProgressIndicator(show_cpu=show_cpu, stream=stream) as spinner:
+        start = datetime.now()
+        total_size = int(expected_duration*100) if expected_duration else 0
+        with ProgressIndicator(total_size, show_cpu=show_cpu, stream=stream) as spinner:
             while not flag.wait(0.25):
-                spinner.update()
+                if total_size:
+                    # Never claim to be finished before we actually are
+                    elapsed = int((datetime.now() - start).total_seconds()*100)
+                    spinner.update(min(elapsed, total_size*99 // 100))
+                else:
+                    spinner.update()
     thread = threading.Thread(target=show_progress)
     # Kill thread ungracefully when main thread exits, see
     # https://docs.python.org/2/library/threading.html#thread-objects
@@ -103,13 +116,21 @@ def progress_spinner(show_cpu=True, stream=None):
 
 
 class ProgressIndicator(object):
-    """Display a progress bar or spinner on a stream."""
+    """Display a progress bar or spinner on a stream.
+    
+    Only one progress indicator draws on the console at a time.  Indicators entered while 
+    another indicator is active (e.g. a download progress bar while concurrent software 
+    builds are showing a spinner) are silent.
+    """
 
     class NullStream(object):
         def write(self, *_): 
             pass
         def flush(self, *_): 
             pass
+    
+    _active_lock = threading.Lock()
+    _active_count = 0
 
     def __init__(self, total_size=0, block_size=1, show_cpu=True, stream=None):
         """ Initialize the ProgressBar object.
@@ -136,11 +157,17 @@ class ProgressIndicator(object):
         self._color_line_marker = termcolor.colored(logger.LINE_MARKER, 'red')
 
     def __enter__(self):
+        with ProgressIndicator._active_lock:
+            if ProgressIndicator._active_count:
+                self.stream = ProgressIndicator.NullStream()
+            ProgressIndicator._active_count += 1
         self.update(0)
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
         self.complete()
+        with ProgressIndicator._active_lock:
+            ProgressIndicator._active_count -= 1
         return False
 
     def update(self, count=None, block_size=None, total_size=None):
@@ -179,12 +206,18 @@ class ProgressIndicator(object):
                 cpu_avg = ''
             if show_bar:
                 percent = min(float(self.count*self.block_size) / self.total_size, 1.0)
+                if percent > 0:
+                    remaining = tdelta.total_seconds() * (1 - percent) / percent
+                    eta = " ETA %d:%02d" % divmod(int(remaining), 60)
+                else:
+                    eta = " ETA --:--"
+                line_width -= len(eta)
                 bar_width = line_width - 5
                 bar_fill = '>'*min(max(int(percent*bar_width), 1), bar_width)
                 colored_bar_fill = termcolor.colored(bar_fill, 'green', 'on_green')
                 hidden_chars = len(colored_bar_fill) - len(bar_fill)
                 width = bar_width + hidden_chars
-                progress = "[{:-<{width}}] {: 6.1%}".format(colored_bar_fill, percent, width=width)
+                progress = "[{:-<{width}}] {: 6.1%}{}".format(colored_bar_fill, percent, eta, width=width)
             else:
                 progress = '[%s]' % self._spinner.next()
             self.stream.write('\r')
@@ -30,9 +30,47 @@
 Functions used for unit tests of logger.py.
 """
 
-
-from tau import tests
+import logging
+from tau import tests, logger
 
 @tests.not_implemented
 class LoggerTest(tests.TestCase):
     pass
+
+
+class _RecordingHandler(logging.Handler, object):
+    """Records formatted messages."""
+
+    def __init__(self):
+        super(_RecordingHandler, self).__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+class AsyncHandlerTest(tests.TestCase):
+    """Unit tests for logger.AsyncHandler."""
+
+    def test_async_handler(self):
+        target = _RecordingHandler()
+        handler = logger.AsyncHandler(target, capacity=10)
+        log = logging.getLogger('tau.tests.async_handler')
+        log.propagate = False
+        log.addHandler(handler)
+        try:
+            keys = {'name': 'foo'}
+            for i in xrange(100):
+                keys['number'] = i
+                log.debug("get(keys=%r)", keys)
+                self.assertLessEqual(len(handler._buffer), 10)
+            handler.flush()
+            self.assertEqual(len(target.messages), 100)
+            # Arguments are formatted when the record is emitted, not when it's written
+            self.assertEqual(target.messages[0], "get(keys=%r)" % {'name': 'foo', 'number': 0})
+            log.debug("last")
+        finally:
+            log.removeHandler(handler)
+            handler.close()
+        self.assertEqual(target.messages[-1], "last")
+        self.assertFalse(handler._thread.is_alive())
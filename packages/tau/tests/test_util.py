@@ -31,6 +31,13 @@ Functions used for unit tests of util.py.
 """
 
 
+import os
+import re
+import sys
+import tarfile
+import threading
+import BaseHTTPServer
+import SocketServer
 from tau import util, tests
 
 
@@ -82,3 +89,207 @@ class CamelCaseTest(tests.TestCase):
 
     def test_camelcase(self):
         self.assertEqual(util.camelcase("abc_def_ghi"), "AbcDefGhi")
+
+
+class ExtractArchiveTest(tests.TestCase):
+    """Class to test the extract_archive function in utils."""
+
+    def _create_archive(self, mode, ext):
+        prefix = util.mkdtemp(dir=os.getcwd())
+        src = os.path.join(prefix, 'pkg-1.0', 'src')
+        os.makedirs(src)
+        with open(os.path.join(src, 'main.c'), 'w') as fout:
+            fout.write('int main() { return 0; }\n')
+        os.chmod(src, 0555)
+        archive = os.path.join(prefix, 'pkg-1.0.' + ext)
+        with tarfile.open(archive, mode) as fout:
+            fout.add(os.path.join(prefix, 'pkg-1.0'), arcname='pkg-1.0')
+        os.chmod(src, 0755)
+        return archive
+
+    def _check_extract(self, archive):
+        dest = os.path.join(os.path.dirname(archive), 'extracted')
+        full_dest = util.extract_archive(archive, dest, show_progress=False)
+        self.assertEqual(full_dest, os.path.join(dest, 'pkg-1.0'))
+        with open(os.path.join(full_dest, 'src', 'main.c')) as fin:
+            self.assertEqual(fin.read(), 'int main() { return 0; }\n')
+        self.assertEqual(os.stat(os.path.join(full_dest, 'src')).st_mode & 0777, 0555)
+        os.chmod(os.path.join(full_dest, 'src'), 0755)
+
+    def test_extract_tgz(self):
+        self._check_extract(self._create_archive('w:gz', 'tgz'))
+
+    def test_extract_python_fallback(self):
+        archive = self._create_archive('w:bz2', 'tar.bz2')
+        decompressors = util._ARCHIVE_DECOMPRESSORS
+        util._ARCHIVE_DECOMPRESSORS = ()
+        try:
+            self._check_extract(archive)
+        finally:
+            util._ARCHIVE_DECOMPRESSORS = decompressors
+
+    def test_extract_xz(self):
+        if not util.which('xz'):
+            self.skipTest("xz not found")
+        archive = self._create_archive('w', 'tar')
+        util.create_subprocess(['xz', archive], log=False)
+        self._check_extract(archive + '.xz')
+
+    def test_extract_invalid(self):
+        prefix = util.mkdtemp(dir=os.getcwd())
+        archive = os.path.join(prefix, 'bad.tgz')
+        with open(archive, 'wb') as fout:
+            fout.write('\x1f\x8b not really gzip')
+        with self.assertRaises(IOError):
+            util.extract_archive(archive, os.path.join(prefix, 'extracted'), show_progress=False)
+
+
+class _RangeRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Serves in-memory files, honoring ranged requests if the server allows them."""
+
+    def do_GET(self):    # pylint: disable=invalid-name
+        data = self.server.files.get(self.path)
+        if data is None:
+            self.send_error(404)
+            return
+        match = re.match(r'bytes=(\d+)-(\d+)', self.headers.get('Range', ''))
+        if match and self.server.ranges:
+            start, end = int(match.group(1)), min(int(match.group(2)), len(data) - 1)
+            self.server.requests.append((start, end))
+            body = data[start:end+1]
+            self.send_response(206)
+            self.send_header('Content-Range', 'bytes %d-%d/%d' % (start, end, len(data)))
+        else:
+            self.server.requests.append(None)
+            body = data
+            self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _ThreadingHTTPServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+class DownloadTest(tests.TestCase):
+    """Class to test the download function in utils against a local HTTP server."""
+
+    def setUp(self):
+        self.server = _ThreadingHTTPServer(('127.0.0.1', 0), _RangeRequestHandler)
+        self.server.files = {}
+        self.server.ranges = True
+        self.server.requests = []
+        self.url = 'http://127.0.0.1:%d' % self.server.server_address[1]
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.chunk_min = util._DOWNLOAD_CHUNK_MIN
+        util._DOWNLOAD_CHUNK_MIN = 1024
+
+    def tearDown(self):
+        util._DOWNLOAD_CHUNK_MIN = self.chunk_min
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _dest(self):
+        return os.path.join(util.mkdtemp(dir=os.getcwd()), 'pkg.tgz')
+
+    def test_parallel_ranges(self):
+        data = os.urandom(10000)
+        self.server.files['/pkg.tgz'] = data
+        dest = self._dest()
+        util.download(self.url + '/pkg.tgz', dest)
+        with open(dest, 'rb') as fin:
+            self.assertEqual(fin.read(), data)
+        self.assertEqual(len(self.server.requests), 1 + util.DOWNLOAD_CONNECTIONS)
+        self.assertEqual(os.listdir(os.path.dirname(dest)), ['pkg.tgz'])
+
+    def test_resume(self):
+        data = os.urandom(1000)
+        self.server.files['/pkg.tgz'] = data
+        dest = self._dest()
+        part_prefix = util._download_part_prefix(self.url + '/pkg.tgz', dest)
+        with open(part_prefix + '.0-999', 'wb') as fout:
+            fout.write(data[:600])
+        # Parts of the same file from another URL are not used or discarded
+        other_part = util._download_part_prefix(self.url + '/other/pkg.tgz', dest) + '.0-999'
+        with open(other_part, 'wb') as fout:
+            fout.write('x' * 600)
+        util.download(self.url + '/pkg.tgz', dest)
+        with open(dest, 'rb') as fin:
+            self.assertEqual(fin.read(), data)
+        self.assertEqual(self.server.requests, [(0, 0), (600, 999)])
+        self.assertTrue(os.path.exists(other_part))
+
+    def test_no_ranges(self):
+        data = os.urandom(5000)
+        self.server.files['/pkg.tgz'] = data
+        self.server.ranges = False
+        dest = self._dest()
+        util.download(self.url + '/pkg.tgz', dest)
+        with open(dest, 'rb') as fin:
+            self.assertEqual(fin.read(), data)
+        self.assertEqual(self.server.requests, [None])
+
+    def test_mirrors_and_checksum(self):
+        good = os.urandom(2000)
+        self.server.files['/mirror/pkg.tgz'] = good
+        bad_mirror = os.path.dirname(self._dest())
+        with open(os.path.join(bad_mirror, 'pkg.tgz'), 'wb') as fout:
+            fout.write('damaged')
+        with open(os.path.join(bad_mirror, 'good.tgz'), 'wb') as fout:
+            fout.write(good)
+        checksum = util.sha256sum(os.path.join(bad_mirror, 'good.tgz'))
+        dest = self._dest()
+        util.download('http://invalid.invalid/pkg.tgz', dest, 
+                      mirrors=[bad_mirror, self.url + '/mirror'], sha256=checksum)
+        with open(dest, 'rb') as fin:
+            self.assertEqual(fin.read(), good)
+        with self.assertRaises(util.ChecksumError):
+            util.download('http://invalid.invalid/pkg.tgz', self._dest(), mirrors=[bad_mirror], sha256=checksum)
+
+
+class CreateSubprocessTest(tests.TestCase):
+    """Unit tests for util.create_subprocess."""
+
+    def test_tee(self):
+        # Enough output on both pipes to deadlock a reader that reads one pipe at a time
+        script = ("import sys\n"
+                  "for i in range(20000):\n"
+                  "    sys.stdout.write('out %d\\n' % i)\n"
+                  "    sys.stderr.write('err %d\\n' % i)\n"
+                  "sys.exit(3)\n")
+        prefix = util.mkdtemp(dir=os.getcwd())
+        tee = {'stdout': os.path.join(prefix, 'stdout.txt'), 'stderr': os.path.join(prefix, 'stderr.txt')}
+        timing = {}
+        retval = util.create_subprocess([sys.executable, '-c', script], stdout=False, log=False, 
+                                        tee=tee, timing=timing)
+        self.assertEqual(retval, 3)
+        with open(tee['stdout']) as fin:
+            self.assertEqual(fin.read(), ''.join('out %d\n' % i for i in range(20000)))
+        with open(tee['stderr']) as fin:
+            self.assertEqual(fin.read(), ''.join('err %d\n' % i for i in range(20000)))
+        self.assertGreater(timing['wall'], 0)
+        self.assertGreaterEqual(timing['cpu'], 0)
+
+    def test_resources(self):
+        # Allocate and touch about 64MiB in a child process while the parent waits for it
+        script = ("import subprocess, sys, time\n"
+                  "child = subprocess.Popen([sys.executable, '-c', "
+                  "'import time; data = bytearray(64 << 20); time.sleep(0.5)'])\n"
+                  "child.wait()\n")
+        resources = {}
+        retval = util.create_subprocess([sys.executable, '-c', script], stdout=False, log=False, 
+                                        resources=resources, sample_interval=0.05)
+        self.assertEqual(retval, 0)
+        self.assertGreaterEqual(resources['max_rss'], 64 << 20)
+        self.assertGreaterEqual(resources['user_time'] + resources['system_time'], 0)
+        self.assertGreaterEqual(resources['wall_time'], 0.5)
+        self.assertGreater(resources['minor_page_faults'], 0)
+        if sys.platform.startswith('linux'):
+            self.assertEqual(resources['peak_processes'], 2)
+            self.assertGreaterEqual(resources['peak_memory'], 64 << 20)
@@ -32,13 +32,20 @@ Handles system manipulation and status tasks, e.g. subprocess management or file
 
 import os
 import sys
+import copy
+import glob
 import time
 import atexit
 import subprocess
 import errno
 import shutil
-import urllib
+import select
+import socket
+import urllib2
+import Queue
+import httplib
 import pkgutil
+import threading
 import tarfile
 import tempfile
 import urlparse
@@ -57,6 +64,16 @@ _PY_SUFFEXES = ('.py', '.pyo', '.pyc')
 
 _DTEMP_STACK = []
 
+SUBPROCESS_READ_SIZE = 64 * 1024
+"""int: Maximum number of bytes to read from a subprocess output pipe at once."""
+
+_RUSAGE_FIELDS = (('user_time', 'ru_utime'),
+                  ('system_time', 'ru_stime'),
+                  ('minor_page_faults', 'ru_minflt'),
+                  ('major_page_faults', 'ru_majflt'),
+                  ('voluntary_context_switches', 'ru_nvcsw'),
+                  ('involuntary_context_switches', 'ru_nivcsw'))
+
 
 def _cleanup_dtemp():
     if _DTEMP_STACK:
@@ -178,75 +195,209 @@ def which(program, use_cached=True):
     return None
 
 
-def download(src, dest):
+class ChecksumError(IOError):
+    """Indicates that a file does not match its expected checksum."""
+
+
+DOWNLOAD_CONNECTIONS = 4
+"""int: Maximum number of concurrent ranged requests used to download one file."""
+
+_DOWNLOAD_CHUNK_MIN = 8*1024*1024
+
+_DOWNLOAD_BLOCK_SIZE = 64*1024
+
+_DOWNLOAD_ATTEMPTS = 3
+
+_DOWNLOAD_TIMEOUT = 60
+
+
+def sha256sum(path):
+    """Calculates the SHA-256 checksum of a file.
+
+    Args:
+        path (str): Path to the file.
+
+    Returns:
+        str: Hexadecimal SHA-256 digest.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fin:
+        for chunk in iter(lambda: fin.read(1024*1024), ''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _link_or_copy(src, dest):
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copy(src, dest)
+
+
+def _urlopen(url, byte_range=None):
+    request = urllib2.Request(url)
+    if byte_range:
+        request.add_header('Range', 'bytes=%d-%d' % byte_range)
+    return urllib2.urlopen(request, timeout=_DOWNLOAD_TIMEOUT)
+
+
+def _download_stream(response, path, progress):
+    with open(path, 'ab') as fout:
+        for block in iter(lambda: response.read(_DOWNLOAD_BLOCK_SIZE), ''):
+            fout.write(block)
+            progress(len(block))
+
+
+def _download_range(url, path, start, end, progress):
+    """Downloads bytes `start` through `end`, inclusive, appending to whatever `path` already holds."""
+    for attempt in xrange(_DOWNLOAD_ATTEMPTS):
+        offset = start + (os.path.getsize(path) if os.path.exists(path) else 0)
+        if offset > end:
+            break
+        try:
+            response = _urlopen(url, (offset, end))
+            try:
+                if response.getcode() != 206:
+                    raise IOError("Server ignored ranged request for '%s'" % url)
+                _download_stream(response, path, progress)
+            finally:
+                response.close()
+        except (urllib2.URLError, httplib.HTTPException, socket.error) as err:
+            LOGGER.debug("Attempt %d to download bytes %d-%d of '%s' failed: %s", attempt+1, offset, end, url, err)
+    if not os.path.exists(path) or os.path.getsize(path) != end - start + 1:
+        raise IOError("Failed to download bytes %d-%d of '%s'" % (start, end, url))
+
+
+def _download_part_prefix(url, dest):
+    """Prefix of the part files of a download so parts downloaded from different URLs are never mixed."""
+    return '%s.part.%s' % (dest, hashlib.sha1(url).hexdigest()[:16])
+
+
+def _download_url(url, dest):
+    """Downloads a URL, resuming partial downloads and using parallel ranged requests if possible.
+    
+    Data is downloaded to ``<dest>.part.<url hash>.<start>-<end>`` files that are concatenated to create 
+    `dest` when all ranges are complete.  Part files are kept if the download fails so it can be resumed.
+    """
+    # A one-byte ranged request reveals the file size and whether the server supports ranged requests
+    try:
+        response = _urlopen(url, (0, 0))
+    except (urllib2.URLError, httplib.HTTPException, socket.error) as err:
+        raise IOError("Failed to download '%s': %s" % (url, err))
+    lock = threading.Lock()
+    received = [0]
+    def progress(nbytes):
+        with lock:
+            received[0] += nbytes
+    if response.getcode() != 206:
+        LOGGER.debug("'%s' does not support ranged requests", url)
+        part = _download_part_prefix(url, dest)
+        if os.path.exists(part):
+            os.remove(part)
+        total = int(response.info().get('Content-Length', 0))
+        with ProgressIndicator(total, show_cpu=False) as progress_bar:
+            try:
+                _download_stream(response, part, lambda nbytes: (progress(nbytes), progress_bar.update(received[0])))
+            except (httplib.HTTPException, socket.error) as err:
+                raise IOError("Failed to download '%s': %s" % (url, err))
+            finally:
+                response.close()
+        os.rename(part, dest)
+        return
+    response.close()
+    total = int(response.info()['Content-Range'].rsplit('/', 1)[1])
+    nchunks = max(1, min(DOWNLOAD_CONNECTIONS, total // _DOWNLOAD_CHUNK_MIN))
+    chunk_size = (total + nchunks - 1) // nchunks
+    ranges = [(start, min(start + chunk_size, total) - 1) for start in xrange(0, total, chunk_size)]
+    part_prefix = _download_part_prefix(url, dest)
+    parts = ['%s.%d-%d' % (part_prefix, start, end) for start, end in ranges]
+    # Discard parts of a different version of the file
+    for path in glob.glob(part_prefix + '*'):
+        if path not in parts:
+            os.remove(path)
+    received[0] = sum(os.path.getsize(path) for path in parts if os.path.exists(path))
+    if received[0]:
+        LOGGER.info("Resuming download of '%s' at %s", url, human_size(received[0]))
+    errors = []
+    def worker(path, start, end):
+        try:
+            _download_range(url, path, start, end, progress)
+        except IOError as err:
+            errors.append(err)
+    threads = [threading.Thread(target=worker, args=(path, start, end)) for path, (start, end) in zip(parts, ranges)]
+    with ProgressIndicator(total, show_cpu=False) as progress_bar:
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            while thread.is_alive():
+                progress_bar.update(received[0])
+                thread.join(0.1)
+        progress_bar.update(received[0])
+    if errors:
+        raise errors[0]
+    with open(dest, 'wb') as fout:
+        for path in parts:
+            with open(path, 'rb') as fin:
+                shutil.copyfileobj(fin, fout)
+    for path in parts:
+        os.remove(path)
+
+
+def download(src, dest, mirrors=None, sha256=None):
     """Downloads or copies files.
     
-    `src` may be a file path or URL.  The destination folder will be created 
-    if it doesn't exist.  Download is via curl, wget, or Python's urllib as appropriate.
+    `src` may be a file path or URL.  The destination folder will be created if it doesn't exist.
+    Local files are hardlinked if possible, otherwise copied.  URLs are downloaded with parallel 
+    ranged requests if the server supports them, and interrupted downloads resume where they stopped.
+    
+    Each mirror is searched in order for a file with the same name as `src` before trying `src`.
+    A mirror may be a URL or the path to a directory.  If a SHA-256 checksum is given then files
+    that don't match it are rejected and the next mirror is tried.
     
     Args:
         src (str): Path or URL to source file.
         dest (str): Path to file copy or download destination.
+        mirrors (list): Paths or URLs of directories to search before `src`.
+        sha256 (str): Expected hexadecimal SHA-256 checksum of the file.
         
     Raises:
+        ChecksumError: Files were acquired but none matched the expected checksum.
         IOError: File copy or download failed.
     """
-    if src.startswith('file://'):
-        src = src[6:]
-    if os.path.isfile(src):
-        LOGGER.debug("Copying '%s' to '%s'", src, dest)
-        mkdirp(os.path.dirname(dest))
-        shutil.copy(src, dest)
-    else:
-        LOGGER.debug("Downloading '%s' to '%s'", src, dest)
-        LOGGER.info("Downloading '%s'", src)
-        mkdirp(os.path.dirname(dest))
-        curl = which('curl')
-        wget = which('wget')
-        curl_cmd = [curl, '-L', src, '-o', dest] if curl else None
-        wget_cmd = [wget, src, '-O', dest] if wget else None
-        for cmd in [curl_cmd, wget_cmd]:
-            if cmd:
-                if _create_dl_subprocess(cmd, src) == 0:
-                    return
-                LOGGER.warning("%s failed to download '%s'. Retrying with a different method...", cmd[0], src)                    
-        # Fallback: this is usually **much** slower than curl or wget
-        with ProgressIndicator() as progress_bar:
-            try:
-                urllib.urlretrieve(src, dest, reporthook=progress_bar.update)
-            except Exception as err:
-                LOGGER.warning("urllib failed to download '%s': %s", src, err)
-                raise IOError("Failed to download '%s'" % src)
-
-
-def _create_dl_subprocess(cmd, src):
-    LOGGER.debug("Creating subprocess: cmd=%s\n", cmd)
-    if cmd[0].endswith('curl'):
-        proc_output = subprocess.Popen(['curl', '-sI', src, '--location'],
-                                       stdout=subprocess.PIPE, stderr=subprocess.PIPE).communicate()[0]
-    elif cmd[0].endswith('wget'):
-        proc_output = subprocess.Popen(['wget', src, '--spider', '--server-response'],
-                                       stdout=subprocess.PIPE, stderr=subprocess.PIPE).communicate()[1]
-    LOGGER.debug(proc_output)
-    try:
-        file_size = int(proc_output.partition('Content-Length')[2].split()[1])
-    except (ValueError, IndexError):
-        LOGGER.warning("Invalid response while retrieving download file size")
-        file_size = -1
-    with ProgressIndicator(file_size) as progress_bar:
-        with open(os.devnull, 'wb') as devnull:
-            proc = subprocess.Popen(cmd, stdout=devnull, stderr=subprocess.STDOUT)
-            while proc.poll() is None:
-                try:
-                    current_size = os.stat(cmd[-1]).st_size
-                except OSError:
-                    current_size = 0
-                progress_bar.update(current_size)
-                time.sleep(0.1)
-            proc.wait()
-            retval = proc.returncode
-            LOGGER.debug("%s returned %d", cmd, retval)
-            return retval
+    filename = os.path.basename(urlparse.urlparse(src).path) or os.path.basename(src)
+    candidates = [mirror.rstrip('/') + '/' + filename for mirror in mirrors or []] + [src]
+    mkdirp(os.path.dirname(dest))
+    checksum_failed = False
+    for candidate in candidates:
+        if candidate.startswith('file://'):
+            candidate = candidate[7:]
+        if os.path.exists(dest):
+            os.remove(dest)
+        try:
+            if os.path.isfile(candidate):
+                LOGGER.debug("Copying '%s' to '%s'", candidate, dest)
+                _link_or_copy(candidate, dest)
+            elif is_url(candidate):
+                LOGGER.info("Downloading '%s'", candidate)
+                _download_url(candidate, dest)
+            else:
+                raise IOError("No such file")
+        except (IOError, OSError) as err:
+            LOGGER.debug("Cannot acquire '%s': %s", candidate, err)
+            continue
+        if sha256:
+            digest = sha256sum(dest)
+            if digest != sha256:
+                LOGGER.warning("Checksum of '%s' is %s but %s was expected", candidate, digest, sha256)
+                os.remove(dest)
+                checksum_failed = True
+                continue
+        return
+    if checksum_failed:
+        raise ChecksumError("No copy of '%s' matches checksum %s" % (src, sha256))
+    raise IOError("Failed to download '%s'" % src)
+
 
 def archive_toplevel(archive):
     """Returns the name of the top-level directory in an archive.
@@ -290,17 +441,83 @@ def archive_toplevel(archive):
         return topdir
 
 
-def _show_extract_progress(members):
-    with ProgressIndicator(len(members), show_cpu=False) as progress_bar:
-        for i, member in enumerate(members):
-            progress_bar.update(i)
-            yield member
+_ARCHIVE_DECOMPRESSORS = (('\x1f\x8b', (['pigz', '-dc'],)),
+                          ('BZh', (['lbzip2', '-dc'], ['pbzip2', '-dc'])),
+                          ('\xfd7zXZ\x00', (['xz', '-dc', '-T0'],)),
+                          ('\x28\xb5\x2f\xfd', (['zstd', '-dc', '-T0'],)))
+
+
+def _archive_decompressor(archive):
+    """Finds a command that decompresses an archive file in parallel.
+    
+    Args:
+        archive (str): Path to archive file.
+        
+    Raises:
+        IOError: `archive` could not be read.
+    
+    Returns:
+        list: Decompression command writing to stdout, or None if no suitable command was found.
+    """
+    with open(archive, 'rb') as fin:
+        magic = fin.read(6)
+    for prefix, commands in _ARCHIVE_DECOMPRESSORS:
+        if magic.startswith(prefix):
+            for cmd in commands:
+                abs_cmd = which(cmd[0])
+                if abs_cmd:
+                    return [abs_cmd] + cmd[1:]
+    return None
+
+
+def _extract_tar_stream(fileobj, mode, dest, progress):
+    """Extracts a tar archive from a stream in a single pass.
+    
+    Args:
+        fileobj (file): Stream to read.
+        mode (str): Stream mode for :any:`tarfile.open`, e.g. 'r|*'.
+        dest (str): Destination folder.
+        progress (callable): Called with no arguments after each archive member is extracted.
+    
+    Returns:
+        set: Names of the top-level elements in the archive.
+    """
+    toplevel = set()
+    directories = []
+    with tarfile.open(fileobj=fileobj, mode=mode) as fin:
+        for member in fin:
+            parts = [part for part in os.path.normpath(member.name).split(os.sep) if part not in ('', '.')]
+            if parts:
+                toplevel.add(parts[0])
+            if member.isdir():
+                # Like TarFile.extractall, set directory permissions after all files are extracted
+                directories.append(member)
+                member = copy.copy(member)
+                member.mode = 0700
+            fin.extract(member, dest)
+            progress()
+        directories.sort(key=lambda member: member.name, reverse=True)
+        for member in directories:
+            path = os.path.join(dest, member.name)
+            try:
+                fin.chown(member, path)
+                fin.utime(member, path)
+                fin.chmod(member, path)
+            except tarfile.ExtractError as err:
+                LOGGER.debug(err)
+    return toplevel
+
 
 def extract_archive(archive, dest, show_progress=True):
     """Extracts archive file to dest.
     
     Supports compressed and uncompressed tar archives. Destination folder will
-    be created if it doesn't exist.
+    be created if it doesn't exist.  The archive is decompressed and extracted in a single 
+    streaming pass.  `pigz`, `xz`, `zstd`, etc. are used to decompress the archive in parallel
+    if they are installed, otherwise the archive is decompressed by :any:`tarfile`.
+    
+    Assumes that the archive file is rooted in a single top-level directory, 
+    see :any:`archive_toplevel`.
     
     Args:
         archive (str): Path to archive file to extract.
@@ -312,21 +529,43 @@ def extract_archive(archive, dest, show_progress=True):
     Raises:
         IOError: Failed to extract archive.
     """
-    topdir = archive_toplevel(archive)
-    full_dest = os.path.join(dest, topdir)
+    cmd = _archive_decompressor(archive)
     mkdirp(dest)
-    with tarfile.open(archive) as fin:
-        if show_progress:
-            LOGGER.info("Checking contents of '%s'", archive)
-            with progress_spinner(show_cpu=False):
-                members = fin.getmembers()
-            LOGGER.info("Extracting '%s' to create '%s'", archive, full_dest)
-            fin.extractall(dest, members=_show_extract_progress(members))
-        else:
-            LOGGER.info("Extracting '%s' to create '%s'", archive, full_dest)
-            fin.extractall(dest)
+    LOGGER.info("Extracting '%s' to '%s'", archive, dest)
+    with open(archive, 'rb') as fin, tempfile.TemporaryFile() as stderr:
+        # The decompressor shares this file descriptor so its offset shows how much has been read
+        fd = fin.fileno()
+        context = ProgressIndicator(os.fstat(fd).st_size, show_cpu=False) if show_progress else _null_context()
+        with context as progress_bar:
+            progress = lambda: progress_bar.update(os.lseek(fd, 0, os.SEEK_CUR)) if progress_bar else None
+            if not cmd:
+                try:
+                    toplevel = _extract_tar_stream(fin, 'r|*', dest, progress)
+                except tarfile.TarError as err:
+                    raise IOError("Cannot extract '%s': %s" % (archive, err))
+            else:
+                LOGGER.debug("Decompressing with %s", cmd)
+                proc = subprocess.Popen(cmd, stdin=fin, stdout=subprocess.PIPE, stderr=stderr)
+                try:
+                    toplevel = _extract_tar_stream(proc.stdout, 'r|', dest, progress)
+                except tarfile.TarError as err:
+                    proc.kill()
+                    raise IOError("Cannot extract '%s': %s" % (archive, err))
+                finally:
+                    # Drain trailing padding so the decompressor can exit cleanly
+                    for _ in iter(lambda: proc.stdout.read(65536), ''):
+                        pass
+                    proc.stdout.close()
+                    retval = proc.wait()
+                if retval:
+                    stderr.seek(0)
+                    raise IOError("%s failed with return code %d: %s" % (cmd, retval, stderr.read().strip()))
+    if not toplevel:
+        raise IOError("Archive '%s' is empty" % archive)
+    full_dest = os.path.join(dest, min(toplevel, key=len))
     if not os.path.isdir(full_dest):
         raise IOError("Extracting '%s' does not create '%s'" % (archive, full_dest))
+    LOGGER.debug("Extracted '%s' to create '%s'", archive, full_dest)
     return full_dest
 
 
@@ -372,22 +611,264 @@ def file_accessible(filepath, mode='r'):
             handle.close()
     return False
 
+
+def replace_in_file(path, old, new):
+    """Replaces every occurrence of a string in a file.
+
+    Unlike :any:`fileinput.input` with ``inplace=1`` this does not redirect :any:`sys.stdout`,
+    so it is safe to use while other threads are writing to the console.
+
+    Args:
+        path (str): Path to the file to modify.
+        old (str): String to replace.
+        new (str): Replacement string.
+    """
+    with open(path, 'r') as fin:
+        text = fin.read()
+    with open(path, 'w') as fout:
+        fout.write(text.replace(old, new))
+
 @contextmanager
 def _null_context():
     yield
 
 
-def create_subprocess(cmd, cwd=None, env=None, stdout=True, log=True, show_progress=False):
+def wait_rusage(proc):
+    """Waits for a subprocess to exit and gets its resource usage.
+    
+    Unlike :any:`resource.getrusage` with ``RUSAGE_CHILDREN``, the resource usage is 
+    only that of `proc` and its children even if other subprocesses are running.
+    
+    Args:
+        proc (subprocess.Popen): Subprocess to wait for.
+        
+    Returns:
+        resource.struct_rusage: Resource usage of the subprocess.
+    """
+    while True:
+        try:
+            _, status, rusage = os.wait4(proc.pid, 0)
+        except OSError as err:
+            if err.errno == errno.EINTR:
+                continue
+            raise
+        break
+    proc.returncode = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+    return rusage
+
+
+def rusage_dict(rusage):
+    """Converts resource usage to a dictionary.
+    
+    ``ru_maxrss`` is in bytes on Darwin and kilobytes elsewhere, so it is converted to bytes.
+    
+    Args:
+        rusage (resource.struct_rusage): Resource usage, e.g. from :any:`wait_rusage`.
+        
+    Returns:
+        dict: 'user_time' and 'system_time' in seconds, 'max_rss' in bytes, and 'minor_page_faults', 
+              'major_page_faults', 'voluntary_context_switches', 'involuntary_context_switches' counts.
+    """
+    usage = dict((key, getattr(rusage, field)) for key, field in _RUSAGE_FIELDS)
+    usage['max_rss'] = rusage.ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+    return usage
+
+
+def process_tree_usage(pid):
+    """Gets the current memory use of a process and all its descendants.
+    
+    Reads ``/proc`` so this only works on Linux.
+    
+    Args:
+        pid (int): Process ID of the root of the process tree.
+        
+    Returns:
+        tuple: (Number of processes in the tree, total resident set size of the tree in bytes), 
+               or None if the process tree can't be read.
+    """
+    children = {}
+    rss = {}
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    try:
+        entries = os.listdir('/proc')
+    except OSError:
+        return None
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(os.path.join('/proc', entry, 'stat')) as fin:
+                stat = fin.read()
+        except IOError:
+            # Process exited while we were looking
+            continue
+        # The command name may contain spaces or parentheses so split after the last ')'
+        fields = stat[stat.rfind(')')+2:].split()
+        child = int(entry)
+        children.setdefault(int(fields[1]), []).append(child)
+        rss[child] = int(fields[21]) * page_size
+    if pid not in rss:
+        return None
+    count, total, stack = 0, 0, [pid]
+    while stack:
+        proc = stack.pop()
+        count += 1
+        total += rss.get(proc, 0)
+        stack.extend(children.get(proc, []))
+    return count, total
+
+
+class _ProcessTreeSampler(object):
+    """Records the peak memory use and process count of a process tree at regular intervals."""
+
+    def __init__(self, pid, interval):
+        self.pid = pid
+        self.interval = interval
+        self.peak_processes = 0
+        self.peak_memory = 0
+        self._next = 0
+
+    def __call__(self):
+        now = time.time()
+        if now < self._next:
+            return
+        self._next = now + self.interval
+        sample = process_tree_usage(self.pid)
+        if sample:
+            self.peak_processes = max(self.peak_processes, sample[0])
+            self.peak_memory = max(self.peak_memory, sample[1])
+
+
+class _AsyncWriter(object):
+    """Writes data to files on a background thread.
+    
+    Writing to a terminal can be slow, so writing subprocess output on a separate thread keeps
+    the thread reading the output from falling behind and stalling the subprocess.
+    """
+
+    def __init__(self):
+        self._queue = Queue.Queue()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self):
+        dirty = set()
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            fout, data = item
+            try:
+                fout.write(data)
+            except (IOError, ValueError) as err:
+                LOGGER.debug("Cannot write subprocess output: %s", err)
+                continue
+            dirty.add(fout)
+            if self._queue.empty():
+                for fout in dirty:
+                    fout.flush()
+                dirty.clear()
+        for fout in dirty:
+            fout.flush()
+
+    def write(self, fout, data):
+        """Queues `data` to be written to `fout`."""
+        self._queue.put((fout, data))
+
+    def close(self):
+        """Waits for all queued data to be written."""
+        self._queue.put(None)
+        self._thread.join()
+
+
+def _pump_subprocess_output(proc, sinks, log, sampler=None):
+    """Copies subprocess output to files until the subprocess closes its stdout and stderr.
+    
+    Output is read in large chunks from whichever pipe has data so neither pipe fills up
+    and blocks the subprocess.  Files are written asynchronously, see :any:`_AsyncWriter`.
+    Complete lines are sent to the debug log from the calling thread so they appear in
+    any per-thread log files, see :any:`logger.thread_log_file`.
+    
+    Args:
+        proc (subprocess.Popen): Subprocess with piped stdout and stderr.
+        sinks (dict): Lists of files indexed by 'stdout' and 'stderr'.
+        log (bool): If True send subprocess output to the debug log.
+        sampler: If given, called with no arguments at least every `sampler.interval` seconds.
+    """
+    timeout = int(sampler.interval * 1000) if sampler else None
+    streams = {proc.stdout.fileno(): 'stdout', proc.stderr.fileno(): 'stderr'}
+    partial_lines = dict.fromkeys(streams, '')
+    if hasattr(select, 'poll'):
+        poller = select.poll()
+        for fd in streams:
+            poller.register(fd, select.POLLIN | select.POLLPRI)
+        wait = lambda: [fd for fd, _ in poller.poll(timeout)]
+        unregister = poller.unregister
+    else:
+        wait = lambda: select.select(list(open_fds), [], [], *([timeout / 1000.0] if sampler else []))[0]
+        unregister = lambda fd: None
+    open_fds = set(streams)
+    writer = _AsyncWriter()
+    try:
+        while open_fds:
+            try:
+                ready = wait()
+            except select.error as err:
+                if err.args[0] == errno.EINTR:
+                    continue
+                raise
+            if sampler:
+                sampler()
+            for fd in ready:
+                try:
+                    data = os.read(fd, SUBPROCESS_READ_SIZE)
+                except OSError as err:
+                    if err.errno == errno.EINTR:
+                        continue
+                    raise
+                if not data:
+                    unregister(fd)
+                    open_fds.discard(fd)
+                    continue
+                for fout in sinks.get(streams[fd], []):
+                    writer.write(fout, data)
+                if log:
+                    lines = (partial_lines[fd] + data).split('\n')
+                    partial_lines[fd] = lines.pop()
+                    if lines:
+                        LOGGER.debug('\n'.join(lines))
+        if log:
+            for line in partial_lines.itervalues():
+                if line:
+                    LOGGER.debug(line)
+    finally:
+        writer.close()
+
+
+def create_subprocess(cmd, cwd=None, env=None, stdout=True, log=True, show_progress=False, 
+                      expected_duration=None, timing=None, tee=None, resources=None, sample_interval=None):
     """Create a subprocess.
     
-    See :any:`subprocess.Popen`.
+    See :any:`subprocess.Popen`.  Subprocess stdout and stderr are kept separate.
     
     Args:
         cmd (list): Command and its command line arguments.
         cwd (str): Change directory to `cwd` if given, otherwise use :any:`os.getcwd`.
         env (dict): Environment variables to set before launching cmd.
-        stdout (bool): If True send subprocess stdout and stderr to this processes' stdout.
+        stdout (bool): If True send subprocess stdout and stderr to this processes' stdout and stderr.
         log (bool): If True send subprocess stdout and stderr to the debug log.
+        show_progress (bool): If True show a progress indicator while the subprocess runs.
+        expected_duration (float): If given, the progress indicator is a bar that fills in this many seconds.
+        timing (dict): If given, 'wall' and 'cpu' are set to the wall clock time and CPU time 
+                       (user plus system) of the subprocess in seconds.
+        tee (dict): If given, paths to files that should also receive subprocess output 
+                    indexed by 'stdout' and/or 'stderr'.  The files are overwritten.
+        resources (dict): If given, updated with the subprocess resource usage (see :any:`rusage_dict`) 
+                          and 'wall_time', the wall clock time of the subprocess in seconds.
+        sample_interval (float): If given along with `resources`, sample the memory use of the subprocess 
+                                 and its descendants this often (in seconds) and set 'peak_memory' (bytes) 
+                                 and 'peak_processes' in `resources`.  See :any:`process_tree_usage`.
         
     Returns:
         int: Subprocess return code.
@@ -407,19 +888,38 @@ def create_subprocess(cmd, cwd=None, env=None, stdout=True, log=True, show_progr
                 subproc_env[key] = val
                 LOGGER.debug("%s=%s", key, val)
     LOGGER.debug("Creating subprocess: cmd=%s, cwd='%s'\n", cmd, cwd)
-    context = progress_spinner if show_progress else _null_context
-    with context():
-        proc = subprocess.Popen(cmd, cwd=cwd, env=subproc_env, 
-                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT, bufsize=1)
-        with proc.stdout:
-            # Use iter to avoid hidden read-ahead buffer bug in named pipes:
-            # http://bugs.python.org/issue3907
-            for line in iter(proc.stdout.readline, b''):
-                if log:
-                    LOGGER.debug(line[:-1])
-                if stdout:
-                    print line,
-        proc.wait()
+    sinks = {'stdout': [sys.stdout] if stdout else [], 'stderr': [sys.stderr] if stdout else []}
+    tee_files = []
+    try:
+        for stream, path in (tee or {}).iteritems():
+            tee_files.append(open(path, 'w'))
+            sinks[stream].append(tee_files[-1])
+        if show_progress:
+            context = progress_spinner(expected_duration=expected_duration)
+        else:
+            context = _null_context()
+        with context:
+            start = time.time()
+            proc = subprocess.Popen(cmd, cwd=cwd, env=subproc_env, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            sampler = None
+            if resources is not None and sample_interval:
+                sampler = _ProcessTreeSampler(proc.pid, sample_interval)
+            with proc.stdout, proc.stderr:
+                _pump_subprocess_output(proc, sinks, log, sampler)
+            rusage = wait_rusage(proc)
+    finally:
+        for fout in tee_files:
+            fout.close()
+    wall_time = time.time() - start
+    if timing is not None:
+        timing['wall'] = wall_time
+        timing['cpu'] = rusage.ru_utime + rusage.ru_stime
+    if resources is not None:
+        resources.update(rusage_dict(rusage))
+        resources['wall_time'] = wall_time
+        if sampler:
+            resources['peak_memory'] = sampler.peak_memory
+            resources['peak_processes'] = sampler.peak_processes
     retval = proc.returncode
     LOGGER.debug("%s returned %d", cmd, retval)
     return retval